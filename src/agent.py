@@ -1,3 +1,5 @@
+import os
+
 from dotenv import load_dotenv
 
 from langgraph.graph import StateGraph, START, END
@@ -15,15 +17,26 @@ from langchain_core.runnables.config import RunnableConfig
 from src.agent_state import AgentState, AiBehaviorMode
 
 from src.config_schema import ConfigSchema
+from src.database.checkpointer import create_checkpointer
+from src.instrumentation import instrument_node
+from src.response_cache import ainvoke_with_cache, get_response_cache
 from src.tools import tools
 from src.tools.tools import get_ai_request_tools, get_all_tools
 
 # Import LLM configurations
-from src.llm_config import single_call_llm
+from src import llm_config
 
 # Import the new node implementations
+from src.nodes.node_execute_ai_request_on_client import (
+    node_execute_ai_request_on_client,
+)
+from src.nodes.node_execute_ai_request_on_server import (
+    node_execute_ai_request_on_server,
+)
+from src.nodes.node_fast_path_router import node_fast_path_router
 from src.nodes.node_planner import node_planner
 from src.nodes.node_response_generator import node_response_generator
+from src.nodes.node_summarize_history import node_summarize_history
 from src.nodes.node_tool_caller import node_tool_caller
 
 from langgraph.prebuilt import ToolNode
@@ -34,6 +47,9 @@ load_dotenv()
 
 graph_builder = StateGraph(AgentState, ConfigSchema)
 
+# Every node is wrapped with instrument_node - wall time, LLM time and tokens, retries and interrupt
+# waits per node run go to the sinks in src/instrumentation.py
+
 
 # === START - route by ai behavior mode (ie. single call or chat)
 def edge_route_by_ai_behavior_mode(state: AgentState):
@@ -46,20 +62,43 @@ def edge_route_by_ai_behavior_mode(state: AgentState):
 graph_builder.add_conditional_edges(
     START,
     edge_route_by_ai_behavior_mode,
-    {"chat": "planner", "single_call": "single_call"},
+    {"chat": "fast_path_router", "single_call": "single_call"},
+)
+
+
+# === FAST PATH ROUTER - skip the planner for trivial requests (ie. "clock me in")
+graph_builder.add_node(
+    "fast_path_router", instrument_node("fast_path_router", node_fast_path_router)
+)
+
+
+def edge_fast_path_decision(state: AgentState):
+    if state.get("next_node") == "tools":
+        return "tools"  # Prebuilt tool call - straight to execution
+    return "planner"
+
+
+graph_builder.add_conditional_edges(
+    "fast_path_router",
+    edge_fast_path_decision,
+    {"tools": "tools", "planner": "planner"},
 )
 
 
-def node_single_call(state: AgentState, config: RunnableConfig):
-    response = single_call_llm.invoke(state["messages"])
+async def node_single_call(state: AgentState, config: RunnableConfig):
+    # Opt-in cache for repeated one shot prompts
+    cache = get_response_cache(config["configurable"].get("single_call_cache"))
+    response = await ainvoke_with_cache(
+        llm_config.get_node_llm("single_call", config), state["messages"], cache
+    )
     return {"messages": [response]}
 
 
-graph_builder.add_node("single_call", node_single_call)
+graph_builder.add_node("single_call", instrument_node("single_call", node_single_call))
 
 
 # === PLANNER - Decide next step
-graph_builder.add_node("planner", node_planner)
+graph_builder.add_node("planner", instrument_node("planner", node_planner))
 
 
 # Decide next step based on planner decision
@@ -67,8 +106,12 @@ def edge_planner_decision(state: AgentState):
     next_node = state.get("next_node")
     if next_node == "tool_caller":
         return "tool_caller"
+    elif next_node == "tools":
+        return "tools"  # Fused planner already wrote the tool call
     elif next_node == "response_generator":
         return "response_generator"
+    elif next_node == "response_generated":
+        return "summarize_history"  # Speculative response generator already answered
     else:
         raise ValueError(f"Invalid next action: {next_node}")
 
@@ -78,16 +121,27 @@ graph_builder.add_conditional_edges(
     edge_planner_decision,
     {
         "tool_caller": "tool_caller",
+        "tools": "tools",
         "response_generator": "response_generator",
+        "summarize_history": "summarize_history",
     },
 )
 
 # === RESPONSE GENERATOR
-graph_builder.add_node("response_generator", node_response_generator)
-graph_builder.add_edge("response_generator", END)
+graph_builder.add_node(
+    "response_generator",
+    instrument_node("response_generator", node_response_generator),
+)
+graph_builder.add_edge("response_generator", "summarize_history")
+
+# === SUMMARIZE HISTORY - fold messages older than the horizon into the conversation summary
+graph_builder.add_node(
+    "summarize_history", instrument_node("summarize_history", node_summarize_history)
+)
+graph_builder.add_edge("summarize_history", END)
 
 # === TOOL EXECUTOR
-graph_builder.add_node("tool_caller", node_tool_caller)
+graph_builder.add_node("tool_caller", instrument_node("tool_caller", node_tool_caller))
 
 
 # Add conditional edge for tool_caller to route based on next_node
@@ -117,54 +171,56 @@ graph_builder.add_conditional_edges(
 #     # with set_tool_context({"timezone": timezone, "language": language}):
 #     return ToolNode(get_all_tools()).ainvoke(state)  # , config)
 
-graph_builder.add_node("tools", ToolNode(get_all_tools()))
+tool_node = ToolNode(get_all_tools())
 
-graph_builder.add_edge("tools", "execute_ai_request_on_client")
 
+# Function around the prebuilt ToolNode so it can be instrumented like the other nodes
+async def node_tools(state: AgentState, config: RunnableConfig):
+    return await tool_node.ainvoke(state, config)
+
+
+graph_builder.add_node("tools", instrument_node("tools", node_tools))
+
+graph_builder.add_edge("tools", "execute_ai_request_on_server")
+
+
+# === EXECUTE AI REQUEST ON SERVER
+# Read only info requests are answered from Postgres when enabled - skips the client round-trip
+graph_builder.add_node(
+    "execute_ai_request_on_server",
+    instrument_node("execute_ai_request_on_server", node_execute_ai_request_on_server),
+)
 
-# === EXECUTE AI REQUEST ON CLIENT
-# Node interrupted - client expected to respond and update tool message with result
-def node_execute_ai_request_on_client(state: AgentState):
-    # Get the client's response to the AI request
-    ai_request_result = interrupt("Provide client ai request execution result:")
-
-    # Get the current messages
-    messages = state["messages"]
-
-    if not messages:
-        return {
-            "messages": [],
-            "prev_node_feedback": "Error: No messages found in state to update.",
-        }
-
-    # Get the last message (assumed to be a tool message)
-    last_message = messages[-1]
-
-    # Create an updated version of the last message with the same ID
-    # This will cause add_messages to replace the original
-    from langchain_core.messages import ToolMessage
-
-    # Create a new tool message with the same ID and tool_call_id (if present)
-    updated_message = ToolMessage(
-        content=ai_request_result,
-        tool_call_id=getattr(last_message, "tool_call_id", None),
-        id=last_message.id if hasattr(last_message, "id") else None,
-    )
 
-    # Return updated state
-    # The add_messages reducer will handle replacing the old message with the new one
-    return {"messages": [updated_message], "prev_node_feedback": ""}
+def edge_server_execution_decision(state: AgentState):
+    if state.get("next_node") == "planner":
+        return "planner"  # Every request was answered on the server
+    return "execute_ai_request_on_client"
 
 
+graph_builder.add_conditional_edges(
+    "execute_ai_request_on_server",
+    edge_server_execution_decision,
+    {
+        "planner": "planner",
+        "execute_ai_request_on_client": "execute_ai_request_on_client",
+    },
+)
+
+
+# === EXECUTE AI REQUEST ON CLIENT
+# Node interrupted - client expected to respond and update tool message(s) with result
 graph_builder.add_node(
-    "execute_ai_request_on_client", node_execute_ai_request_on_client
+    "execute_ai_request_on_client",
+    instrument_node("execute_ai_request_on_client", node_execute_ai_request_on_client),
 )
 
 
 graph_builder.add_edge("execute_ai_request_on_client", "planner")
 
 # === Compile Graph ===
-# No memory is needed for cloud
+# No memory is needed for cloud - self-hosted deployments set CHECKPOINTER_BACKEND (sqlite or postgres)
 graph = graph_builder.compile(
     # interrupt_before=["execute_ai_request_on_client"],
+    checkpointer=create_checkpointer(os.environ.get("CHECKPOINTER_BACKEND")),
 )
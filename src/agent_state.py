@@ -1,10 +1,12 @@
 from typing import Annotated, Optional
 from typing_extensions import TypedDict
-from langgraph.graph.message import add_messages
 from enum import Enum
 
+from src.message_store import IndexedMessages, add_messages_indexed
+
 
 # https://langchain-ai.github.io/langgraph/reference/graphs/#langgraph.graph.message.add_messages
+# messages uses add_messages_indexed - same merge rules, with an id -> index map (src/message_store.py)
 
 # State keys without an annotation will be overwritten by each update, storing the most recent value.
 
@@ -15,7 +17,7 @@ class AiBehaviorMode(Enum):
 
 
 class AgentState(TypedDict):
-    messages: Annotated[list, add_messages]
+    messages: Annotated[IndexedMessages, add_messages_indexed]
 
     # Single or chat mode behavior
     ai_behavior_mode: Optional[str] = None
@@ -34,3 +36,10 @@ class AgentState(TypedDict):
 
     # Next Node to go to
     next_node: Optional[str] = None
+
+    # Running summary of the messages folded out of the message list (src/nodes/node_summarize_history.py)
+    conversation_summary: Optional[str] = None
+
+    # Plan template cache state of the current turn - the planner steps recorded so far, or the cached
+    # steps being replayed (src/plan_cache.py)
+    plan_template: Optional[dict] = None
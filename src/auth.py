@@ -0,0 +1,95 @@
+import os
+from typing import Optional, Sequence
+
+import jwt
+from dotenv import load_dotenv
+from langchain_core.runnables.config import RunnableConfig
+from langgraph_sdk import Auth
+from langgraph_sdk.auth.types import BaseUser, StudioUser
+
+# Custom auth for the LangGraph server (langgraph.json "auth"). A request with a bearer token is
+# authenticated by checking it as a Supabase access token - signed with the project's JWT secret
+# (SUPABASE_JWT_SECRET) for the "authenticated" audience - and the server passes the user on to the
+# run in configurable["langgraph_auth_user"], which the client can't set.
+# Requests without a token still run as an unauthenticated user, so features that need a verified
+# identity (server info requests, the plan template cache) are just off for them.
+
+load_dotenv()
+
+SUPABASE_JWT_AUDIENCE = "authenticated"
+
+auth = Auth()
+
+
+class SupabaseUser:
+    """User whose Supabase access token was verified - identity is the Supabase user id"""
+
+    __slots__ = ("_identity", "_is_authenticated")
+
+    def __init__(self, identity: str, is_authenticated: bool = True):
+        self._identity = identity
+        self._is_authenticated = is_authenticated
+
+    @property
+    def is_authenticated(self) -> bool:
+        return self._is_authenticated
+
+    @property
+    def display_name(self) -> str:
+        return self._identity
+
+    @property
+    def identity(self) -> str:
+        return self._identity
+
+    @property
+    def permissions(self) -> Sequence[str]:
+        return ["authenticated"] if self._is_authenticated else []
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in ("identity", "display_name", "is_authenticated", "permissions")
+
+    def __iter__(self):
+        return iter(("identity", "display_name", "is_authenticated", "permissions"))
+
+
+def verify_supabase_token(token: str) -> str:
+    """Supabase user id of a valid access token - raises jwt.InvalidTokenError otherwise"""
+    secret = os.environ.get("SUPABASE_JWT_SECRET")
+    if not secret:
+        raise jwt.InvalidTokenError("SUPABASE_JWT_SECRET is not set")
+    claims = jwt.decode(
+        token,
+        secret,
+        algorithms=["HS256"],
+        audience=SUPABASE_JWT_AUDIENCE,
+        options={"require": ["sub", "exp"]},
+    )
+    return claims["sub"]
+
+
+@auth.authenticate
+async def authenticate(authorization: Optional[str]) -> SupabaseUser:
+    if not authorization:
+        return SupabaseUser("anonymous", is_authenticated=False)
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise Auth.exceptions.HTTPException(status_code=401, detail="Expected a bearer token")
+    try:
+        return SupabaseUser(verify_supabase_token(token))
+    except jwt.InvalidTokenError as e:
+        raise Auth.exceptions.HTTPException(status_code=401, detail=f"Invalid access token: {e}")
+
+
+def get_verified_user_id(config: RunnableConfig) -> Optional[str]:
+    """Supabase user id the server authenticated for this run, None if nothing verified the caller"""
+    # configurable["user_id"] is whatever the client sent - only the user the server's auth handler
+    # put in the run is trusted. Anything the client could send is plain JSON, never a BaseUser.
+    user = config["configurable"].get("langgraph_auth_user")
+    # Studio users are developers, identified by a username rather than a Supabase user id
+    if not isinstance(user, BaseUser) or isinstance(user, StudioUser) or not user.is_authenticated:
+        return None
+    return user.identity or None
@@ -1,9 +1,52 @@
+from enum import Enum
 from typing_extensions import TypedDict
 
 
+class PlannerMode(Enum):
+    # Planner decides, then tool_caller makes a second call to write the tool call
+    TWO_HOP = "two_hop"
+    # One planner call returns both the plan update and the tool call
+    FUSED = "fused"
+
+
 class ConfigSchema(TypedDict):
-    # user_id: str
+    # Supabase user id of the requesting user, as sent by the client - not verified, so it is never
+    # used to scope database queries
+    user_id: str
     # org_id: str
     timezone_offset_minutes: int
+    # Skip the planner for trivial high confidence requests (ie. "show my tasks") - defaults to True
+    fast_path_enabled: bool
+    # PlannerMode value - defaults to two_hop
+    planner_mode: str
+    # Let the tool caller batch independent info requests (find_tasks, find_notes, get_shift_logs) - defaults to False
+    parallel_tool_calls: bool
+    # Encode client results for ai requests as compact tables before they go into state - defaults to True
+    compact_client_results: bool
+    # Response cache backend for single_call mode - "memory", "sqlite" or unset to disable
+    single_call_cache: str
+    # Run read only info requests (find_tasks, find_notes, get_shift_logs) the user doesn't need to see
+    # against Postgres instead of interrupting for the client - defaults to False. Only for runs whose
+    # access token the server verified (src/auth.py), the client's user_id isn't trusted
+    server_info_requests: bool
+    # Providers each node is routed across (fastest healthy first), ie. {"planner": ["groq-llama-3.3-70b", "openai-gpt-4o-mini"]}
+    # Nodes: planner, tool_caller, response_generator, single_call, note_diff, summarizer - unset nodes use the default model
+    llm_routing: dict
+    # Fire the next provider when a routed request is slower than the provider's p95 - defaults to True
+    llm_hedging: bool
+    # Model tier per node, "small" (8B) or "large" (70B), ie. {"response_generator": "large"}
+    # Defaults: planner and note_diff large, tool_caller, response_generator, single_call and summarizer small.
+    # Small tier tool calls that fail validation are retried on the large model
+    llm_tiers: dict
+    # Start the predicted next node (tool_caller or response_generator) during the planner call, kept
+    # when the planner agrees - kept responses arrive as one message instead of streamed tokens, defaults to False
+    speculative_execution: bool
+    # Messages kept verbatim in state - older ones are folded into conversation_summary at the end of a
+    # turn, defaults to 40, 0 disables summarization
+    summary_horizon_messages: int
+    # Replay the stored plan and tool calls for a repeated request (same user, normalized request and ui_context)
+    # instead of calling the planner - defaults to False. Only for runs whose access token the server
+    # verified (src/auth.py), templates are scoped to that user
+    plan_template_cache: bool
     # language: str
     # conversation_type: ConversationType
@@ -0,0 +1,163 @@
+import json
+import logging
+from collections import OrderedDict
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+
+from src.instrumentation import record_prompt_tokens
+
+logger = logging.getLogger(__name__)
+
+# Builds the recent message context each node sends to the LLM, bounded by a token budget instead
+# of a message count. A single large tool result (ie. a find_tasks payload) is truncated to fit
+# rather than blowing up the prompt.
+
+# Fast local estimate - roughly 4 characters per token for English text and JSON
+CHARS_PER_TOKEN = 4
+# Role / formatting tokens the provider adds around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class ContextBudget:
+    """Token and message limits for one node's context"""
+
+    def __init__(self, max_tokens: int, max_messages: int, max_tool_message_tokens: int):
+        self.max_tokens = max_tokens
+        self.max_messages = max_messages
+        self.max_tool_message_tokens = max_tool_message_tokens
+
+
+# Message limits match the previous trim_messages settings of each node
+NODE_CONTEXT_BUDGETS = {
+    "planner": ContextBudget(
+        max_tokens=4000, max_messages=10, max_tool_message_tokens=1000
+    ),
+    "tool_caller": ContextBudget(
+        max_tokens=3000, max_messages=5, max_tool_message_tokens=1500
+    ),
+    "response_generator": ContextBudget(
+        max_tokens=6000, max_messages=12, max_tool_message_tokens=2000
+    ),
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+# Token counts are memoized by message id so each message is only measured once per thread
+_MAX_CACHED_MESSAGES = 10_000
+_message_token_cache: OrderedDict = OrderedDict()
+
+
+def estimate_message_tokens(message: BaseMessage) -> int:
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+    cache_key = (message.id, len(content)) if message.id else None
+    if cache_key in _message_token_cache:
+        return _message_token_cache[cache_key]
+
+    tokens = estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+    if isinstance(message, AIMessage) and message.tool_calls:
+        tokens += estimate_tokens(json.dumps(message.tool_calls))
+
+    if cache_key is not None:
+        _message_token_cache[cache_key] = tokens
+        if len(_message_token_cache) > _MAX_CACHED_MESSAGES:
+            _message_token_cache.popitem(last=False)
+    return tokens
+
+
+def estimate_prompt_tokens(messages: list[BaseMessage]) -> int:
+    return sum(estimate_message_tokens(message) for message in messages)
+
+
+def truncate_tool_message(message: ToolMessage, max_tokens: int) -> ToolMessage:
+    """Cut an oversized tool result down to max_tokens, marking how much was dropped"""
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(content) <= max_chars:
+        return message
+
+    truncated_content = (
+        content[:max_chars]
+        + f"\n... [truncated {len(content) - max_chars} characters of the result]"
+    )
+    # Same id and tool_call_id so the message still pairs with its tool call
+    return message.model_copy(update={"content": truncated_content})
+
+
+def build_context(messages: list[BaseMessage], node: str) -> list[BaseMessage]:
+    """Most recent messages that fit the node's budget, starting on a user message
+
+    Walks backwards from the newest message and stops as soon as the budget is used up, so the
+    cost depends on the size of the window and not the length of the whole history.
+    """
+    budget = NODE_CONTEXT_BUDGETS[node]
+
+    window = []
+    used_tokens = 0
+    for message in reversed(messages):
+        if len(window) >= budget.max_messages:
+            break
+        if isinstance(message, ToolMessage):
+            message = truncate_tool_message(message, budget.max_tool_message_tokens)
+        message_tokens = estimate_message_tokens(message)
+        if window and used_tokens + message_tokens > budget.max_tokens:
+            break
+        window.append(message)
+        used_tokens += message_tokens
+    window.reverse()
+
+    # Start on a user message so tool results are never separated from their tool call
+    for index, message in enumerate(window):
+        if isinstance(message, HumanMessage):
+            return window[index:]
+
+    # The current turn is longer than the budget - keep the user's request and the most recent
+    # complete tool call / tool result pairs
+    latest_human_message = next(
+        (message for message in reversed(messages) if isinstance(message, HumanMessage)),
+        None,
+    )
+    if latest_human_message is None:
+        return []
+    for index, message in enumerate(window):
+        if isinstance(message, AIMessage):
+            return [latest_human_message] + window[index:]
+    return [latest_human_message]
+
+
+class PromptTokenStats:
+    """Estimated prompt tokens sent per node"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.calls: dict[str, int] = {}
+        self.total_tokens: dict[str, int] = {}
+
+    def record(self, node: str, tokens: int):
+        self.calls[node] = self.calls.get(node, 0) + 1
+        self.total_tokens[node] = self.total_tokens.get(node, 0) + tokens
+
+    def summary(self) -> dict:
+        return {
+            node: {
+                "calls": calls,
+                "avg_prompt_tokens": round(self.total_tokens[node] / calls),
+            }
+            for node, calls in self.calls.items()
+        }
+
+
+prompt_token_stats = PromptTokenStats()
+
+
+def log_prompt_tokens(node: str, prompt_messages: list[BaseMessage]) -> int:
+    tokens = estimate_prompt_tokens(prompt_messages)
+    prompt_token_stats.record(node, tokens)
+    # Goes on the node's instrumentation event
+    record_prompt_tokens(tokens)
+    logger.debug("%s prompt tokens: ~%d (%d messages)", node, tokens, len(prompt_messages))
+    return tokens
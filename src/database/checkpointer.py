@@ -0,0 +1,844 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+from src.database.postgres_client import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Durable checkpointer for local and self-hosted deployments, so threads interrupted at
+# execute_ai_request_on_client survive a restart. Backed by SQLite (WAL) or Postgres.
+# - Channel values are stored as blobs per channel version, so a checkpoint only writes the
+#   channels that changed (like the official savers)
+# - List channels (messages) are written as deltas - only the items that changed since the previous
+#   version, chained back to the last full value (at most MAX_DELTA_CHAIN deltas). A delta only
+#   builds on the remembered value when the parent checkpoint in the database has that version, so
+#   a value another worker moved on from is written in full
+# - Writes that arrive together (parallel tasks, concurrent threads) are committed in one
+#   transaction - each call still returns only once its data is committed
+# - Only the newest keep_checkpoints checkpoints of a thread are kept - pruned in the background,
+#   after the writers are released. Puts and prunes of a thread hold the thread's lock, so a prune
+#   never sees half of a put
+# Async only - the graph is driven through the async API.
+# LangGraph Cloud brings its own checkpointer - set CHECKPOINTER_BACKEND to use this one instead.
+
+# Deltas chained on a full value before the next full value - bounds the blobs read per channel
+MAX_DELTA_CHAIN = 16
+DEFAULT_KEEP_CHECKPOINTS = 20
+# Prune a thread once every this many checkpoints
+PRUNE_EVERY_PUTS = 10
+# List values remembered per thread and channel, to diff the next version against
+MAX_CACHED_CHANNELS = 1024
+DEFAULT_SQLITE_PATH = os.environ.get("CHECKPOINTER_SQLITE_PATH", "checkpoints.sqlite")
+
+_EMPTY = "empty"
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS agent_checkpoints (
+        thread_id TEXT NOT NULL,
+        checkpoint_ns TEXT NOT NULL DEFAULT '',
+        checkpoint_id TEXT NOT NULL,
+        parent_checkpoint_id TEXT,
+        type TEXT NOT NULL,
+        checkpoint {blob} NOT NULL,
+        metadata_type TEXT NOT NULL,
+        metadata {blob} NOT NULL,
+        PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS agent_checkpoint_blobs (
+        thread_id TEXT NOT NULL,
+        checkpoint_ns TEXT NOT NULL DEFAULT '',
+        channel TEXT NOT NULL,
+        version TEXT NOT NULL,
+        type TEXT NOT NULL,
+        blob {blob},
+        -- JSON list of versions from the full value to the previous version, NULL for full values
+        base_versions TEXT,
+        PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS agent_checkpoint_writes (
+        thread_id TEXT NOT NULL,
+        checkpoint_ns TEXT NOT NULL DEFAULT '',
+        checkpoint_id TEXT NOT NULL,
+        task_id TEXT NOT NULL,
+        idx INTEGER NOT NULL,
+        channel TEXT NOT NULL,
+        type TEXT NOT NULL,
+        blob {blob} NOT NULL,
+        task_path TEXT NOT NULL DEFAULT '',
+        PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+    )
+    """,
+]
+
+
+# === STORES
+# Row level storage - the saver handles serialization, deltas and batching.
+# Checkpoint rows: (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata)
+# Blob rows: (thread_id, checkpoint_ns, channel, version, type, blob, base_versions)
+# Write rows: (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, blob, task_path)
+
+
+class SqliteCheckpointStore:
+    """SQLite in WAL mode - one connection, used from worker threads so the event loop isn't blocked"""
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Durable at each checkpoint in WAL mode without an fsync per commit
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock:
+            for statement in _SCHEMA:
+                self._conn.execute(statement.format(blob="BLOB"))
+
+    def _run(self, function, *args):
+        def locked():
+            with self._lock:
+                return function(*args)
+
+        return asyncio.to_thread(locked)
+
+    async def setup(self):
+        pass
+
+    def _in_transaction(self, function):
+        self._conn.execute("BEGIN")
+        try:
+            result = function()
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+        return result
+
+    async def write_batch(self, checkpoints: list, blobs: list, writes: list, upsert_writes: list):
+        def write():
+            cursor = self._conn.cursor()
+            cursor.executemany(
+                "INSERT OR REPLACE INTO agent_checkpoint_blobs VALUES (?, ?, ?, ?, ?, ?, ?)", blobs
+            )
+            cursor.executemany(
+                "INSERT OR IGNORE INTO agent_checkpoint_writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", writes
+            )
+            cursor.executemany(
+                "INSERT OR REPLACE INTO agent_checkpoint_writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", upsert_writes
+            )
+            cursor.executemany(
+                "INSERT OR REPLACE INTO agent_checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)", checkpoints
+            )
+
+        await self._run(self._in_transaction, write)
+
+    async def list_checkpoints(
+        self, thread_id: Optional[str], checkpoint_ns: Optional[str], checkpoint_id: Optional[str] = None,
+        before_id: Optional[str] = None, limit: Optional[int] = None,
+    ) -> list[tuple]:
+        conditions, args = [], []
+        for column, operator, value in (
+            ("thread_id", "=", thread_id),
+            ("checkpoint_ns", "=", checkpoint_ns),
+            ("checkpoint_id", "=", checkpoint_id),
+            ("checkpoint_id", "<", before_id),
+        ):
+            if value is not None:
+                conditions.append(f"{column} {operator} ?")
+                args.append(value)
+        query = "SELECT * FROM agent_checkpoints"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY checkpoint_id DESC"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        return await self._run(lambda: self._conn.execute(query, args).fetchall())
+
+    async def load_blobs(self, thread_id: str, checkpoint_ns: str, keys: list[tuple[str, str]]) -> dict:
+        if not keys:
+            return {}
+
+        def load():
+            rows = {}
+            # Bounded so the statement stays under SQLite's parameter limit
+            for start in range(0, len(keys), 400):
+                chunk = keys[start : start + 400]
+                placeholders = ", ".join("(?, ?)" for _ in chunk)
+                for channel, version, type_, blob, base_versions in self._conn.execute(
+                    f"SELECT channel, version, type, blob, base_versions FROM agent_checkpoint_blobs "
+                    f"WHERE thread_id = ? AND checkpoint_ns = ? AND (channel, version) IN (VALUES {placeholders})",
+                    [thread_id, checkpoint_ns, *[part for key in chunk for part in key]],
+                ):
+                    rows[(channel, version)] = (type_, blob, base_versions)
+            return rows
+
+        return await self._run(load)
+
+    async def load_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_ids: list[str]) -> dict:
+        if not checkpoint_ids:
+            return {}
+
+        def load():
+            placeholders = ", ".join("?" for _ in checkpoint_ids)
+            writes = {}
+            for checkpoint_id, task_id, channel, type_, blob in self._conn.execute(
+                f"SELECT checkpoint_id, task_id, channel, type, blob FROM agent_checkpoint_writes "
+                f"WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id IN ({placeholders}) "
+                f"ORDER BY checkpoint_id, task_id, idx",
+                [thread_id, checkpoint_ns, *checkpoint_ids],
+            ):
+                writes.setdefault(checkpoint_id, []).append((task_id, channel, type_, blob))
+            return writes
+
+        return await self._run(load)
+
+    async def blob_versions(self, thread_id: str, checkpoint_ns: str) -> list[tuple]:
+        return await self._run(
+            lambda: self._conn.execute(
+                "SELECT channel, version, base_versions FROM agent_checkpoint_blobs "
+                "WHERE thread_id = ? AND checkpoint_ns = ?",
+                [thread_id, checkpoint_ns],
+            ).fetchall()
+        )
+
+    async def delete(self, thread_id: str, checkpoint_ns: str, checkpoint_ids: list[str], blob_keys: list[tuple]):
+        def delete():
+            cursor = self._conn.cursor()
+            for table in ("agent_checkpoints", "agent_checkpoint_writes"):
+                cursor.executemany(
+                    f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    [(thread_id, checkpoint_ns, checkpoint_id) for checkpoint_id in checkpoint_ids],
+                )
+            cursor.executemany(
+                "DELETE FROM agent_checkpoint_blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                [(thread_id, checkpoint_ns, channel, version) for channel, version in blob_keys],
+            )
+
+        await self._run(self._in_transaction, delete)
+
+    async def delete_thread(self, thread_id: str):
+        def delete():
+            for table in ("agent_checkpoints", "agent_checkpoint_blobs", "agent_checkpoint_writes"):
+                self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", [thread_id])
+
+        await self._run(self._in_transaction, delete)
+
+    def close(self):
+        self._conn.close()
+
+
+class PostgresCheckpointStore:
+    """Postgres through the shared asyncpg pool in src/database/postgres_client.py"""
+
+    async def setup(self):
+        async with get_db_connection() as conn:
+            for statement in _SCHEMA:
+                await conn.execute(statement.format(blob="BYTEA"))
+
+    async def write_batch(self, checkpoints: list, blobs: list, writes: list, upsert_writes: list):
+        async with get_db_connection() as conn:
+            async with conn.transaction():
+                if blobs:
+                    await conn.executemany(
+                        """INSERT INTO agent_checkpoint_blobs VALUES ($1, $2, $3, $4, $5, $6, $7)
+                        ON CONFLICT (thread_id, checkpoint_ns, channel, version) DO NOTHING""",
+                        blobs,
+                    )
+                if writes:
+                    await conn.executemany(
+                        """INSERT INTO agent_checkpoint_writes VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+                        ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id, task_id, idx) DO NOTHING""",
+                        writes,
+                    )
+                if upsert_writes:
+                    await conn.executemany(
+                        """INSERT INTO agent_checkpoint_writes VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+                        ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+                        DO UPDATE SET channel = EXCLUDED.channel, type = EXCLUDED.type, blob = EXCLUDED.blob""",
+                        upsert_writes,
+                    )
+                if checkpoints:
+                    await conn.executemany(
+                        """INSERT INTO agent_checkpoints VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+                        ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id)
+                        DO UPDATE SET checkpoint = EXCLUDED.checkpoint, metadata = EXCLUDED.metadata""",
+                        checkpoints,
+                    )
+
+    async def list_checkpoints(
+        self, thread_id: Optional[str], checkpoint_ns: Optional[str], checkpoint_id: Optional[str] = None,
+        before_id: Optional[str] = None, limit: Optional[int] = None,
+    ) -> list[tuple]:
+        conditions, args = [], []
+        for column, operator, value in (
+            ("thread_id", "=", thread_id),
+            ("checkpoint_ns", "=", checkpoint_ns),
+            ("checkpoint_id", "=", checkpoint_id),
+            ("checkpoint_id", "<", before_id),
+        ):
+            if value is not None:
+                args.append(value)
+                conditions.append(f"{column} {operator} ${len(args)}")
+        query = "SELECT * FROM agent_checkpoints"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY checkpoint_id DESC"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        async with get_db_connection() as conn:
+            return [tuple(row) for row in await conn.fetch(query, *args)]
+
+    async def load_blobs(self, thread_id: str, checkpoint_ns: str, keys: list[tuple[str, str]]) -> dict:
+        if not keys:
+            return {}
+        async with get_db_connection() as conn:
+            rows = await conn.fetch(
+                """SELECT b.channel, b.version, b.type, b.blob, b.base_versions
+                FROM agent_checkpoint_blobs b
+                JOIN unnest($3::text[], $4::text[]) AS k(channel, version)
+                    ON b.channel = k.channel AND b.version = k.version
+                WHERE b.thread_id = $1 AND b.checkpoint_ns = $2""",
+                thread_id,
+                checkpoint_ns,
+                [channel for channel, _ in keys],
+                [version for _, version in keys],
+            )
+        return {(row["channel"], row["version"]): (row["type"], row["blob"], row["base_versions"]) for row in rows}
+
+    async def load_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_ids: list[str]) -> dict:
+        if not checkpoint_ids:
+            return {}
+        async with get_db_connection() as conn:
+            rows = await conn.fetch(
+                """SELECT checkpoint_id, task_id, channel, type, blob FROM agent_checkpoint_writes
+                WHERE thread_id = $1 AND checkpoint_ns = $2 AND checkpoint_id = ANY($3::text[])
+                ORDER BY checkpoint_id, task_id, idx""",
+                thread_id,
+                checkpoint_ns,
+                checkpoint_ids,
+            )
+        writes = {}
+        for row in rows:
+            writes.setdefault(row["checkpoint_id"], []).append(
+                (row["task_id"], row["channel"], row["type"], row["blob"])
+            )
+        return writes
+
+    async def blob_versions(self, thread_id: str, checkpoint_ns: str) -> list[tuple]:
+        async with get_db_connection() as conn:
+            rows = await conn.fetch(
+                """SELECT channel, version, base_versions FROM agent_checkpoint_blobs
+                WHERE thread_id = $1 AND checkpoint_ns = $2""",
+                thread_id,
+                checkpoint_ns,
+            )
+        return [tuple(row) for row in rows]
+
+    async def delete(self, thread_id: str, checkpoint_ns: str, checkpoint_ids: list[str], blob_keys: list[tuple]):
+        async with get_db_connection() as conn:
+            async with conn.transaction():
+                for table in ("agent_checkpoints", "agent_checkpoint_writes"):
+                    await conn.execute(
+                        f"DELETE FROM {table} WHERE thread_id = $1 AND checkpoint_ns = $2 AND checkpoint_id = ANY($3::text[])",
+                        thread_id,
+                        checkpoint_ns,
+                        checkpoint_ids,
+                    )
+                await conn.execute(
+                    """DELETE FROM agent_checkpoint_blobs b
+                    USING unnest($3::text[], $4::text[]) AS k(channel, version)
+                    WHERE b.thread_id = $1 AND b.checkpoint_ns = $2 AND b.channel = k.channel AND b.version = k.version""",
+                    thread_id,
+                    checkpoint_ns,
+                    [channel for channel, _ in blob_keys],
+                    [version for _, version in blob_keys],
+                )
+
+    async def delete_thread(self, thread_id: str):
+        async with get_db_connection() as conn:
+            async with conn.transaction():
+                for table in ("agent_checkpoints", "agent_checkpoint_blobs", "agent_checkpoint_writes"):
+                    await conn.execute(f"DELETE FROM {table} WHERE thread_id = $1", thread_id)
+
+    def close(self):
+        pass
+
+
+# === SAVER
+
+
+class _Batch:
+    """Rows waiting for the next commit, and the future the writers wait on"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.future = loop.create_future()
+        self.checkpoints: list = []
+        self.blobs: list = []
+        self.writes: list = []
+        self.upsert_writes: list = []
+        self.prune: set = set()
+
+
+class DeltaCheckpointSaver(BaseCheckpointSaver):
+    """Checkpointer writing channel deltas to a SQLite or Postgres store, with group commits and pruning"""
+
+    def __init__(
+        self,
+        store,
+        *,
+        keep_checkpoints: Optional[int] = DEFAULT_KEEP_CHECKPOINTS,
+        deltas: bool = True,
+        group_commit: bool = True,
+        serde=None,
+    ):
+        super().__init__(serde=serde)
+        self.store = store
+        self.keep_checkpoints = keep_checkpoints
+        self.deltas = deltas
+        self.group_commit = group_commit
+        # Pending batch per event loop
+        self._batches: dict[asyncio.AbstractEventLoop, _Batch] = {}
+        # (thread_id, checkpoint_ns, channel) -> (version, list value, versions from the full value to version)
+        self._list_values: OrderedDict = OrderedDict()
+        self._puts_since_prune: dict[tuple[str, str], int] = {}
+        # Lock per event loop and thread, held by puts and prunes - dropped once no one holds it
+        self._thread_locks: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+        # Running background prunes - the event loop only keeps weak references to tasks
+        self._prune_tasks: set[asyncio.Task] = set()
+        # Rows written, by kind - full values vs deltas
+        self.stats = {"full_blobs": 0, "delta_blobs": 0, "commits": 0, "pruned_checkpoints": 0}
+
+    async def setup(self):
+        """Create the tables (Postgres - SQLite creates them when the store is opened)"""
+        await self.store.setup()
+
+    def get_next_version(self, current: Optional[str], channel) -> str:
+        # Sortable string versions, like the official savers
+        if current is None:
+            current_version = 0
+        elif isinstance(current, int):
+            current_version = current
+        else:
+            current_version = int(current.split(".")[0])
+        return f"{current_version + 1:032}.{random.random():016}"
+
+    # --- Channel values
+
+    def _remember_list(self, key: tuple, version: str, value: list, chain: list[str]):
+        # Shallow copy - a reducer appending in place would otherwise change the remembered value too
+        self._list_values[key] = (version, list(value), chain)
+        self._list_values.move_to_end(key)
+        while len(self._list_values) > MAX_CACHED_CHANNELS:
+            self._list_values.popitem(last=False)
+
+    def _blob_row(
+        self, thread_id: str, checkpoint_ns: str, channel: str, version: str, value, parent_versions: dict
+    ) -> tuple:
+        key = (thread_id, checkpoint_ns, channel)
+        if self.deltas and isinstance(value, list):
+            previous = self._list_values.get(key)
+            if (
+                previous is not None
+                and len(previous[2]) < MAX_DELTA_CHAIN
+                # The remembered value is the parent's - not one another worker has moved on from
+                and previous[0] == parent_versions.get(channel)
+            ):
+                _, previous_value, chain = previous
+                # Items the previous version shares - add_messages keeps the existing message objects,
+                # so the identity check settles it without comparing them
+                start = 0
+                for new, old in zip(value, previous_value):
+                    if not (new is old or new == old):
+                        break
+                    start += 1
+                # Appended messages, or the pending ai request's ToolMessage replaced by the client's result
+                if start:
+                    type_, blob = self.serde.dumps_typed({"start": start, "items": value[start:]})
+                    self._remember_list(key, version, value, chain + [version])
+                    self.stats["delta_blobs"] += 1
+                    return (thread_id, checkpoint_ns, channel, version, type_, blob, json.dumps(chain))
+            self._remember_list(key, version, value, [version])
+
+        type_, blob = self.serde.dumps_typed(value)
+        self.stats["full_blobs"] += 1
+        return (thread_id, checkpoint_ns, channel, version, type_, blob, None)
+
+    async def _load_channel_values(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> dict:
+        keys = [(channel, version) for channel, version in versions.items()]
+        rows = await self.store.load_blobs(thread_id, checkpoint_ns, keys)
+
+        # Deltas need the rest of their chain
+        chain_keys = {
+            (channel, base_version)
+            for (channel, _), (_, _, base_versions) in rows.items()
+            if base_versions
+            for base_version in json.loads(base_versions)
+        }
+        missing_keys = [key for key in chain_keys if key not in rows]
+        rows.update(await self.store.load_blobs(thread_id, checkpoint_ns, missing_keys))
+
+        values = {}
+        for channel, version in keys:
+            row = rows.get((channel, version))
+            if row is None or row[0] == _EMPTY:
+                continue
+            type_, blob, base_versions = row
+            if not base_versions:
+                value = self.serde.loads_typed((type_, blob))
+                chain = [version]
+            else:
+                chain = json.loads(base_versions) + [version]
+                # Full value, then each delta keeps the first start items and adds its own
+                base_type, base_blob, _ = rows[(channel, chain[0])]
+                value = self.serde.loads_typed((base_type, base_blob))
+                for delta_version in chain[1:]:
+                    delta_type, delta_blob, _ = rows[(channel, delta_version)]
+                    delta = self.serde.loads_typed((delta_type, delta_blob))
+                    del value[delta["start"] :]
+                    value.extend(delta["items"])
+            if self.deltas and isinstance(value, list):
+                self._remember_list((thread_id, checkpoint_ns, channel), version, value, chain)
+            values[channel] = value
+        return values
+
+    # --- Batching
+
+    async def _commit(self, fill) -> None:
+        """Add rows to the pending batch and wait until they are committed"""
+        if not self.group_commit:
+            batch = _Batch(asyncio.get_running_loop())
+            fill(batch)
+            await self._flush(batch)
+            self._start_prune(batch)
+            return
+
+        loop = asyncio.get_running_loop()
+        batch = self._batches.get(loop)
+        if batch is None:
+            batch = _Batch(loop)
+            self._batches[loop] = batch
+            loop.create_task(self._flush_after_yield(loop, batch))
+        fill(batch)
+        await asyncio.shield(batch.future)
+
+    async def _flush_after_yield(self, loop: asyncio.AbstractEventLoop, batch: _Batch):
+        # Let the other writers of this step add to the batch first
+        await asyncio.sleep(0)
+        if self._batches.get(loop) is batch:
+            del self._batches[loop]
+        try:
+            await self._flush(batch)
+        except BaseException as e:
+            if not batch.future.done():
+                batch.future.set_exception(e)
+            return
+        if not batch.future.done():
+            batch.future.set_result(None)
+        self._start_prune(batch)
+
+    async def _flush(self, batch: _Batch):
+        await self.store.write_batch(batch.checkpoints, batch.blobs, batch.writes, batch.upsert_writes)
+        self.stats["commits"] += 1
+
+    # --- Pruning
+
+    def _start_prune(self, batch: _Batch):
+        """Prune the batch's threads off the writers' path - their rows are already committed"""
+        for thread_id, checkpoint_ns in batch.prune:
+            task = asyncio.ensure_future(self._prune_in_background(thread_id, checkpoint_ns))
+            self._prune_tasks.add(task)
+            task.add_done_callback(self._prune_tasks.discard)
+
+    async def _prune_in_background(self, thread_id: str, checkpoint_ns: str):
+        try:
+            await self.aprune(thread_id, checkpoint_ns)
+        except Exception as e:
+            # Retried with the thread's next prune
+            logger.warning("Failed to prune checkpoints of thread %s: %s", thread_id, e)
+
+    def _thread_lock(self, thread_id: str, checkpoint_ns: str) -> asyncio.Lock:
+        key = (asyncio.get_running_loop(), thread_id, checkpoint_ns)
+        lock = self._thread_locks.get(key)
+        if lock is None:
+            lock = self._thread_locks[key] = asyncio.Lock()
+        return lock
+
+    async def aprune(self, thread_id: str, checkpoint_ns: str = "", keep: Optional[int] = None):
+        """Delete all but the newest keep checkpoints of a thread, with their writes and unused blobs"""
+        keep = self.keep_checkpoints if keep is None else keep
+        if keep is None:
+            return
+        async with self._thread_lock(thread_id, checkpoint_ns):
+            await self._prune(thread_id, checkpoint_ns, keep)
+
+    async def _prune(self, thread_id: str, checkpoint_ns: str, keep: int):
+        rows = await self.store.list_checkpoints(thread_id, checkpoint_ns)
+        if len(rows) <= keep:
+            return
+        kept_rows, pruned_rows = rows[:keep], rows[keep:]
+
+        # Blobs the kept checkpoints use, including the chains their deltas build on
+        used_versions = set()
+        for row in kept_rows:
+            checkpoint = self.serde.loads_typed((row[4], row[5]))
+            used_versions.update(checkpoint["channel_versions"].items())
+        blob_keys = []
+        chains = {}
+        for channel, version, base_versions in await self.store.blob_versions(thread_id, checkpoint_ns):
+            blob_keys.append((channel, version))
+            chains[(channel, version)] = json.loads(base_versions) if base_versions else []
+        for channel, version in list(used_versions):
+            used_versions.update((channel, base_version) for base_version in chains.get((channel, version), []))
+        # Only blobs older than every one the kept checkpoints use - a newer one may belong to a put
+        # from another worker
+        oldest_used = {}
+        for channel, version in used_versions:
+            oldest_used[channel] = min(version, oldest_used.get(channel, version))
+
+        await self.store.delete(
+            thread_id,
+            checkpoint_ns,
+            [row[2] for row in pruned_rows],
+            [
+                (channel, version)
+                for channel, version in blob_keys
+                if (channel, version) not in used_versions
+                and (channel not in oldest_used or version < oldest_used[channel])
+            ],
+        )
+        self.stats["pruned_checkpoints"] += len(pruned_rows)
+        # The remembered list may have been pruned - start the next chain from a full value
+        for key in [key for key in self._list_values if key[0] == thread_id and key[1] == checkpoint_ns]:
+            del self._list_values[key]
+
+    # --- BaseCheckpointSaver
+
+    async def _to_tuple(self, row: tuple, pending_writes: list) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type_, blob, metadata_type, metadata = row
+        checkpoint = self.serde.loads_typed((type_, blob))
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={
+                **checkpoint,
+                "channel_values": await self._load_channel_values(
+                    thread_id, checkpoint_ns, checkpoint["channel_versions"]
+                ),
+            },
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((write_type, write_blob)))
+                for task_id, channel, write_type, write_blob in pending_writes
+            ],
+        )
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        rows = await self.store.list_checkpoints(
+            thread_id, checkpoint_ns, checkpoint_id=get_checkpoint_id(config), limit=1
+        )
+        if not rows:
+            return None
+        writes = await self.store.load_writes(thread_id, checkpoint_ns, [rows[0][2]])
+        return await self._to_tuple(rows[0], writes.get(rows[0][2], []))
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        configurable = (config or {}).get("configurable", {})
+        rows = await self.store.list_checkpoints(
+            configurable.get("thread_id"),
+            configurable.get("checkpoint_ns"),
+            checkpoint_id=get_checkpoint_id(config) if config else None,
+            before_id=get_checkpoint_id(before) if before else None,
+            # Metadata is filtered after loading
+            limit=None if filter else limit,
+        )
+        for row in rows:
+            if limit is not None and limit <= 0:
+                break
+            metadata = self.serde.loads_typed((row[6], row[7]))
+            if filter and not all(metadata.get(key) == value for key, value in filter.items()):
+                continue
+            if limit is not None:
+                limit -= 1
+            writes = await self.store.load_writes(row[0], row[1], [row[2]])
+            yield await self._to_tuple(row, writes.get(row[2], []))
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        async with self._thread_lock(thread_id, checkpoint_ns):
+            return await self._put(config, thread_id, checkpoint_ns, checkpoint, metadata, new_versions)
+
+    async def _parent_versions(self, thread_id: str, checkpoint_ns: str, parent_id: Optional[str]) -> dict:
+        """Channel versions of the parent checkpoint as stored, empty if it isn't stored"""
+        if parent_id is None:
+            return {}
+        rows = await self.store.list_checkpoints(thread_id, checkpoint_ns, checkpoint_id=parent_id, limit=1)
+        if not rows:
+            return {}
+        return self.serde.loads_typed((rows[0][4], rows[0][5]))["channel_versions"]
+
+    async def _put(
+        self,
+        config: RunnableConfig,
+        thread_id: str,
+        checkpoint_ns: str,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        checkpoint = checkpoint.copy()
+        values = checkpoint.pop("channel_values")
+
+        # Deltas build on the parent's stored versions
+        remembered = self.deltas and any(
+            (thread_id, checkpoint_ns, channel) in self._list_values
+            for channel in new_versions
+            if isinstance(values.get(channel), list)
+        )
+        parent_versions = (
+            await self._parent_versions(thread_id, checkpoint_ns, config["configurable"].get("checkpoint_id"))
+            if remembered
+            else {}
+        )
+
+        # Only the channels that changed in this checkpoint are written
+        blobs = [
+            self._blob_row(thread_id, checkpoint_ns, channel, version, values[channel], parent_versions)
+            if channel in values
+            else (thread_id, checkpoint_ns, channel, version, _EMPTY, None, None)
+            for channel, version in new_versions.items()
+        ]
+        type_, blob = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_blob = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        checkpoint_row = (
+            thread_id,
+            checkpoint_ns,
+            checkpoint["id"],
+            config["configurable"].get("checkpoint_id"),
+            type_,
+            blob,
+            metadata_type,
+            metadata_blob,
+        )
+
+        prune_key = (thread_id, checkpoint_ns)
+        self._puts_since_prune[prune_key] = self._puts_since_prune.get(prune_key, 0) + 1
+        prune = self.keep_checkpoints is not None and self._puts_since_prune[prune_key] >= PRUNE_EVERY_PUTS
+        if prune:
+            self._puts_since_prune[prune_key] = 0
+
+        def fill(batch: _Batch):
+            batch.blobs.extend(blobs)
+            batch.checkpoints.append(checkpoint_row)
+            if prune:
+                batch.prune.add(prune_key)
+
+        await self._commit(fill)
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = [
+            (
+                thread_id,
+                checkpoint_ns,
+                checkpoint_id,
+                task_id,
+                WRITES_IDX_MAP.get(channel, index),
+                channel,
+                *self.serde.dumps_typed(value),
+                task_path,
+            )
+            for index, (channel, value) in enumerate(writes)
+        ]
+        # Special writes (errors, interrupts, resumes) replace the previous one, others are kept once
+        upsert = all(channel in WRITES_IDX_MAP for channel, _ in writes)
+
+        def fill(batch: _Batch):
+            (batch.upsert_writes if upsert else batch.writes).extend(rows)
+
+        await self._commit(fill)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self.store.delete_thread(thread_id)
+        for key in [key for key in self._list_values if key[0] == thread_id]:
+            del self._list_values[key]
+
+
+def create_checkpointer(backend: Optional[str] = None, **kwargs) -> Optional[DeltaCheckpointSaver]:
+    """Checkpointer for a backend name - "sqlite", "postgres" (run setup() first) or None for no checkpointer"""
+    if not backend:
+        return None
+    if backend == "sqlite":
+        return DeltaCheckpointSaver(SqliteCheckpointStore(kwargs.pop("path", DEFAULT_SQLITE_PATH)), **kwargs)
+    if backend == "postgres":
+        return DeltaCheckpointSaver(PostgresCheckpointStore(), **kwargs)
+    raise ValueError(f"Unknown checkpointer backend {backend!r} - use sqlite or postgres")
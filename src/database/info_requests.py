@@ -0,0 +1,263 @@
+import re
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional
+
+from src.database.postgres_client import execute_query
+from src.tools.ai_request_models import AiInfoRequestType
+
+# Server side execution of read only info requests - the same data the client would return,
+# queried straight from Postgres so the graph doesn't wait on a client round-trip.
+# Filters are only added for the args the AI provided, so each combination is its own query
+# text (prepared once per connection) and can use the indexes in migrations/.
+
+# Rows returned per request - the AI only needs a summary, the client shows full lists
+MAX_INFO_REQUEST_ROWS = 50
+
+# current_shift / shift_assignments depend on shift timeframes and overrides the client resolves,
+# so they are still answered by the client
+SERVER_INFO_REQUEST_TYPES = (
+    AiInfoRequestType.FIND_TASKS.value,
+    AiInfoRequestType.FIND_NOTES.value,
+    AiInfoRequestType.SHIFT_LOGS.value,
+)
+
+_USER_NAME_SQL = "concat_ws(' ', {alias}.first_name, {alias}.last_name)"
+
+
+# === Dates
+# The AI writes dates in the user's local time ("2025-03-14", "2025-03-14T17:00", "2025/03/14")
+
+
+def _user_timezone(timezone_offset_minutes: int) -> timezone:
+    return timezone(timedelta(minutes=timezone_offset_minutes or 0))
+
+
+def parse_user_datetime(
+    value: str, timezone_offset_minutes: int = 0, end_of_range: bool = False
+) -> datetime:
+    """Parse an AI provided date, a date-only end of range covers the whole day"""
+    text = value.strip().replace("/", "-").replace("Z", "+00:00")
+    if re.fullmatch(r"\d{4}-\d{2}-\d{2}", text):
+        day = date.fromisoformat(text) + timedelta(days=1 if end_of_range else 0)
+        return datetime.combine(day, time(), _user_timezone(timezone_offset_minutes))
+    parsed = datetime.fromisoformat(text)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=_user_timezone(timezone_offset_minutes))
+    return parsed
+
+
+def parse_days_to_get(
+    days_to_get: list[str], timezone_offset_minutes: int = 0
+) -> list[tuple[datetime, datetime]]:
+    """Ranges for days_to_get entries - "2025/03/14" or "2025/03/10 - 2025/03/14" """
+    ranges = []
+    for day in days_to_get or []:
+        start, _, end = (part.strip() for part in day.partition(" - "))
+        ranges.append(
+            (
+                parse_user_datetime(start, timezone_offset_minutes),
+                parse_user_datetime(end or start, timezone_offset_minutes, end_of_range=True),
+            )
+        )
+    return ranges
+
+
+class _Filters:
+    """WHERE clauses and their named parameters"""
+
+    def __init__(self, params: dict):
+        self.clauses: list[str] = []
+        self.params = params
+
+    def add(self, clause: str, **params):
+        self.clauses.append(clause)
+        self.params.update(params)
+
+    def add_date_range(
+        self, column: str, name: str, start: Optional[str], end: Optional[str], timezone_offset_minutes: int
+    ):
+        if start:
+            self.add(
+                f"{column} >= %({name}_start)s",
+                **{f"{name}_start": parse_user_datetime(start, timezone_offset_minutes)},
+            )
+        if end:
+            self.add(
+                f"{column} < %({name}_end)s",
+                **{f"{name}_end": parse_user_datetime(end, timezone_offset_minutes, end_of_range=True)},
+            )
+
+    def sql(self) -> str:
+        return " AND ".join(self.clauses)
+
+
+def _contains(value: str) -> str:
+    return f"%{value.strip()}%"
+
+
+# === Queries
+
+
+async def find_tasks(args: dict, user_id: str, timezone_offset_minutes: int = 0) -> list[dict]:
+    filters = _Filters({"user_id": user_id, "limit": MAX_INFO_REQUEST_ROWS})
+    # Tasks the user authored, is assigned to, or can see through a project
+    filters.add(
+        """(
+            t.author_user_id = %(user_id)s
+            OR EXISTS (
+                SELECT 1 FROM task_user_assignments own
+                WHERE own.task_id = t.id AND own.user_id = %(user_id)s
+            )
+            OR t.parent_project_id IN (
+                SELECT upa.project_id FROM user_project_assignments upa
+                WHERE upa.user_id = %(user_id)s
+            )
+        )"""
+    )
+    if args.get("task_name"):
+        filters.add("t.name ILIKE %(task_name)s", task_name=_contains(args["task_name"]))
+    if args.get("task_description"):
+        filters.add(
+            "t.description ILIKE %(task_description)s",
+            task_description=_contains(args["task_description"]),
+        )
+    if args.get("task_status"):
+        filters.add("t.status = %(task_status)s", task_status=args["task_status"])
+    if args.get("task_priority"):
+        filters.add("t.priority = %(task_priority)s", task_priority=args["task_priority"])
+    if args.get("estimate_duration_minutes") is not None:
+        filters.add(
+            "t.estimated_duration_minutes = %(estimate_duration_minutes)s",
+            estimate_duration_minutes=int(args["estimate_duration_minutes"]),
+        )
+    if args.get("parent_project_name"):
+        filters.add(
+            "p.name ILIKE %(parent_project_name)s",
+            parent_project_name=_contains(args["parent_project_name"]),
+        )
+    if args.get("author_user_name"):
+        filters.add(
+            f"{_USER_NAME_SQL.format(alias='author')} ILIKE %(author_user_name)s",
+            author_user_name=_contains(args["author_user_name"]),
+        )
+    assigned_user_names = args.get("assigned_user_names")
+    if assigned_user_names == []:
+        # Empty list means unassigned tasks
+        filters.add("NOT EXISTS (SELECT 1 FROM task_user_assignments a WHERE a.task_id = t.id)")
+    elif assigned_user_names:
+        filters.add(
+            f"""EXISTS (
+                SELECT 1 FROM task_user_assignments a
+                JOIN users au ON au.id = a.user_id
+                WHERE a.task_id = t.id
+                AND {_USER_NAME_SQL.format(alias='au')} ILIKE ANY(%(assigned_user_names)s)
+            )""",
+            assigned_user_names=[_contains(name) for name in assigned_user_names],
+        )
+    filters.add_date_range(
+        "t.due_date", "due", args.get("task_due_date_start"), args.get("task_due_date_end"), timezone_offset_minutes
+    )
+    filters.add_date_range(
+        "t.created_at", "created", args.get("task_created_date_start"), args.get("task_created_date_end"), timezone_offset_minutes
+    )
+    filters.add_date_range(
+        "t.updated_at", "updated", args.get("task_updated_date_start"), args.get("task_updated_date_end"), timezone_offset_minutes
+    )
+
+    query = f"""
+      SELECT
+        t.id, t.name, t.description, t.status, t.priority, t.start_date, t.due_date,
+        t.estimated_duration_minutes,
+        p.name AS parent_project_name,
+        {_USER_NAME_SQL.format(alias='author')} AS author_user_name,
+        ARRAY(
+          SELECT {_USER_NAME_SQL.format(alias='u')}
+          FROM task_user_assignments tua
+          JOIN users u ON u.id = tua.user_id
+          WHERE tua.task_id = t.id
+        ) AS assigned_user_names
+      FROM tasks t
+      LEFT JOIN projects p ON p.id = t.parent_project_id
+      LEFT JOIN users author ON author.id = t.author_user_id
+      WHERE {filters.sql()}
+      ORDER BY t.due_date NULLS LAST, t.updated_at DESC
+      LIMIT %(limit)s
+    """
+    return await execute_query(query, filters.params)
+
+
+async def find_notes(args: dict, user_id: str, timezone_offset_minutes: int = 0) -> list[dict]:
+    filters = _Filters({"user_id": user_id, "limit": MAX_INFO_REQUEST_ROWS})
+    # Notes the user authored or can see through a project
+    filters.add(
+        """(
+            n.author_user_id = %(user_id)s
+            OR n.parent_project_id IN (
+                SELECT upa.project_id FROM user_project_assignments upa
+                WHERE upa.user_id = %(user_id)s
+            )
+        )"""
+    )
+    if args.get("note_name"):
+        filters.add("n.name ILIKE %(note_name)s", note_name=_contains(args["note_name"]))
+    filters.add_date_range(
+        "n.created_at", "created", args.get("note_created_date_start"), args.get("note_created_date_end"), timezone_offset_minutes
+    )
+    filters.add_date_range(
+        "n.updated_at", "updated", args.get("note_updated_date_start"), args.get("note_updated_date_end"), timezone_offset_minutes
+    )
+
+    query = f"""
+      SELECT
+        n.id, n.name, n.description, n.created_at, n.updated_at,
+        p.name AS parent_project_name,
+        {_USER_NAME_SQL.format(alias='author')} AS author_user_name
+      FROM notes n
+      LEFT JOIN projects p ON p.id = n.parent_project_id
+      LEFT JOIN users author ON author.id = n.author_user_id
+      WHERE {filters.sql()}
+      ORDER BY n.updated_at DESC
+      LIMIT %(limit)s
+    """
+    return await execute_query(query, filters.params)
+
+
+async def get_shift_logs(args: dict, user_id: str, timezone_offset_minutes: int = 0) -> list[dict]:
+    ranges = parse_days_to_get(args.get("days_to_get"), timezone_offset_minutes)
+    if not ranges:
+        return []
+
+    filters = _Filters({"user_id": user_id})
+    filters.add("sl.user_id = %(user_id)s")
+    range_clauses = []
+    for index, (start, end) in enumerate(ranges):
+        range_clauses.append(
+            f"(sl.clock_in_datetime >= %(start_{index})s AND sl.clock_in_datetime < %(end_{index})s)"
+        )
+        filters.params.update({f"start_{index}": start, f"end_{index}": end})
+    filters.add("(" + " OR ".join(range_clauses) + ")")
+
+    query = f"""
+      SELECT sl.clock_in_datetime, sl.clock_out_datetime, sl.is_break
+      FROM shift_logs sl
+      WHERE {filters.sql()}
+      ORDER BY sl.clock_in_datetime
+    """
+    return await execute_query(query, filters.params)
+
+
+_INFO_REQUEST_QUERIES = {
+    AiInfoRequestType.FIND_TASKS.value: find_tasks,
+    AiInfoRequestType.FIND_NOTES.value: find_notes,
+    AiInfoRequestType.SHIFT_LOGS.value: get_shift_logs,
+}
+
+
+async def execute_info_request(
+    info_request_type: str, args: dict, user_id: str, timezone_offset_minutes: int = 0
+) -> list[dict]:
+    if info_request_type not in _INFO_REQUEST_QUERIES:
+        raise ValueError(f"Info request type can't be executed on the server: {info_request_type}")
+    return await _INFO_REQUEST_QUERIES[info_request_type](
+        args or {}, user_id, timezone_offset_minutes
+    )
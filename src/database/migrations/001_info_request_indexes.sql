@@ -0,0 +1,21 @@
+-- Indexes for the info requests executed on the server (src/database/info_requests.py)
+-- Apply: psql "$POSTGRES_DSN" -f src/database/migrations/001_info_request_indexes.sql
+-- CONCURRENTLY so production tables aren't locked - must run outside a transaction
+
+-- Visibility checks - what the user authored, is assigned to, or can see through a project
+CREATE INDEX CONCURRENTLY IF NOT EXISTS tasks_author_user_id_idx ON tasks (author_user_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS tasks_parent_project_id_due_date_idx ON tasks (parent_project_id, due_date);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS task_user_assignments_user_id_task_id_idx ON task_user_assignments (user_id, task_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS task_user_assignments_task_id_idx ON task_user_assignments (task_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS user_project_assignments_user_id_project_id_idx ON user_project_assignments (user_id, project_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS notes_author_user_id_updated_at_idx ON notes (author_user_id, updated_at DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS notes_parent_project_id_updated_at_idx ON notes (parent_project_id, updated_at DESC);
+
+-- Date range filters
+CREATE INDEX CONCURRENTLY IF NOT EXISTS tasks_due_date_idx ON tasks (due_date);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS shift_logs_user_id_clock_in_datetime_idx ON shift_logs (user_id, clock_in_datetime);
+
+-- Name / description search uses ILIKE '%...%', which needs trigram indexes
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS tasks_name_trgm_idx ON tasks USING gin (name gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS notes_name_trgm_idx ON notes USING gin (name gin_trgm_ops);
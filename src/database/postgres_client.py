@@ -1,51 +1,155 @@
+import asyncio
+import logging
 import os
-from contextlib import contextmanager
-from psycopg2.pool import SimpleConnectionPool
-from psycopg2.extras import RealDictCursor
+import re
+import weakref
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import TYPE_CHECKING, AsyncIterator, Optional
+
 from dotenv import load_dotenv
 
+if TYPE_CHECKING:
+    import asyncpg
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Async Postgres access layer - graph nodes can query without blocking the event loop
+# Connection settings come from the environment, for the local supabase stack use:
+# POSTGRES_HOST=localhost POSTGRES_PORT=54322 POSTGRES_USER=postgres POSTGRES_PASSWORD=postgres
+# POSTGRES_DSN takes precedence over the individual settings when set
+
+POOL_MIN_SIZE = int(os.environ.get("POSTGRES_POOL_MIN_SIZE", 1))
+POOL_MAX_SIZE = int(os.environ.get("POSTGRES_POOL_MAX_SIZE", 10))
+# Prepared statements cached per connection - set to 0 behind pgbouncer in transaction mode
+STATEMENT_CACHE_SIZE = int(os.environ.get("POSTGRES_STATEMENT_CACHE_SIZE", 100))
+# Rows fetched per round-trip when streaming large result sets
+STREAM_PREFETCH_ROWS = 500
+
+_pool: Optional["asyncpg.Pool"] = None
+_pool_loop: Optional[asyncio.AbstractEventLoop] = None
+# Serializes pool creation per event loop, so concurrent first queries share one pool
+_pool_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+
+
+def get_connection_kwargs() -> dict:
+    dsn = os.environ.get("POSTGRES_DSN")
+    if dsn:
+        return {"dsn": dsn}
+    return {
+        "host": os.environ.get("POSTGRES_HOST", "localhost"),
+        "database": os.environ.get("POSTGRES_DATABASE", "postgres"),
+        "user": os.environ.get("POSTGRES_USER", "postgres"),
+        "password": os.environ.get("POSTGRES_PASSWORD"),
+        "port": int(os.environ.get("POSTGRES_PORT", 5432)),
+    }
 
-use_dev_pool = True
 
-if use_dev_pool:
-    os.environ["POSTGRES_HOST"] = "localhost"
-    os.environ["POSTGRES_DATABASE"] = "postgres"
-    os.environ["POSTGRES_USER"] = "postgres"
-    os.environ["POSTGRES_PASSWORD"] = "postgres"
-    os.environ["POSTGRES_PORT"] = "54322"
+async def get_pool() -> "asyncpg.Pool":
+    """Connection pool for the running event loop, created on first use"""
+    # Imported on first use so importing the graph doesn't load the driver
+    import asyncpg
+
+    global _pool, _pool_loop
+    loop = asyncio.get_running_loop()
+    if _pool is not None and _pool_loop is loop:
+        return _pool
+
+    lock = _pool_locks.setdefault(loop, asyncio.Lock())
+    async with lock:
+        if _pool is None or _pool_loop is not loop:
+            previous_pool, previous_loop = _pool, _pool_loop
+            _pool = await asyncpg.create_pool(
+                min_size=POOL_MIN_SIZE,
+                max_size=POOL_MAX_SIZE,
+                statement_cache_size=STATEMENT_CACHE_SIZE,
+                **get_connection_kwargs(),
+            )
+            _pool_loop = loop
+            if previous_pool is not None:
+                _close_pool(previous_pool, previous_loop)
+    return _pool
+
+
+def _close_pool(pool, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+    """Close a pool created on another event loop"""
+    # The pool's connections belong to its loop - close them there if it still runs
+    if loop is not None and loop.is_running():
+        asyncio.run_coroutine_threadsafe(pool.close(), loop)
+        return
+    try:
+        pool.terminate()
+    except Exception as e:
+        logger.warning("Failed to close the previous connection pool: %s", e)
+
 
-# Create a global connection pool
-pool = SimpleConnectionPool(
-    minconn=1,          # Minimum connections in pool
-    maxconn=10,         # Maximum connections in pool
-    host=os.environ.get("POSTGRES_HOST"),
-    database=os.environ.get("POSTGRES_DATABASE"),
-    user=os.environ.get("POSTGRES_USER"),
-    password=os.environ.get("POSTGRES_PASSWORD"),
-    port=os.environ.get("POSTGRES_PORT", 5432)
-)
+def set_pool(pool) -> None:
+    """Use an existing pool (ie. a test database or an in-process stand-in with the same interface)"""
+    global _pool, _pool_loop
+    _pool = pool
+    _pool_loop = asyncio.get_running_loop() if pool is not None else None
 
 
-@contextmanager
-def get_db_connection():
+@asynccontextmanager
+async def get_db_connection():
     """
     Context manager that handles getting and returning connections to the pool
     """
-    conn = pool.getconn()
-    try:
+    pool = await get_pool()
+    async with pool.acquire() as conn:
         yield conn
-    finally:
-        pool.putconn(conn)
 
-def execute_query(query: str, params: dict = None):
-    with get_db_connection() as conn:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(query, params)
-            return cur.fetchall()
+
+# psycopg2 style named parameters (%(user_id)s) -> asyncpg positional parameters ($1)
+_NAMED_PARAMETER = re.compile(r"%\((\w+)\)s")
+
+
+@lru_cache(maxsize=256)
+def compile_query(query: str) -> tuple[str, tuple[str, ...]]:
+    """Convert a query with named parameters, returning it with the parameter names in order"""
+    names = []
+
+    def to_positional(match: re.Match) -> str:
+        name = match.group(1)
+        if name not in names:
+            names.append(name)
+        return f"${names.index(name) + 1}"
+
+    return _NAMED_PARAMETER.sub(to_positional, query), tuple(names)
+
+
+def _query_args(names: tuple[str, ...], params: Optional[dict]) -> list:
+    params = params or {}
+    return [params[name] for name in names]
+
+
+async def execute_query(query: str, params: dict = None) -> list[dict]:
+    pg_query, names = compile_query(query)
+    async with get_db_connection() as conn:
+        rows = await conn.fetch(pg_query, *_query_args(names, params))
+    return [dict(row) for row in rows]
+
+
+async def stream_query(
+    query: str, params: dict = None, prefetch: int = STREAM_PREFETCH_ROWS
+) -> AsyncIterator[dict]:
+    """Yield rows through a server side cursor instead of loading the whole result set"""
+    pg_query, names = compile_query(query)
+    async with get_db_connection() as conn:
+        # Cursors only live inside a transaction
+        async with conn.transaction():
+            async for row in conn.cursor(
+                pg_query, *_query_args(names, params), prefetch=prefetch
+            ):
+                yield dict(row)
+
 
 # Make sure to clean up the pool when shutting down
-def cleanup():
-    if pool:
-        pool.closeall() 
\ No newline at end of file
+async def cleanup():
+    global _pool, _pool_loop
+    if _pool:
+        await _pool.close()
+    _pool = None
+    _pool_loop = None
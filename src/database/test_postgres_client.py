@@ -1,6 +1,9 @@
+import asyncio
+
 from src.database.postgres_client import execute_query
 
 # Run: poetry run python -m src.database.test_postgres_client
 
-result = execute_query("SELECT * FROM shifts")
-print(result)
\ No newline at end of file
+if __name__ == "__main__":
+    result = asyncio.run(execute_query("SELECT * FROM shifts"))
+    print(result)
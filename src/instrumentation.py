@@ -0,0 +1,505 @@
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.tracers.context import register_configure_hook
+from langgraph.errors import GraphBubbleUp
+
+logger = logging.getLogger(__name__)
+
+# Structured per-node instrumentation. Every graph node is wrapped with instrument_node, which
+# records one event per node run - wall time, LLM calls with their wall time and prompt / completion
+# tokens, retries and the iteration count - plus the time each thread spent waiting on the client
+# at an interrupt, and a hash of each prompt's static prefix (record_prompt_prefix). Events go to
+# pluggable sinks: an in-memory ring buffer (default), a JSONL file and a Prometheus text exposition
+# file (for the node_exporter textfile collector).
+# Sinks from the environment:
+# - INSTRUMENTATION_JSONL_PATH - append every event to this file
+# - INSTRUMENTATION_PROMETHEUS_PATH - keep metrics in this file, rewritten at most once a second
+# - INSTRUMENTATION_ENABLED=false - turn the layer off
+
+RING_BUFFER_SIZE = 10_000
+PROMETHEUS_PREFIX = "seren_agent"
+PROMETHEUS_WRITE_INTERVAL_SECONDS = 1.0
+# Histogram buckets in seconds - node and LLM times, and client interrupt waits
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+# Calls made by RoutedChatModel to its providers carry this tag - the routed call is counted instead
+PROVIDER_CALL_TAG = "llm_provider_call"
+
+
+# === SINKS
+
+
+class RingBufferSink:
+    """Keeps the latest events in memory"""
+
+    def __init__(self, maxlen: int = RING_BUFFER_SIZE):
+        self.events: deque = deque(maxlen=maxlen)
+
+    def emit(self, event: dict):
+        self.events.append(event)
+
+    def clear(self):
+        self.events.clear()
+
+    def summary(self) -> dict:
+        """Per node run count, p50 / p95 wall time, LLM time and tokens, and share of all node time"""
+        nodes: dict[str, list[dict]] = {}
+        for event in self.events:
+            if event["event"] == "node":
+                nodes.setdefault(event["node"], []).append(event)
+        total_seconds = sum(event["seconds"] for events in nodes.values() for event in events) or 1.0
+
+        summary = {}
+        for node, events in sorted(nodes.items()):
+            seconds = sorted(event["seconds"] for event in events)
+            summary[node] = {
+                "runs": len(events),
+                "p50_seconds": round(statistics.median(seconds), 4),
+                "p95_seconds": round(seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))], 4),
+                "llm_seconds": round(sum(event["llm_seconds"] for event in events), 3),
+                "input_tokens": sum(event["input_tokens"] for event in events),
+                "output_tokens": sum(event["output_tokens"] for event in events),
+                "retries": sum(event["retries"] for event in events),
+                "share_of_node_time": round(sum(seconds) / total_seconds, 3),
+            }
+        return summary
+
+
+class JsonlSink:
+    """Appends every event as a JSON line"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def emit(self, event: dict):
+        line = json.dumps(event, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class _Histogram:
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+
+def _labels(labels: dict) -> str:
+    return ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+
+
+class PrometheusSink:
+    """Aggregates events into Prometheus counters and histograms - render() returns the exposition text
+
+    With a path, the text is written there (atomically, at most once per write interval) for the
+    node_exporter textfile collector.
+    """
+
+    def __init__(self, path: Optional[str] = None, write_interval: float = PROMETHEUS_WRITE_INTERVAL_SECONDS):
+        self.path = path
+        self.write_interval = write_interval
+        self._last_write = 0.0
+        self._lock = threading.Lock()
+        # {metric name: {label tuple: value or _Histogram}}
+        self.counters: dict[str, dict[tuple, float]] = {}
+        self.histograms: dict[str, dict[tuple, _Histogram]] = {}
+
+    def _inc(self, name: str, labels: dict, value: float = 1.0):
+        series = self.counters.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0.0) + value
+
+    def _observe(self, name: str, labels: dict, value: float):
+        series = self.histograms.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        if key not in series:
+            series[key] = _Histogram()
+        series[key].observe(value)
+
+    def emit(self, event: dict):
+        with self._lock:
+            node = {"node": event.get("node", "")}
+            if event["event"] == "node":
+                self._observe("node_duration_seconds", node, event["seconds"])
+                self._inc("node_runs_total", node)
+                self._inc("node_retries_total", node, event["retries"])
+                if event.get("error"):
+                    self._inc("node_errors_total", node)
+            elif event["event"] == "llm":
+                self._observe("llm_call_duration_seconds", node, event["seconds"])
+                self._inc("llm_tokens_total", {**node, "kind": "prompt"}, event["input_tokens"])
+                self._inc("llm_tokens_total", {**node, "kind": "completion"}, event["output_tokens"])
+                if event.get("error"):
+                    self._inc("llm_errors_total", node)
+            elif event["event"] == "interrupt_wait":
+                self._observe("interrupt_wait_seconds", node, event["seconds"])
+            elif event["event"] == "prompt_prefix":
+                self._inc("prompt_prefix_calls_total", {**node, "repeat": str(event["repeat"]).lower()})
+
+            if self.path and time.monotonic() - self._last_write >= self.write_interval:
+                self._write()
+
+    def render(self) -> str:
+        lines = []
+        for name, series in sorted(self.counters.items()):
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name} counter")
+            for key, value in sorted(series.items()):
+                lines.append(f"{PROMETHEUS_PREFIX}_{name}{{{_labels(dict(key))}}} {value:g}")
+        for name, series in sorted(self.histograms.items()):
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name} histogram")
+            for key, histogram in sorted(series.items()):
+                labels = dict(key)
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(
+                        f"{PROMETHEUS_PREFIX}_{name}_bucket{{{_labels({**labels, 'le': f'{bound:g}'})}}} {count}"
+                    )
+                lines.append(
+                    f"{PROMETHEUS_PREFIX}_{name}_bucket{{{_labels({**labels, 'le': '+Inf'})}}} {histogram.count}"
+                )
+                lines.append(f"{PROMETHEUS_PREFIX}_{name}_sum{{{_labels(labels)}}} {histogram.sum:g}")
+                lines.append(f"{PROMETHEUS_PREFIX}_{name}_count{{{_labels(labels)}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def _write(self):
+        self._last_write = time.monotonic()
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            file.write(self.render())
+        os.replace(temporary_path, self.path)
+
+    def flush(self):
+        if self.path:
+            with self._lock:
+                self._write()
+
+
+# === INSTRUMENTATION
+
+
+class Instrumentation:
+    """Sends events to the registered sinks"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.sinks: list = []
+        self.ring_buffer = RingBufferSink()
+        self.add_sink(self.ring_buffer)
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def remove_sink(self, sink):
+        self.sinks.remove(sink)
+
+    def emit(self, event: dict):
+        for sink in self.sinks:
+            try:
+                sink.emit(event)
+            except Exception as e:
+                # A broken sink must never fail a turn
+                logger.warning("Instrumentation sink %s failed: %s", type(sink).__name__, e)
+
+
+instrumentation = Instrumentation(
+    enabled=os.getenv("INSTRUMENTATION_ENABLED", "true").lower() != "false"
+)
+if os.getenv("INSTRUMENTATION_JSONL_PATH"):
+    instrumentation.add_sink(JsonlSink(os.environ["INSTRUMENTATION_JSONL_PATH"]))
+if os.getenv("INSTRUMENTATION_PROMETHEUS_PATH"):
+    instrumentation.add_sink(PrometheusSink(os.environ["INSTRUMENTATION_PROMETHEUS_PATH"]))
+
+
+class NodeSpan(BaseCallbackHandler):
+    """One node run - also the callback handler that times the run's LLM calls and counts their tokens"""
+
+    # Bookkeeping only - no need to hop to a thread for each callback
+    run_inline = True
+
+    def __init__(self, node: str, thread_id: Optional[str]):
+        self.node = node
+        self.thread_id = thread_id
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.retries = 0
+        # Local estimate from the context builder, for providers that don't report usage
+        self.estimated_prompt_tokens = 0
+        self._llm_starts: dict[UUID, tuple[float, str]] = {}
+
+    def on_chat_model_start(self, serialized: dict, messages: list, *, run_id: UUID, tags: Optional[list[str]] = None, **kwargs: Any):
+        if PROVIDER_CALL_TAG in (tags or []):
+            return
+        model = (kwargs.get("metadata") or {}).get("ls_model_name") or (serialized or {}).get("name", "")
+        self._llm_starts[run_id] = (time.perf_counter(), model)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        input_tokens, output_tokens = _token_usage(response)
+        self._end_llm_call(run_id, input_tokens, output_tokens, None)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._end_llm_call(run_id, 0, 0, f"{type(error).__name__}: {error}")
+
+    def _end_llm_call(self, run_id: UUID, input_tokens: int, output_tokens: int, error: Optional[str]):
+        start = self._llm_starts.pop(run_id, None)
+        if start is None:
+            return
+        start_time, model = start
+        seconds = time.perf_counter() - start_time
+        self.llm_calls += 1
+        self.llm_seconds += seconds
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        instrumentation.emit(
+            {
+                "event": "llm",
+                "timestamp": time.time(),
+                "thread_id": self.thread_id,
+                "node": self.node,
+                "model": model,
+                "seconds": round(seconds, 6),
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "error": error,
+            }
+        )
+
+
+def _token_usage(response: LLMResult) -> tuple[int, int]:
+    """Prompt and completion tokens of an LLM result - usage_metadata, else the provider's token_usage"""
+    input_tokens = output_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+    if not input_tokens and not output_tokens:
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        input_tokens = token_usage.get("prompt_tokens", 0)
+        output_tokens = token_usage.get("completion_tokens", 0)
+    return input_tokens, output_tokens
+
+
+# Current node span - every callback manager created while it's set includes the span as a handler,
+# so LLM calls in the node are measured whatever config they were made with
+_current_span: ContextVar[Optional[NodeSpan]] = ContextVar("instrumentation_node_span", default=None)
+register_configure_hook(_current_span, inheritable=True)
+
+# When each thread was interrupted, by thread id - the wait ends when the node resumes.
+# Abandoned threads never resume, so only the most recently interrupted threads are kept
+_MAX_INTERRUPTED_THREADS = 10_000
+_interrupted_at: OrderedDict[str, float] = OrderedDict()
+
+
+def record_retry():
+    """Count a retry against the running node"""
+    span = _current_span.get()
+    if span is not None:
+        span.retries += 1
+
+
+def record_prompt_tokens(tokens: int):
+    """Add a prompt's estimated tokens to the running node"""
+    span = _current_span.get()
+    if span is not None:
+        span.estimated_prompt_tokens += tokens
+
+
+class PromptPrefixStats:
+    """How often each node's static prompt prefix repeats - a repeated prefix can be served from the
+    provider's prompt cache, a new one can't"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.calls: dict[str, int] = {}
+        self.repeats: dict[str, int] = {}
+        # Repeats of a prefix first seen in another thread
+        self.cross_thread_repeats: dict[str, int] = {}
+        # Thread each prefix hash was first seen in, by node - prefixes are a few constant strings
+        self.prefixes: dict[str, dict[str, Optional[str]]] = {}
+
+    def record(self, node: str, prefix_hash: str, thread_id: Optional[str]) -> bool:
+        """Count a call - returns whether the prefix was seen before"""
+        self.calls[node] = self.calls.get(node, 0) + 1
+        node_prefixes = self.prefixes.setdefault(node, {})
+        repeat = prefix_hash in node_prefixes
+        if repeat:
+            self.repeats[node] = self.repeats.get(node, 0) + 1
+            if node_prefixes[prefix_hash] != thread_id:
+                self.cross_thread_repeats[node] = self.cross_thread_repeats.get(node, 0) + 1
+        else:
+            node_prefixes[prefix_hash] = thread_id
+        return repeat
+
+    def summary(self) -> dict:
+        return {
+            node: {
+                "calls": calls,
+                "distinct_prefixes": len(self.prefixes[node]),
+                "repeat_rate": round(self.repeats.get(node, 0) / calls, 3),
+                "cross_thread_repeat_rate": round(self.cross_thread_repeats.get(node, 0) / calls, 3),
+            }
+            for node, calls in sorted(self.calls.items())
+        }
+
+
+prompt_prefix_stats = PromptPrefixStats()
+
+# Prefix hashes by prefix - the static prefixes are a few constant strings
+_MAX_CACHED_PREFIX_HASHES = 256
+_prefix_hashes: dict[str, str] = {}
+
+
+def record_prompt_prefix(node: str, prefix: str):
+    """Hash the static prefix of a node's prompt and count whether it repeats across calls and threads"""
+    if not instrumentation.enabled:
+        return
+    prefix_hash = _prefix_hashes.get(prefix)
+    if prefix_hash is None:
+        prefix_hash = hashlib.sha256(prefix.encode()).hexdigest()[:16]
+        if len(_prefix_hashes) >= _MAX_CACHED_PREFIX_HASHES:
+            _prefix_hashes.clear()
+        _prefix_hashes[prefix] = prefix_hash
+
+    span = _current_span.get()
+    thread_id = span.thread_id if span is not None else None
+    repeat = prompt_prefix_stats.record(node, prefix_hash, thread_id)
+    instrumentation.emit(
+        {
+            "event": "prompt_prefix",
+            "timestamp": time.time(),
+            "thread_id": thread_id,
+            "node": node,
+            "prefix_hash": prefix_hash,
+            "prefix_chars": len(prefix),
+            "repeat": repeat,
+        }
+    )
+
+
+def _start_span(node: str, config: Optional[dict]) -> NodeSpan:
+    thread_id = ((config or {}).get("configurable") or {}).get("thread_id")
+    interrupted_at = _interrupted_at.pop(thread_id, None) if thread_id else None
+    if interrupted_at is not None:
+        instrumentation.emit(
+            {
+                "event": "interrupt_wait",
+                "timestamp": time.time(),
+                "thread_id": thread_id,
+                "node": node,
+                "seconds": round(time.time() - interrupted_at, 6),
+            }
+        )
+    return NodeSpan(node, thread_id)
+
+
+def _end_span(span: NodeSpan, state: Any, result: Any, seconds: float, error: Optional[BaseException]):
+    interrupted = isinstance(error, GraphBubbleUp)
+    if interrupted and span.thread_id:
+        _interrupted_at[span.thread_id] = time.time()
+        _interrupted_at.move_to_end(span.thread_id)
+        while len(_interrupted_at) > _MAX_INTERRUPTED_THREADS:
+            _interrupted_at.popitem(last=False)
+
+    iteration_count = None
+    if isinstance(result, dict) and "iteration_count" in result:
+        iteration_count = result["iteration_count"]
+    elif isinstance(state, dict):
+        iteration_count = state.get("iteration_count")
+
+    instrumentation.emit(
+        {
+            "event": "node",
+            "timestamp": time.time(),
+            "thread_id": span.thread_id,
+            "node": span.node,
+            "seconds": round(seconds, 6),
+            "llm_calls": span.llm_calls,
+            "llm_seconds": round(span.llm_seconds, 6),
+            "input_tokens": span.input_tokens,
+            "output_tokens": span.output_tokens,
+            "estimated_prompt_tokens": span.estimated_prompt_tokens,
+            "retries": span.retries,
+            "iteration_count": iteration_count,
+            "interrupted": interrupted,
+            "error": None if error is None or interrupted else f"{type(error).__name__}: {error}",
+        }
+    )
+
+
+def instrument_node(name: str, node: Callable) -> Callable:
+    """Wrap a graph node (sync or async function taking state and config) to emit a node event per run"""
+
+    if inspect.iscoroutinefunction(node):
+
+        @functools.wraps(node)
+        async def instrumented_node(state, config):
+            if not instrumentation.enabled:
+                return await node(state, config)
+            span = _start_span(name, config)
+            token = _current_span.set(span)
+            start_time = time.perf_counter()
+            result = error = None
+            try:
+                result = await node(state, config)
+                return result
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                _current_span.reset(token)
+                _end_span(span, state, result, time.perf_counter() - start_time, error)
+
+        return instrumented_node
+
+    @functools.wraps(node)
+    def instrumented_sync_node(state, config):
+        if not instrumentation.enabled:
+            return node(state, config)
+        span = _start_span(name, config)
+        token = _current_span.set(span)
+        start_time = time.perf_counter()
+        result = error = None
+        try:
+            result = node(state, config)
+            return result
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _current_span.reset(token)
+            _end_span(span, state, result, time.perf_counter() - start_time, error)
+
+    return instrumented_sync_node
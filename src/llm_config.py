@@ -1,12 +1,232 @@
-from langchain_anthropic import ChatAnthropic
-from langchain_openai import ChatOpenAI
-from langchain_groq import ChatGroq
+import sys
+from functools import lru_cache
+from typing import Optional
 
+from langchain_core.runnables.config import RunnableConfig
+
+from src import instrumentation
+from src.llm_providers import provider_registry
 from src.tools.tools import get_all_tools
 
-# Define LLMs
-llm = ChatGroq(model="llama-3.3-70b-versatile")
-# llm = ChatOpenAI(model="gpt-4o-mini") - way too slow
-# llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash") - importing the required dependnecy breaks the entire graph
-single_call_llm = ChatGroq(model="llama-3.1-8b-instant")
-llm_with_tools = llm.bind_tools(get_all_tools(), parallel_tool_calls=False)
+# LLM clients are built on first access (ie. llm_config.llm) instead of at import, so importing the
+# graph doesn't pay for the provider SDKs - cold start time governs serverless scale-out latency.
+# Assigning an attribute (ie. install_fake_llms) replaces the lazy client.
+# Nodes use get_llm rather than llm_config.llm - compiling the graph resolves attribute chains in
+# node functions, which would build every client at import.
+
+
+def _build_llm():
+    from langchain_groq import ChatGroq
+
+    return ChatGroq(model="llama-3.3-70b-versatile")
+    # return ChatOpenAI(model="gpt-4o-mini") - way too slow
+    # return ChatGoogleGenerativeAI(model="gemini-2.0-flash") - importing the required dependnecy breaks the entire graph
+
+
+def _build_single_call_llm():
+    from langchain_groq import ChatGroq
+
+    return ChatGroq(model="llama-3.1-8b-instant")
+
+
+# Tool bound models always answer with a tool call ("any" is mapped to each provider's "required"),
+# which rules out the plain text responses the tool caller used to retry on
+TOOL_CHOICE = "any"
+
+
+def _build_llm_with_tools():
+    # Through the module so the lazy (or installed) llm is used
+    return sys.modules[__name__].llm.bind_tools(
+        get_all_tools(), tool_choice=TOOL_CHOICE, parallel_tool_calls=False
+    )
+
+
+# Used when parallel tool calls are enabled - lets the tool caller batch independent info requests
+def _build_llm_with_parallel_tools():
+    return sys.modules[__name__].llm.bind_tools(
+        get_all_tools(), tool_choice=TOOL_CHOICE, parallel_tool_calls=True
+    )
+
+
+def _build_single_call_llm_with_tools():
+    return sys.modules[__name__].single_call_llm.bind_tools(
+        get_all_tools(), tool_choice=TOOL_CHOICE, parallel_tool_calls=False
+    )
+
+
+def _build_single_call_llm_with_parallel_tools():
+    return sys.modules[__name__].single_call_llm.bind_tools(
+        get_all_tools(), tool_choice=TOOL_CHOICE, parallel_tool_calls=True
+    )
+
+
+_LAZY_LLMS = {
+    "llm": _build_llm,
+    "single_call_llm": _build_single_call_llm,
+    "llm_with_tools": _build_llm_with_tools,
+    "llm_with_parallel_tools": _build_llm_with_parallel_tools,
+    "single_call_llm_with_tools": _build_single_call_llm_with_tools,
+    "single_call_llm_with_parallel_tools": _build_single_call_llm_with_parallel_tools,
+}
+
+
+def __getattr__(name: str):
+    # Only called for attributes that aren't set yet - the built client is cached as a module global
+    if name not in _LAZY_LLMS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = _LAZY_LLMS[name]()
+    globals()[name] = value
+    return value
+
+
+def get_llm(name: str = "llm"):
+    """Configured LLM by name, looked up at call time and built on first use"""
+    return getattr(sys.modules[__name__], name)
+
+
+# === PROVIDERS
+# Backends nodes can be routed across with the llm_routing config, ie.
+# {"planner": ["groq-llama-3.3-70b", "openai-gpt-4o-mini"]}
+# Providers are only used when their API key is set
+
+
+@lru_cache(maxsize=None)
+def _build_openai_llm():
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(model="gpt-4o-mini")
+
+
+@lru_cache(maxsize=None)
+def _build_anthropic_llm():
+    from langchain_anthropic import ChatAnthropic
+
+    return ChatAnthropic(model="claude-3-5-haiku-latest")
+
+
+provider_registry.register(
+    "groq-llama-3.3-70b", lambda: get_llm("llm"), required_env=("GROQ_API_KEY",)
+)
+provider_registry.register(
+    "groq-llama-3.1-8b", lambda: get_llm("single_call_llm"), required_env=("GROQ_API_KEY",)
+)
+provider_registry.register(
+    "openai-gpt-4o-mini", _build_openai_llm, required_env=("OPENAI_API_KEY",)
+)
+provider_registry.register(
+    "anthropic-claude-3-5-haiku", _build_anthropic_llm, required_env=("ANTHROPIC_API_KEY",)
+)
+
+# === TIERS
+# Nodes run on the small (8B) or large (70B) model, set per node with the llm_tiers config, ie.
+# {"response_generator": "large"}. Nodes on the small tier escalate to the large one when their
+# output fails validation (see tier_stats for how often that happens).
+
+SMALL_TIER = "small"
+LARGE_TIER = "large"
+
+TIER_LLMS = {
+    SMALL_TIER: "single_call_llm",
+    LARGE_TIER: "llm",
+}
+
+# Tier each node uses when llm_tiers doesn't cover it
+NODE_DEFAULT_TIERS = {
+    "planner": LARGE_TIER,
+    "tool_caller": SMALL_TIER,
+    "response_generator": SMALL_TIER,
+    "single_call": SMALL_TIER,
+    "note_diff": LARGE_TIER,
+    "summarizer": SMALL_TIER,
+}
+
+
+class TierStats:
+    """Calls per node and tier, plus escalations to the large tier and retries within a node"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.calls: dict[str, dict[str, int]] = {}
+        self.escalations: dict[str, int] = {}
+        self.retries: dict[str, int] = {}
+
+    def record_call(self, node: str, tier: str):
+        node_calls = self.calls.setdefault(node, {})
+        node_calls[tier] = node_calls.get(tier, 0) + 1
+
+    def record_escalation(self, node: str):
+        self.escalations[node] = self.escalations.get(node, 0) + 1
+
+    def record_retry(self, node: str):
+        self.retries[node] = self.retries.get(node, 0) + 1
+        instrumentation.record_retry()
+
+    def summary(self) -> dict:
+        return {
+            "calls": self.calls,
+            "escalations": self.escalations,
+            "retries": self.retries,
+        }
+
+
+tier_stats = TierStats()
+
+
+def get_node_tier(node: str, config: Optional[RunnableConfig] = None) -> str:
+    """Tier a node starts on - llm_tiers config, otherwise its default"""
+    configurable = (config or {}).get("configurable", {})
+    tier = (configurable.get("llm_tiers") or {}).get(node, NODE_DEFAULT_TIERS[node])
+    if tier not in TIER_LLMS:
+        raise ValueError(f"Unknown llm tier {tier!r} for {node} - use one of {list(TIER_LLMS)}")
+    return tier
+
+
+def get_escalation_tier(node: str, tier: str, config: Optional[RunnableConfig] = None) -> Optional[str]:
+    """Tier to retry a failed attempt on, None when there's nothing to escalate to"""
+    configurable = (config or {}).get("configurable", {})
+    if (configurable.get("llm_routing") or {}).get(node):
+        return None
+    return LARGE_TIER if tier == SMALL_TIER else None
+
+
+# Tool bound routed models, by (routed model, parallel_tool_calls)
+_routed_llms_with_tools: dict[tuple, object] = {}
+
+
+def get_node_llm(
+    node: str,
+    config: Optional[RunnableConfig] = None,
+    with_tools: bool = False,
+    parallel_tool_calls: bool = False,
+    tier: Optional[str] = None,
+):
+    """LLM for a node - routed across its llm_routing providers if configured, otherwise the model of its tier
+
+    tier overrides the node's configured tier (ie. to escalate after a failed attempt).
+    """
+    configurable = (config or {}).get("configurable", {})
+    provider_names = (configurable.get("llm_routing") or {}).get(node)
+
+    if not provider_names:
+        tier = tier or get_node_tier(node, config)
+        tier_stats.record_call(node, tier)
+        name = TIER_LLMS[tier]
+        if with_tools:
+            name += "_with_parallel_tools" if parallel_tool_calls else "_with_tools"
+        return get_llm(name)
+
+    # Routed nodes aren't tiered - the provider list decides the model
+    tier_stats.record_call(node, "routed")
+    routed_llm = provider_registry.get_routed_model(
+        tuple(provider_names), configurable.get("llm_hedging", True)
+    )
+    if not with_tools:
+        return routed_llm
+    key = (id(routed_llm), parallel_tool_calls)
+    if key not in _routed_llms_with_tools:
+        _routed_llms_with_tools[key] = routed_llm.bind_tools(
+            get_all_tools(), tool_choice=TOOL_CHOICE, parallel_tool_calls=parallel_tool_calls
+        )
+    return _routed_llms_with_tools[key]
@@ -0,0 +1,389 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, Union
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from src.instrumentation import PROVIDER_CALL_TAG
+
+logger = logging.getLogger(__name__)
+
+# Registry of chat model providers with rolling latency and error stats.
+# RoutedChatModel sends each request to the fastest healthy provider of its list, falls back to the
+# next one on errors, and hedges requests slower than the provider's p95 by firing the next
+# provider - the first response wins. Nodes are mapped to provider lists through the llm_routing
+# config (see llm_config.get_node_llm).
+
+# Samples kept per provider
+STATS_WINDOW = 50
+# Hedging needs enough samples for a meaningful p95
+MIN_SAMPLES_FOR_HEDGING = 10
+HEDGE_PERCENTILE = 95
+# A provider is skipped for COOLDOWN_SECONDS after MAX_CONSECUTIVE_ERRORS errors in a row, or when
+# more than MAX_ERROR_RATE of its recent calls failed
+MAX_CONSECUTIVE_ERRORS = 3
+MAX_ERROR_RATE = 0.5
+MIN_SAMPLES_FOR_ERROR_RATE = 5
+COOLDOWN_SECONDS = 30.0
+
+# Calls to the underlying models don't report to the parent run - the routed model reports (and
+# streams tokens) once, whichever provider answered
+_DETACHED_CONFIG = {"callbacks": [], "tags": [PROVIDER_CALL_TAG]}
+
+# Streams of losing providers being closed - referenced until they finish, so they aren't
+# garbage collected mid-close
+_closing_tasks: set[asyncio.Task] = set()
+
+
+class ProviderStats:
+    """Rolling latency and error stats of one provider"""
+
+    def __init__(self, window: int = STATS_WINDOW):
+        # Invoke latency and stream time to first token are tracked separately
+        self.latencies: dict[str, deque] = {
+            "invoke": deque(maxlen=window),
+            "stream": deque(maxlen=window),
+        }
+        self.outcomes: deque = deque(maxlen=window)
+        self.consecutive_errors = 0
+        self.cooldown_until = 0.0
+        self.calls = 0
+        self.errors = 0
+
+    def record_latency(self, kind: str, latency_seconds: float):
+        self.latencies[kind].append(latency_seconds)
+
+    def record_success(self, kind: str, latency_seconds: float):
+        self.calls += 1
+        self.record_latency(kind, latency_seconds)
+        self.outcomes.append(True)
+        self.consecutive_errors = 0
+
+    def record_error(self):
+        self.calls += 1
+        self.errors += 1
+        self.outcomes.append(False)
+        self.consecutive_errors += 1
+        if self.consecutive_errors >= MAX_CONSECUTIVE_ERRORS or (
+            len(self.outcomes) >= MIN_SAMPLES_FOR_ERROR_RATE
+            and self.error_rate > MAX_ERROR_RATE
+        ):
+            self.cooldown_until = time.monotonic() + COOLDOWN_SECONDS
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.cooldown_until
+
+    def percentile(self, kind: str, percent: float, min_samples: int = 1) -> Optional[float]:
+        latencies = self.latencies[kind]
+        if len(latencies) < min_samples or not latencies:
+            return None
+        ordered = sorted(latencies)
+        return ordered[min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))]
+
+    def expected_latency(self, kind: str) -> float:
+        # Providers without samples rank first so they get tried
+        median = self.percentile(kind, 50)
+        return 0.0 if median is None else median
+
+    def summary(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": round(self.error_rate, 3),
+            "healthy": self.healthy,
+            **{
+                f"{kind}_p{percent}_seconds": (
+                    None if value is None else round(value, 3)
+                )
+                for kind in self.latencies
+                for percent in (50, 95)
+                for value in [self.percentile(kind, percent)]
+            },
+        }
+
+
+class LLMProvider:
+    """A named chat model - built by its factory, available when its API keys are set"""
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], BaseChatModel],
+        required_env: tuple[str, ...] = (),
+    ):
+        self.name = name
+        # Called on every lookup, so factories cache their model (see llm_config)
+        self.factory = factory
+        self.required_env = required_env
+
+    @property
+    def available(self) -> bool:
+        return all(os.environ.get(name) for name in self.required_env)
+
+    @property
+    def model(self) -> BaseChatModel:
+        return self.factory()
+
+
+class ProviderRegistry:
+    def __init__(self):
+        self.providers: dict[str, LLMProvider] = {}
+        self.stats: dict[str, ProviderStats] = {}
+        self._routed_models: dict[tuple, "RoutedChatModel"] = {}
+        self.hedges_fired = 0
+        self.hedge_wins = 0
+        self.fallbacks = 0
+
+    def register(
+        self,
+        name: str,
+        model: Union[BaseChatModel, Callable[[], BaseChatModel]],
+        required_env: tuple[str, ...] = (),
+    ) -> LLMProvider:
+        """Add or replace a provider - pass a model instance or a factory"""
+        factory = (lambda: model) if isinstance(model, BaseChatModel) else model
+        self.providers[name] = LLMProvider(name, factory, required_env)
+        self.stats[name] = ProviderStats()
+        return self.providers[name]
+
+    def get_model(self, name: str) -> BaseChatModel:
+        if name not in self.providers:
+            raise ValueError(f"Unknown LLM provider: {name}")
+        return self.providers[name].model
+
+    def rank(self, names: list[str], kind: str = "invoke") -> list[str]:
+        """Available providers, healthy ones fastest first - unhealthy ones are a last resort"""
+        available = [
+            name for name in names if name in self.providers and self.providers[name].available
+        ]
+        healthy = sorted(
+            (name for name in available if self.stats[name].healthy),
+            key=lambda name: self.stats[name].expected_latency(kind),
+        )
+        return healthy + [name for name in available if name not in healthy]
+
+    def get_routed_model(self, names: tuple[str, ...], hedging: bool = True) -> "RoutedChatModel":
+        # Cached so anything keyed on the model (ie. planner prompt layers) is reused
+        key = (tuple(names), hedging)
+        if key not in self._routed_models:
+            self._routed_models[key] = RoutedChatModel(
+                provider_names=list(names),
+                hedging=hedging,
+                registry=self,
+                model_name="routed:" + ",".join(names),
+            )
+        return self._routed_models[key]
+
+    def reset_stats(self):
+        self.stats = {name: ProviderStats() for name in self.providers}
+        self.hedges_fired = 0
+        self.hedge_wins = 0
+        self.fallbacks = 0
+
+    def summary(self) -> dict:
+        return {
+            "hedges_fired": self.hedges_fired,
+            "hedge_wins": self.hedge_wins,
+            "fallbacks": self.fallbacks,
+            "providers": {name: stats.summary() for name, stats in self.stats.items()},
+        }
+
+
+class RoutedChatModel(BaseChatModel):
+    """Chat model that routes every request across the providers of a registry"""
+
+    provider_names: list[str]
+    hedging: bool = True
+    registry: Any = None
+    model_name: str = "routed"
+
+    @property
+    def _llm_type(self) -> str:
+        return "routed-chat-model"
+
+    def bind_tools(self, tools: list, tool_choice: Optional[Any] = None, **kwargs):
+        # Tools are bound to the chosen provider per request
+        formatted_tools = [convert_to_openai_tool(tool) for tool in tools]
+        return self.bind(tools=formatted_tools, tool_choice=tool_choice, **kwargs)
+
+    def _provider_runnable(self, name: str, stop: Optional[list[str]], kwargs: dict):
+        model = self.registry.get_model(name)
+        kwargs = dict(kwargs)
+        if stop:
+            kwargs["stop"] = stop
+        tools = kwargs.pop("tools", None)
+        if tools:
+            return model.bind_tools(tools, **kwargs)
+        return model.bind(**kwargs) if kwargs else model
+
+    async def _timed(self, name: str, kind: str, start: Callable[[str], Awaitable]):
+        stats = self.registry.stats[name]
+        start_time = time.perf_counter()
+        try:
+            result = await start(name)
+        except asyncio.CancelledError:
+            # Lost a hedge - the elapsed time is a lower bound, better than leaving the slow call out
+            stats.record_latency(kind, time.perf_counter() - start_time)
+            raise
+        except Exception:
+            stats.record_error()
+            raise
+        stats.record_success(kind, time.perf_counter() - start_time)
+        return result
+
+    async def _race(
+        self,
+        kind: str,
+        start: Callable[[str], Awaitable],
+        discard: Optional[Callable[[Any], None]] = None,
+    ) -> tuple[str, Any]:
+        """Run start(provider) on the best provider, hedging and falling back - returns (provider, result)"""
+        candidates = self.registry.rank(self.provider_names, kind)
+        if not candidates:
+            raise ValueError(f"No available LLM provider in {self.provider_names}")
+
+        tasks: dict[asyncio.Task, str] = {}
+
+        def launch(name: str):
+            tasks[asyncio.ensure_future(self._timed(name, kind, start))] = name
+
+        primary = candidates.pop(0)
+        launch(primary)
+        hedge_delay = (
+            self.registry.stats[primary].percentile(
+                kind, HEDGE_PERCENTILE, MIN_SAMPLES_FOR_HEDGING
+            )
+            if self.hedging
+            else None
+        )
+        hedged = False
+        last_error: Optional[BaseException] = None
+        try:
+            while tasks:
+                timeout = hedge_delay if hedge_delay is not None and candidates else None
+                done, _ = await asyncio.wait(
+                    tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # Slower than p95 - fire the next provider, the first response wins
+                    self.registry.hedges_fired += 1
+                    hedged = True
+                    hedge_delay = None
+                    launch(candidates.pop(0))
+                    continue
+                for task in done:
+                    name = tasks.pop(task)
+                    if task.exception() is None:
+                        if hedged and name != primary:
+                            self.registry.hedge_wins += 1
+                        return name, task.result()
+                    last_error = task.exception()
+                    logger.warning("LLM provider %s failed: %s", name, last_error)
+                if not tasks and candidates:
+                    self.registry.fallbacks += 1
+                    launch(candidates.pop(0))
+            raise last_error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif discard and not task.cancelled() and task.exception() is None:
+                    discard(task.result())
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        # Sync path (unused by the graph) - fallback only, no hedging
+        last_error = None
+        for name in self.registry.rank(self.provider_names):
+            start_time = time.perf_counter()
+            try:
+                message = self._provider_runnable(name, stop, kwargs).invoke(
+                    messages, config=_DETACHED_CONFIG
+                )
+            except Exception as e:
+                self.registry.stats[name].record_error()
+                last_error = e
+                continue
+            self.registry.stats[name].record_success("invoke", time.perf_counter() - start_time)
+            message.response_metadata = {**message.response_metadata, "provider": name}
+            return ChatResult(generations=[ChatGeneration(message=message)])
+        raise last_error or ValueError(f"No available LLM provider in {self.provider_names}")
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        async def start(name: str):
+            return await self._provider_runnable(name, stop, kwargs).ainvoke(
+                messages, config=_DETACHED_CONFIG
+            )
+
+        name, message = await self._race("invoke", start)
+        message.response_metadata = {**message.response_metadata, "provider": name}
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        # Providers race for the first chunk - once tokens are flowing the stream can't switch
+        async def start(name: str):
+            iterator = (
+                self._provider_runnable(name, stop, kwargs)
+                .astream(messages, config=_DETACHED_CONFIG)
+                .__aiter__()
+            )
+            return iterator, await iterator.__anext__()
+
+        def discard(result):
+            task = asyncio.ensure_future(result[0].aclose())
+            _closing_tasks.add(task)
+            task.add_done_callback(_closing_tasks.discard)
+
+        name, (iterator, first_chunk) = await self._race("stream", start, discard)
+
+        async def chunks():
+            yield first_chunk
+            async for chunk in iterator:
+                yield chunk
+
+        async for chunk in chunks():
+            if chunk.response_metadata:
+                chunk.response_metadata = {**chunk.response_metadata, "provider": name}
+            generation_chunk = ChatGenerationChunk(message=chunk)
+            if run_manager:
+                await run_manager.on_llm_new_token(
+                    str(chunk.content), chunk=generation_chunk
+                )
+            yield generation_chunk
+
+
+provider_registry = ProviderRegistry()
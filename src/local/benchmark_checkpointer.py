@@ -0,0 +1,194 @@
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.base.id import uuid6
+from langgraph.checkpoint.memory import MemorySaver
+
+from src.database.checkpointer import (
+    DeltaCheckpointSaver,
+    PostgresCheckpointStore,
+    SqliteCheckpointStore,
+)
+from src.local.load_test import percentile
+
+# Checkpoint write / read latency as a thread's history grows, for MemorySaver and the durable
+# checkpointer (SQLite, and Postgres when POSTGRES_DSN is set) writing full values vs deltas.
+# Each turn checkpoints like the graph does - a user message, the planner, an ai request and its
+# client result, then the response. Also measures puts per second across concurrent threads with
+# and without group commits.
+# Run: poetry run python -m src.local.benchmark_checkpointer --turns 1000
+
+HISTORY_SIZES = (10, 100, 500, 1000)
+CONCURRENT_THREADS = 50
+
+_TOOL_RESULT = "id|name|status|due_date\n" + "\n".join(
+    f"6f1c2a7e-0000-4000-8000-{index:012}|Task {index}|open|2025-03-14T17:00Z" for index in range(10)
+)
+
+
+def turn_steps(turn: int) -> list[tuple[list, dict]]:
+    """Message writes and the other channels each checkpoint of a turn updates"""
+    return [
+        ([HumanMessage(content=f"What is due today? ({turn})")], {"iteration_count": 0}),
+        ([], {"next_step": "tool_caller", "iteration_count": 1}),
+        ([AIMessage(content="", tool_calls=[{"name": "find_tasks", "args": {"task_due_date": "2025-03-14"}, "id": f"call_{turn}"}])], {}),
+        ([HumanMessage(content=_TOOL_RESULT)], {"next_step": "response_generator"}),
+        ([AIMessage(content=f"You have 10 tasks due today, the first is Task 0 ({turn}).")], {"next_step": None}),
+    ]
+
+
+async def put_step(saver, config: dict, checkpoint: dict, messages: list, values: dict) -> tuple[dict, dict]:
+    """Next checkpoint for a step - like the graph, the messages channel gets a new list with the new items"""
+    checkpoint = {
+        **checkpoint,
+        "id": str(uuid6()),
+        "channel_values": dict(checkpoint["channel_values"]),
+        "channel_versions": dict(checkpoint["channel_versions"]),
+    }
+    changed = dict(values)
+    if messages:
+        changed["messages"] = checkpoint["channel_values"].get("messages", []) + messages
+    new_versions = {}
+    for channel, value in changed.items():
+        version = saver.get_next_version(checkpoint["channel_versions"].get(channel), None)
+        checkpoint["channel_values"][channel] = value
+        checkpoint["channel_versions"][channel] = version
+        new_versions[channel] = version
+    config = await saver.aput(config, checkpoint, {"source": "loop", "step": 0}, new_versions)
+    return config, checkpoint
+
+
+class _ByteCounter:
+    """Wraps a store to count the bytes of the blobs written"""
+
+    def __init__(self, store):
+        self.store = store
+        self.bytes = 0
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+    async def write_batch(self, checkpoints: list, blobs: list, writes: list, upsert_writes: list):
+        self.bytes += sum(len(row[5]) for row in checkpoints) + sum(len(row[5] or b"") for row in blobs)
+        await self.store.write_batch(checkpoints, blobs, writes, upsert_writes)
+
+
+def written_bytes(saver) -> int:
+    # Not counted for MemorySaver
+    return saver.store.bytes if isinstance(saver, DeltaCheckpointSaver) else 0
+
+
+async def measure_history(name: str, saver, turns: int) -> list[dict]:
+    """Put and get_tuple latency around each history size"""
+    config = {"configurable": {"thread_id": f"benchmark-{name}", "checkpoint_ns": ""}}
+    checkpoint = empty_checkpoint()
+    results = []
+    put_ms, get_ms = [], []
+    bytes_before = written_bytes(saver)
+    puts = 0
+    for turn in range(1, turns + 1):
+        for messages, values in turn_steps(turn):
+            start = time.perf_counter()
+            config, checkpoint = await put_step(saver, config, checkpoint, messages, values)
+            put_ms.append((time.perf_counter() - start) * 1000)
+            puts += 1
+        # A resumed thread reads its latest checkpoint first
+        start = time.perf_counter()
+        await saver.aget_tuple({"configurable": {"thread_id": config["configurable"]["thread_id"], "checkpoint_ns": ""}})
+        get_ms.append((time.perf_counter() - start) * 1000)
+
+        if turn in HISTORY_SIZES:
+            written = written_bytes(saver)
+            results.append(
+                {
+                    "saver": name,
+                    "turns": turn,
+                    "messages": len(checkpoint["channel_values"]["messages"]),
+                    "put_ms_p50": round(percentile(put_ms, 50), 3),
+                    "put_ms_p95": round(percentile(put_ms, 95), 3),
+                    "get_ms_p50": round(percentile(get_ms, 50), 3),
+                    "bytes_per_put": round((written - bytes_before) / puts) if written else None,
+                }
+            )
+            put_ms, get_ms = [], []
+            bytes_before, puts = written, 0
+    return results
+
+
+async def measure_concurrency(name: str, saver, puts_per_thread: int = 20) -> dict:
+    """Puts per second with CONCURRENT_THREADS threads checkpointing at once"""
+
+    async def run_thread(index: int):
+        config = {"configurable": {"thread_id": f"concurrent-{name}-{index}", "checkpoint_ns": ""}}
+        checkpoint = empty_checkpoint()
+        for turn in range(puts_per_thread // 5):
+            for messages, values in turn_steps(turn):
+                config, checkpoint = await put_step(saver, config, checkpoint, messages, values)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_thread(index) for index in range(CONCURRENT_THREADS)))
+    seconds = time.perf_counter() - start
+    return {
+        "saver": name,
+        "threads": CONCURRENT_THREADS,
+        "puts_per_second": round(CONCURRENT_THREADS * puts_per_thread / seconds),
+        "commits": saver.stats["commits"],
+    }
+
+
+def sqlite_saver(directory: str, name: str, **kwargs) -> DeltaCheckpointSaver:
+    return DeltaCheckpointSaver(_ByteCounter(SqliteCheckpointStore(os.path.join(directory, f"{name}.sqlite"))), **kwargs)
+
+
+async def postgres_saver(**kwargs) -> DeltaCheckpointSaver:
+    saver = DeltaCheckpointSaver(_ByteCounter(PostgresCheckpointStore()), **kwargs)
+    await saver.setup()
+    return saver
+
+
+async def run_benchmark(turns: int) -> dict:
+    results = {"history": [], "concurrency": []}
+    with tempfile.TemporaryDirectory() as directory:
+        savers = {
+            "memory": lambda: MemorySaver(),
+            "sqlite_full": lambda: sqlite_saver(directory, "full", deltas=False),
+            "sqlite_delta": lambda: sqlite_saver(directory, "delta"),
+        }
+        for name, build in savers.items():
+            results["history"] += await measure_history(name, build(), turns)
+
+        results["concurrency"].append(
+            await measure_concurrency("sqlite", sqlite_saver(directory, "single", group_commit=False))
+        )
+        results["concurrency"].append(
+            await measure_concurrency("sqlite_group_commit", sqlite_saver(directory, "group"))
+        )
+
+        if os.environ.get("POSTGRES_DSN"):
+            results["history"] += await measure_history("postgres_full", await postgres_saver(deltas=False), turns)
+            results["history"] += await measure_history("postgres_delta", await postgres_saver(), turns)
+            results["concurrency"].append(
+                await measure_concurrency("postgres", await postgres_saver(group_commit=False))
+            )
+            results["concurrency"].append(await measure_concurrency("postgres_group_commit", await postgres_saver()))
+            # Leave the database as it was
+            saver = await postgres_saver()
+            for name in ("postgres", "postgres_group_commit"):
+                for index in range(CONCURRENT_THREADS):
+                    await saver.adelete_thread(f"concurrent-{name}-{index}")
+            await saver.adelete_thread("benchmark-postgres_full")
+            await saver.adelete_thread("benchmark-postgres_delta")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=max(HISTORY_SIZES), help="Turns in the measured thread")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run_benchmark(args.turns)), indent=2))
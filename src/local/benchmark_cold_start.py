@@ -0,0 +1,115 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Cold start time of the graph module - each run imports it in a fresh interpreter with
+# `python -X importtime`, which governs how fast a new serverless instance can take traffic.
+# Exits with 1 when the median exceeds --max-seconds so CI can track regressions.
+# Run: poetry run python -m src.local.benchmark_cold_start --runs 10
+
+REPO_ROOT = Path(__file__).parent.parent.parent
+
+# Heavy dependencies that should only load on first use, not at import
+LAZY_MODULES = (
+    "langchain_groq",
+    "langchain_openai",
+    "langchain_anthropic",
+    "langchain_community.tools.tavily_search",
+    "supabase",
+    "asyncpg",
+)
+
+
+def parse_importtime(stderr: str) -> list[dict]:
+    """Rows of `-X importtime` output - self / cumulative microseconds, module name and nesting depth"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        rows.append(
+            {
+                "module": name.strip(),
+                "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+            }
+        )
+    return rows
+
+
+def run_cold_import(module: str) -> tuple[float, list[dict]]:
+    env = {**os.environ, "PYTHONPATH": str(REPO_ROOT)}
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    wall_seconds = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return wall_seconds, parse_importtime(result.stderr)
+
+
+def run_benchmark(module: str, runs: int, top: int) -> dict:
+    wall_times = []
+    import_times = []
+    rows = []
+    for _ in range(runs):
+        wall_seconds, rows = run_cold_import(module)
+        wall_times.append(wall_seconds)
+        import_times.append(
+            next(row["cumulative_us"] for row in rows if row["module"] == module) / 1e6
+        )
+
+    imported = {row["module"] for row in rows}
+    # Direct dependencies of the module, slowest first (from the last run)
+    slowest = sorted(
+        (row for row in rows if row["depth"] == 1),
+        key=lambda row: row["cumulative_us"],
+        reverse=True,
+    )[:top]
+
+    results = {
+        "module": module,
+        "runs": runs,
+        "median_wall_seconds": round(statistics.median(wall_times), 3),
+        "median_import_seconds": round(statistics.median(import_times), 3),
+        "modules_imported": len(imported),
+        "lazy_modules_loaded_at_import": [
+            name for name in LAZY_MODULES if name in imported
+        ],
+        "slowest_imports_ms": {
+            row["module"]: round(row["cumulative_us"] / 1000, 1) for row in slowest
+        },
+    }
+    print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="src.agent")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        default=None,
+        help="Fail when the median wall time is above this",
+    )
+    args = parser.parse_args()
+    results = run_benchmark(args.module, args.runs, args.top)
+    if args.max_seconds is not None and results["median_wall_seconds"] > args.max_seconds:
+        print(
+            f"Cold start regression: {results['median_wall_seconds']}s > {args.max_seconds}s"
+        )
+        sys.exit(1)
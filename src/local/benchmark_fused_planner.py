@@ -0,0 +1,86 @@
+import argparse
+import asyncio
+import json
+import time
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.types import Command
+
+from src.agent import graph_builder
+from src.config_schema import PlannerMode
+from src.local.corpus import CorpusResponder, load_corpus
+from src.local.fake_llm import FakeChatModel, constant_latency, install_fake_llms
+
+# Compares the two hop planner -> tool_caller path against the fused planner on the recorded
+# conversation corpus: LLM calls per turn, tokens per turn and wall-clock time per turn.
+# Run: poetry run python -m src.local.benchmark_fused_planner --llm-latency 0.3
+
+
+async def run_corpus(planner_mode: str, llm_latency: float) -> dict:
+    conversations = load_corpus()
+    fake_llm = install_fake_llms(
+        FakeChatModel(
+            responder=CorpusResponder(conversations),
+            latency=constant_latency(llm_latency),
+        )
+    )
+    graph = graph_builder.compile(checkpointer=MemorySaver())
+
+    turns = 0
+    start_time = time.perf_counter()
+    for conversation in conversations:
+        config = {
+            "configurable": {
+                "thread_id": f"{planner_mode}-{conversation['id']}",
+                "timezone_offset_minutes": 0,
+                "planner_mode": planner_mode,
+                # Measure the planner paths themselves
+                "fast_path_enabled": False,
+            }
+        }
+        for turn in conversation["turns"]:
+            turns += 1
+            await graph.ainvoke({"messages": [HumanMessage(content=turn["user"])]}, config)
+
+            # Answer each ai request as the client would
+            for recorded_call in turn["tool_calls"]:
+                state = await graph.aget_state(config)
+                if not state.next:
+                    break
+                await graph.ainvoke(Command(resume=recorded_call["client_result"]), config)
+
+    total_seconds = time.perf_counter() - start_time
+    return {
+        "planner_mode": planner_mode,
+        "turns": turns,
+        "llm_calls_per_turn": round(fake_llm.call_count / turns, 2),
+        "input_tokens_per_turn": round(fake_llm.total_input_tokens / turns),
+        "output_tokens_per_turn": round(fake_llm.total_output_tokens / turns),
+        "seconds_per_turn": round(total_seconds / turns, 3),
+    }
+
+
+async def run_benchmark(llm_latency: float) -> list[dict]:
+    results = [
+        await run_corpus(PlannerMode.TWO_HOP.value, llm_latency),
+        await run_corpus(PlannerMode.FUSED.value, llm_latency),
+    ]
+    print(json.dumps(results, indent=2))
+
+    two_hop, fused = results
+    print(
+        f"fused vs two_hop: {fused['llm_calls_per_turn'] / two_hop['llm_calls_per_turn']:.0%} of the LLM calls, "
+        f"{(fused['input_tokens_per_turn'] + fused['output_tokens_per_turn']) / (two_hop['input_tokens_per_turn'] + two_hop['output_tokens_per_turn']):.0%} of the tokens, "
+        f"{fused['seconds_per_turn'] / two_hop['seconds_per_turn']:.0%} of the wall time"
+    )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--llm-latency", type=float, default=0.3, help="Seconds per LLM call"
+    )
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.llm_latency))
@@ -0,0 +1,111 @@
+import json
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, ToolMessage
+from langgraph.graph.message import add_messages
+
+from src.message_store import add_messages_indexed
+
+# Microbenchmark of the messages reducer on threads of 100, 1k and 10k messages - a node appending
+# one message, the client result replacing the pending ai request's ToolMessage by id, and the
+# summarizer removing the oldest messages.
+# Both reducers are O(n) per update in the thread's length - add_messages scans the thread in
+# Python, add_messages_indexed makes a shallow copy of the list. list_copy_us is the cost of that
+# copy alone, the floor add_messages_indexed can't go below.
+# Run: poetry run python -m src.local.benchmark_message_reducer
+
+THREAD_SIZES = (100, 1_000, 10_000)
+REPEATS = 5
+
+REDUCERS = [("add_messages", add_messages), ("indexed", add_messages_indexed)]
+
+
+def build_thread(size: int) -> list:
+    """User message, ai request and its pending result, repeated - ends on the pending ToolMessage"""
+    messages = []
+    while len(messages) < size:
+        turn = len(messages)
+        tool_call_id = f"call-{turn}"
+        messages += [
+            HumanMessage(content=f"Request {turn}", id=f"human-{turn}"),
+            AIMessage(
+                content="",
+                tool_calls=[{"name": "get_tasks", "args": {"due": "today"}, "id": tool_call_id}],
+                id=f"ai-{turn}",
+            ),
+            ToolMessage(content="pending", tool_call_id=tool_call_id, id=f"tool-{turn}"),
+        ]
+    return messages[-size:]
+
+
+def make_updates(thread: list) -> dict:
+    """Updates per timed call - appends and replaces are applied to the previous call's result, as
+    a thread grows, removals to the same thread each time"""
+    pending = thread[-1]
+    return {
+        "append": lambda call: [AIMessage(content="Here are your tasks", id=f"appended-{call}")],
+        "replace": lambda call: [
+            ToolMessage(
+                content=f'{{"tasks": [{call}]}}', tool_call_id=pending.tool_call_id, name=pending.name, id=pending.id
+            )
+        ],
+        "remove": lambda call: [RemoveMessage(id=message.id) for message in thread[:20]],
+    }
+
+
+def time_reducer(reducer, thread: list, update_name: str, make_update, number: int) -> float:
+    """Best microseconds per reducer call"""
+    best = None
+    for _ in range(REPEATS):
+        # The state value as the graph holds it
+        value = reducer([], thread)
+        updates = [make_update(call) for call in range(number)]
+        start = time.perf_counter()
+        for update in updates:
+            result = reducer(value, update)
+            if update_name != "remove":
+                value = result
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best / number * 1_000_000, 1)
+
+
+def time_list_copy(thread: list, number: int) -> float:
+    """Best microseconds per shallow copy of the thread"""
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for _ in range(number):
+            list(thread)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best / number * 1_000_000, 1)
+
+
+def run_benchmark():
+    results = {}
+    for size in THREAD_SIZES:
+        thread = build_thread(size)
+        number = max(10, 10_000 // size)
+        updates = make_updates(thread)
+
+        results[size] = {}
+        for update_name, make_update in updates.items():
+            # Both reducers must produce the same messages
+            update = make_update(0)
+            assert list(add_messages_indexed(thread, update)) == add_messages(thread, update)
+
+            timings = {
+                f"{name}_us": time_reducer(reducer, thread, update_name, make_update, number)
+                for name, reducer in REDUCERS
+            }
+            timings["speedup"] = round(timings["add_messages_us"] / timings["indexed_us"], 1)
+            timings["list_copy_us"] = time_list_copy(thread, number)
+            results[size][update_name] = timings
+
+    print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    run_benchmark()
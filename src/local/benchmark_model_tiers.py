@@ -0,0 +1,142 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.types import Command
+
+from src import llm_config
+from src.agent import graph_builder
+from src.local.corpus import PLANNER_SCHEMAS, CorpusResponder, load_corpus
+from src.local.fake_llm import FakeChatModel, constant_latency, install_fake_llms
+
+# Replays the recorded conversation corpus with every node on the large model, then with the
+# default tiers (tool_caller and response_generator on the small model). The small model answers
+# some tool calls with plain text, which fails validation in the tool caller and escalates to the
+# large model - reports wall time, cost and escalation / retry counts per turn.
+# Run: poetry run python -m src.local.benchmark_model_tiers --invalid-rate 0.1
+
+# Groq list prices, USD per million input / output tokens
+PRICES_PER_MILLION_TOKENS = {
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+    "llama-3.1-8b-instant": (0.05, 0.08),
+}
+
+ALL_LARGE_TIERS = {node: llm_config.LARGE_TIER for node in llm_config.NODE_DEFAULT_TIERS}
+
+
+class UnreliableToolCallResponder(CorpusResponder):
+    """Corpus responder that sometimes answers a tool call request with text, like a small model"""
+
+    def __init__(self, conversations: list[dict], invalid_rate: float):
+        super().__init__(conversations)
+        self.invalid_rate = invalid_rate
+
+    def __call__(self, messages: list[BaseMessage], tool_names: list[str]) -> AIMessage:
+        is_tool_call = tool_names and not any(name in PLANNER_SCHEMAS for name in tool_names)
+        if is_tool_call and random.random() < self.invalid_rate:
+            return AIMessage(content="Sure, I'll look that up for you.")
+        return super().__call__(messages, tool_names)
+
+
+def model_cost(model: FakeChatModel) -> float:
+    input_price, output_price = PRICES_PER_MILLION_TOKENS[model.model_name]
+    return (
+        model.total_input_tokens * input_price + model.total_output_tokens * output_price
+    ) / 1e6
+
+
+async def run_corpus(
+    name: str, llm_tiers: dict, repeats: int, large_latency: float, small_latency: float, invalid_rate: float
+) -> dict:
+    random.seed(0)
+    conversations = load_corpus()
+    large_llm = FakeChatModel(
+        model_name="llama-3.3-70b-versatile",
+        responder=CorpusResponder(conversations),
+        latency=constant_latency(large_latency),
+    )
+    small_llm = FakeChatModel(
+        model_name="llama-3.1-8b-instant",
+        responder=UnreliableToolCallResponder(conversations, invalid_rate),
+        latency=constant_latency(small_latency),
+    )
+    install_fake_llms(large_llm, small_llm=small_llm)
+    llm_config.tier_stats.reset()
+    graph = graph_builder.compile(checkpointer=MemorySaver())
+
+    turns = 0
+    start_time = time.perf_counter()
+    for repeat in range(repeats):
+        for conversation in conversations:
+            config = {
+                "configurable": {
+                    "thread_id": f"{name}-{repeat}-{conversation['id']}",
+                    "timezone_offset_minutes": 0,
+                    "llm_tiers": llm_tiers,
+                    # Measure the tool caller itself
+                    "fast_path_enabled": False,
+                }
+            }
+            for turn in conversation["turns"]:
+                turns += 1
+                await graph.ainvoke({"messages": [HumanMessage(content=turn["user"])]}, config)
+
+                # Answer each ai request as the client would
+                for recorded_call in turn["tool_calls"]:
+                    state = await graph.aget_state(config)
+                    if not state.next:
+                        break
+                    await graph.ainvoke(Command(resume=recorded_call["client_result"]), config)
+
+    total_seconds = time.perf_counter() - start_time
+    stats = llm_config.tier_stats.summary()
+    return {
+        "scenario": name,
+        "turns": turns,
+        "seconds_per_turn": round(total_seconds / turns, 3),
+        "cost_per_1k_turns_usd": round((model_cost(large_llm) + model_cost(small_llm)) / turns * 1000, 4),
+        "large_calls_per_turn": round(large_llm.call_count / turns, 2),
+        "small_calls_per_turn": round(small_llm.call_count / turns, 2),
+        "escalations_per_turn": round(sum(stats["escalations"].values()) / turns, 3),
+        "retries_per_turn": round(sum(stats["retries"].values()) / turns, 3),
+        "calls_per_node": stats["calls"],
+    }
+
+
+async def run_benchmark(
+    repeats: int, large_latency: float, small_latency: float, invalid_rate: float
+) -> list[dict]:
+    results = [
+        await run_corpus("all large", ALL_LARGE_TIERS, repeats, large_latency, small_latency, invalid_rate),
+        await run_corpus("tiered", {}, repeats, large_latency, small_latency, invalid_rate),
+    ]
+    print(json.dumps(results, indent=2))
+
+    all_large, tiered = results
+    print(
+        f"tiered vs all large: {tiered['seconds_per_turn'] / all_large['seconds_per_turn']:.0%} of the wall time, "
+        f"{tiered['cost_per_1k_turns_usd'] / all_large['cost_per_1k_turns_usd']:.0%} of the cost, "
+        f"{tiered['escalations_per_turn']} escalations per turn"
+    )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=5, help="Times the corpus is replayed")
+    parser.add_argument("--large-latency", type=float, default=0.5, help="Seconds per large model call")
+    parser.add_argument("--small-latency", type=float, default=0.12, help="Seconds per small model call")
+    parser.add_argument(
+        "--invalid-rate",
+        type=float,
+        default=0.1,
+        help="Fraction of small model tool calls that come back as plain text",
+    )
+    args = parser.parse_args()
+    asyncio.run(
+        run_benchmark(args.repeats, args.large_latency, args.small_latency, args.invalid_rate)
+    )
@@ -0,0 +1,82 @@
+import json
+import random
+import timeit
+
+from src.context_builder import estimate_tokens
+from src.tools.note_diff import NoteTextEdit, apply_note_edits, diff_note
+
+# Local diff time and LLM output tokens for note updates on 1KB - 100KB notes
+# Previously the LLM wrote every keep / remove / add operation, now it only writes targeted edits
+# Run: poetry run python -m src.local.benchmark_note_diff
+
+NOTE_SIZES = (1_000, 10_000, 50_000, 100_000)
+
+WORDS = "site crew concrete delivery inspection framing schedule client permit electrical plumbing roof".split()
+
+
+def generate_note(size: int) -> str:
+    random.seed(size)
+    sentences = []
+    length = 0
+    while length < size:
+        sentence = " ".join(random.choice(WORDS) for _ in range(random.randint(6, 14))).capitalize() + "."
+        if random.random() < 0.15:
+            sentence += "\n"
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(sentences)[:size]
+
+
+def sample_edits(note: str) -> list[NoteTextEdit]:
+    # Typical request - change something in the middle, fix a word near the start, add a line at the end
+    middle = len(note) // 2
+    middle_sentence = note[middle : note.index(".", middle) + 1]
+    first_word = note.split(" ", 1)[0]
+    return [
+        NoteTextEdit(find=middle_sentence, replace="Inspection passed, framing starts Monday."),
+        NoteTextEdit(find=first_word, replace=first_word.upper()),
+        NoteTextEdit(find="", replace="\nFollow up with the client about the permit."),
+    ]
+
+
+def run_benchmark(repeats: int = 5):
+    rows = []
+    for size in NOTE_SIZES:
+        note = generate_note(size)
+        edits = sample_edits(note)
+        updated_note = apply_note_edits(note, edits)
+        operations = diff_note(note, updated_note)
+
+        # Operations must rebuild both versions of the note
+        assert "".join(op["text"] for op in operations if op["type"] != "add") == note
+        assert "".join(op["text"] for op in operations if op["type"] != "remove") == updated_note
+
+        seconds = min(
+            timeit.repeat(lambda: diff_note(note, updated_note), number=1, repeat=repeats)
+        )
+        rows.append(
+            {
+                "note_bytes": size,
+                "operations": len(operations),
+                "diff_ms": round(seconds * 1000, 2),
+                # What the LLM had to write before (every operation) vs now (only the edits)
+                "llm_output_tokens_before": estimate_tokens(json.dumps(operations)),
+                "llm_output_tokens_now": estimate_tokens(
+                    json.dumps([edit.model_dump() for edit in edits])
+                ),
+            }
+        )
+
+    print(
+        f"{'note bytes':>10} | {'ops':>4} | {'diff ms':>8} | {'llm out tokens before':>21} | {'now':>5}"
+    )
+    for row in rows:
+        print(
+            f"{row['note_bytes']:>10} | {row['operations']:>4} | {row['diff_ms']:>8} | "
+            f"{row['llm_output_tokens_before']:>21} | {row['llm_output_tokens_now']:>5}"
+        )
+    return rows
+
+
+if __name__ == "__main__":
+    run_benchmark()
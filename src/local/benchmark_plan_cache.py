@@ -0,0 +1,109 @@
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from src.agent import graph_builder
+from src.auth import SupabaseUser
+from src.local.benchmark_replay import LATENCY_DISTRIBUTIONS, replay_turn
+from src.local.corpus import CorpusResponder, load_corpus
+from src.local.fake_llm import FakeChatModel, install_fake_llms
+from src.plan_cache import get_intent, get_user_today, plan_cache_stats, plan_template_cache
+
+# Replays the recorded conversation corpus without and with the plan template cache. The first
+# repeat fills the cache, later repeats are answered from it. Reports wall time and LLM calls per
+# turn for both, the cache's hit rate, and per cached intent the planner steps replayed and the
+# wall time saved per turn (from the repeats after the first).
+# The runs carry the user the server's auth handler would pass on - the cache is off without one.
+# Run: poetry run python -m src.local.benchmark_plan_cache --repeats 5
+
+BENCHMARK_USER_ID = "00000000-0000-0000-0000-000000000001"
+
+
+async def replay(conversations: list[dict], repeats: int, latency: str, llm_latency: float, cached: bool) -> dict:
+    random.seed(0)
+    fake_llm = install_fake_llms(
+        FakeChatModel(
+            responder=CorpusResponder(conversations),
+            latency=LATENCY_DISTRIBUTIONS[latency](llm_latency),
+        )
+    )
+    plan_template_cache.clear()
+    plan_cache_stats.reset()
+    graph = graph_builder.compile(checkpointer=MemorySaver())
+
+    turns = 0
+    mismatched_turns = 0
+    # Wall seconds per request, for the repeats after the first
+    turn_seconds: dict[str, list[float]] = {}
+    start_time = time.perf_counter()
+    for repeat in range(repeats):
+        for conversation in conversations:
+            config = {
+                "configurable": {
+                    "thread_id": f"plan-cache-{repeat}-{conversation['id']}",
+                    # Templates are shared between the threads of one verified user
+                    "user_id": BENCHMARK_USER_ID,
+                    "langgraph_auth_user": SupabaseUser(BENCHMARK_USER_ID),
+                    "timezone_offset_minutes": 0,
+                    # Measure the planner path
+                    "fast_path_enabled": False,
+                    "plan_template_cache": cached,
+                }
+            }
+            for turn in conversation["turns"]:
+                turns += 1
+                turn_start = time.perf_counter()
+                response = await replay_turn(graph, config, turn)
+                if repeat > 0:
+                    turn_seconds.setdefault(turn["user"], []).append(time.perf_counter() - turn_start)
+                mismatched_turns += response != turn["response"]
+
+    results = {
+        "seconds_per_turn": round((time.perf_counter() - start_time) / turns, 3),
+        "llm_calls_per_turn": round(fake_llm.call_count / turns, 2),
+        "mismatched_turns": mismatched_turns,
+        "turn_seconds": {user: statistics.mean(seconds) for user, seconds in turn_seconds.items()},
+    }
+    if cached:
+        results["plan_cache"] = plan_cache_stats.summary()
+    return results
+
+
+async def run_benchmark(repeats: int, latency: str, llm_latency: float) -> dict:
+    conversations = load_corpus()
+    baseline = await replay(conversations, repeats, latency, llm_latency, cached=False)
+    cached = await replay(conversations, repeats, latency, llm_latency, cached=True)
+
+    # Wall time saved per cached intent
+    today = get_user_today({"configurable": {"timezone_offset_minutes": 0}})
+    intents = cached["plan_cache"]["intents"]
+    for user, seconds in baseline.pop("turn_seconds").items():
+        intent = get_intent(user, today)
+        if intent in intents:
+            intents[intent]["seconds_saved_per_turn"] = round(seconds - cached["turn_seconds"][user], 3)
+    cached.pop("turn_seconds")
+
+    results = {
+        "turns": repeats * sum(len(conversation["turns"]) for conversation in conversations),
+        "latency": latency,
+        "llm_latency": llm_latency,
+        "baseline": baseline,
+        "cached": cached,
+        "wall_time_saved": round(1 - cached["seconds_per_turn"] / baseline["seconds_per_turn"], 3),
+    }
+    print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=5, help="Times the corpus is replayed")
+    parser.add_argument("--latency", choices=list(LATENCY_DISTRIBUTIONS), default="constant")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Median seconds per LLM call")
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.repeats, args.latency, args.llm_latency))
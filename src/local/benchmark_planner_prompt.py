@@ -0,0 +1,71 @@
+import json
+import timeit
+
+from langchain_core.messages import SystemMessage
+
+from src.llm_config import llm
+from src.nodes.node_planner import (
+    _PLANNER_PROMPT_PREFIX,
+    PlannerDecision,
+    get_planner_prompt_layer,
+)
+from src.tools.tools import get_all_tools
+
+# Microbenchmark of the per-iteration CPU cost of building the planner prompt (no LLM call is made)
+# Run: poetry run python -m src.local.benchmark_planner_prompt
+
+ITERATIONS = 2000
+
+turn_fields = {
+    "ui_context": "current task name = Kill Bats",
+    "current_plan": "1. Use tool_caller to fetch tasks due today\n2. Use response_generator to list them",
+    "prev_node_feedback": "Fetch all tasks due today for the current user",
+    "iteration_count": 1,
+}
+
+
+# How node_planner built its prompt before the prompt layer was precompiled
+def build_prompt_uncached():
+    available_tools = []
+    for tool in get_all_tools():
+        available_tools.append({"name": tool.name, "description": tool.description})
+
+    system_content = (
+        _PLANNER_PROMPT_PREFIX
+        + f"""    AVAILABLE TOOLS:
+    {json.dumps(available_tools, indent=2)}
+    
+    CONTEXTUAL INFORMATION:
+    - Current UI context: {turn_fields["ui_context"]}
+    - Your current plan: {turn_fields["current_plan"]}
+    - Previous node feedback: {turn_fields["prev_node_feedback"]}
+    - Current iteration: {turn_fields["iteration_count"] + 1}/10 (will terminate at 10)
+"""
+    )
+    system_message = SystemMessage(content=system_content)
+    planner_llm = llm.with_structured_output(PlannerDecision)
+    return system_message, planner_llm
+
+
+def build_prompt_cached():
+    prompt_layer = get_planner_prompt_layer()
+    system_message = prompt_layer.build_system_message(**turn_fields)
+    return system_message, prompt_layer.structured_llm
+
+
+def run_benchmark():
+    # Both paths must produce the same prompt
+    assert build_prompt_uncached()[0].content == build_prompt_cached()[0].content
+
+    results = {}
+    for name, fn in [("uncached", build_prompt_uncached), ("cached", build_prompt_cached)]:
+        best = min(timeit.repeat(fn, number=ITERATIONS, repeat=5))
+        results[name] = best / ITERATIONS * 1_000_000
+        print(f"{name:>10}: {results[name]:8.1f} us per planner iteration")
+
+    print(f"   speedup: {results['uncached'] / results['cached']:8.1f}x")
+    return results
+
+
+if __name__ == "__main__":
+    run_benchmark()
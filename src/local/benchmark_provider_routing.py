@@ -0,0 +1,131 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.types import Command
+
+from src.agent import graph_builder
+from src.llm_config import NODE_DEFAULT_TIERS
+from src.llm_providers import provider_registry
+from src.local.fake_llm import FakeChatModel, lognormal_latency
+from src.local.load_test import percentile
+
+# Chat turns routed across fake providers that inject latency and errors, compared with the same
+# turns pinned to a single provider. The degraded scenario makes the primary provider 10x slower
+# halfway through, which routing should move away from.
+# Run: poetry run python -m src.local.benchmark_provider_routing --turns 200
+
+
+def degrading_latency(median_seconds: float, degrade_after_calls: int, factor: float = 10.0):
+    calls = {"count": 0}
+    base_latency = lognormal_latency(median_seconds, sigma=0.6)
+
+    def latency() -> float:
+        calls["count"] += 1
+        slowdown = factor if degrade_after_calls and calls["count"] > degrade_after_calls else 1.0
+        return base_latency() * slowdown
+
+    return latency
+
+
+def register_fake_providers(degrade_after_calls: int = 0):
+    provider_registry.register(
+        "fake-primary",
+        FakeChatModel(
+            model_name="fake-primary",
+            latency=degrading_latency(0.1, degrade_after_calls),
+            failure_rate=0.05,
+        ),
+    )
+    provider_registry.register(
+        "fake-secondary",
+        FakeChatModel(
+            model_name="fake-secondary",
+            latency=lognormal_latency(0.15, sigma=0.3),
+            failure_rate=0.01,
+        ),
+    )
+    provider_registry.reset_stats()
+
+
+async def run_turn(graph, index: int, provider_names: list[str], hedging: bool) -> tuple[float, bool]:
+    config = {
+        "configurable": {
+            "thread_id": f"routing-{index}-{random.random()}",
+            "timezone_offset_minutes": 0,
+            "llm_routing": {node: provider_names for node in NODE_DEFAULT_TIERS},
+            "llm_hedging": hedging,
+        }
+    }
+    start = time.perf_counter()
+    try:
+        await graph.ainvoke(
+            {"messages": [HumanMessage(content="what tasks are due today?")]}, config
+        )
+        await graph.ainvoke(Command(resume=json.dumps([])), config)
+    except Exception as e:
+        print(f"Turn {index} failed: {e}")
+        return time.perf_counter() - start, False
+    return time.perf_counter() - start, True
+
+
+async def run_scenario(
+    name: str, provider_names: list[str], hedging: bool, turns: int, concurrency: int, degrade: bool
+) -> dict:
+    # Each LLM heavy turn makes ~4 calls - degrade the primary halfway through
+    register_fake_providers(degrade_after_calls=turns * 2 if degrade else 0)
+    graph = graph_builder.compile(checkpointer=MemorySaver())
+
+    results = []
+    for batch_start in range(0, turns, concurrency):
+        results += await asyncio.gather(
+            *(
+                run_turn(graph, index, provider_names, hedging)
+                for index in range(batch_start, min(turns, batch_start + concurrency))
+            )
+        )
+    latencies = [latency for latency, ok in results if ok]
+    summary = provider_registry.summary()
+    return {
+        "scenario": name,
+        "failed_turns": sum(1 for _, ok in results if not ok),
+        "p50_seconds": round(percentile(latencies, 50), 3) if latencies else None,
+        "p95_seconds": round(percentile(latencies, 95), 3) if latencies else None,
+        "p99_seconds": round(percentile(latencies, 99), 3) if latencies else None,
+        "hedges_fired": summary["hedges_fired"],
+        "hedge_wins": summary["hedge_wins"],
+        "fallbacks": summary["fallbacks"],
+        "calls_per_provider": {
+            provider: stats["calls"]
+            for provider, stats in summary["providers"].items()
+            if provider.startswith("fake-")
+        },
+    }
+
+
+async def run_benchmark(turns: int, concurrency: int):
+    scenarios = []
+    for degrade in (False, True):
+        label = "degraded" if degrade else "steady"
+        scenarios.append(
+            await run_scenario(f"{label} / single provider", ["fake-primary"], False, turns, concurrency, degrade)
+        )
+        scenarios.append(
+            await run_scenario(
+                f"{label} / routed + hedging", ["fake-primary", "fake-secondary"], True, turns, concurrency, degrade
+            )
+        )
+    print(json.dumps(scenarios, indent=2))
+    return scenarios
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.turns, args.concurrency))
@@ -0,0 +1,239 @@
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.types import Command
+
+from src.agent import graph_builder
+from src.instrumentation import instrumentation
+from src.local.corpus import CorpusResponder, load_corpus
+from src.local.fake_llm import (
+    FakeChatModel,
+    constant_latency,
+    install_fake_llms,
+    lognormal_latency,
+)
+from src.local.load_test import percentile
+
+# Offline replay of the recorded conversation corpus through the compiled graph with a scripted
+# fake LLM - no network, deterministic for a given seed. Reports per turn wall time, node runs,
+# framework overhead (wall time minus LLM time, from the instrumentation events) and memory per
+# thread (checkpoint bytes and retained Python heap).
+# With --baseline, exits with 1 when a metric regressed past its tolerance so CI can gate on it.
+# Run: poetry run python -m src.local.benchmark_replay --repeats 10
+#      poetry run python -m src.local.benchmark_replay --baseline src/local/data/replay_baseline.json
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "data", "replay_baseline.json")
+
+LATENCY_DISTRIBUTIONS = {
+    "zero": lambda median: constant_latency(0.0),
+    "constant": constant_latency,
+    "lognormal": lognormal_latency,
+}
+
+# Allowed relative increase per metric before it counts as a regression - timings are noisy, counts
+# and sizes are deterministic for the corpus
+REGRESSION_TOLERANCES = {
+    "overhead_ms_per_turn_p50": 0.5,
+    "overhead_ms_per_turn_p95": 0.5,
+    "llm_calls_per_turn": 0.0,
+    "node_runs_per_turn": 0.0,
+    "checkpoint_bytes_per_thread": 0.1,
+    "retained_bytes_per_thread": 0.25,
+    "mismatched_turns": 0.0,
+}
+
+
+def thread_checkpoint_bytes(checkpointer: MemorySaver, thread_id: str) -> int:
+    """Serialized size of everything the checkpointer stores for a thread"""
+
+    def size(value) -> int:
+        if isinstance(value, (bytes, bytearray)):
+            return len(value)
+        if isinstance(value, str):
+            return len(value.encode())
+        if isinstance(value, dict):
+            return sum(size(item) for item in value.values())
+        if isinstance(value, (tuple, list)):
+            return sum(size(item) for item in value)
+        return 0
+
+    total = size(checkpointer.storage.get(thread_id, {}))
+    total += sum(size(value) for key, value in checkpointer.writes.items() if key[0] == thread_id)
+    total += sum(size(value) for key, value in checkpointer.blobs.items() if key[0] == thread_id)
+    return total
+
+
+async def replay_turn(graph, config: dict, turn: dict) -> str:
+    """Run one recorded turn, answering each ai request with the recorded client result - returns the final response"""
+    await graph.ainvoke({"messages": [HumanMessage(content=turn["user"])]}, config)
+    for recorded_call in turn["tool_calls"]:
+        state = await graph.aget_state(config)
+        if not state.next:
+            break
+        await graph.ainvoke(Command(resume=recorded_call["client_result"]), config)
+    state = await graph.aget_state(config)
+    return state.values["messages"][-1].content
+
+
+async def replay_corpus(
+    conversations: list[dict], repeats: int, latency: str, llm_latency: float, planner_mode: str, seed: int
+) -> tuple[list[dict], MemorySaver, list[str], FakeChatModel]:
+    random.seed(seed)
+    fake_llm = install_fake_llms(
+        FakeChatModel(
+            responder=CorpusResponder(conversations),
+            latency=LATENCY_DISTRIBUTIONS[latency](llm_latency),
+        )
+    )
+    checkpointer = MemorySaver()
+    graph = graph_builder.compile(checkpointer=checkpointer)
+
+    turns = []
+    thread_ids = []
+    for repeat in range(repeats):
+        for conversation in conversations:
+            thread_id = f"replay-{repeat}-{conversation['id']}"
+            thread_ids.append(thread_id)
+            config = {
+                "configurable": {
+                    "thread_id": thread_id,
+                    "timezone_offset_minutes": 0,
+                    "planner_mode": planner_mode,
+                }
+            }
+            for turn in conversation["turns"]:
+                instrumentation.ring_buffer.clear()
+                start = time.perf_counter()
+                response = await replay_turn(graph, config, turn)
+                wall_seconds = time.perf_counter() - start
+
+                events = list(instrumentation.ring_buffer.events)
+                node_events = [event for event in events if event["event"] == "node"]
+                llm_seconds = sum(event["seconds"] for event in events if event["event"] == "llm")
+                node_runs = {}
+                for event in node_events:
+                    node_runs[event["node"]] = node_runs.get(event["node"], 0) + 1
+                turns.append(
+                    {
+                        "wall_seconds": wall_seconds,
+                        "llm_seconds": llm_seconds,
+                        "overhead_seconds": max(0.0, wall_seconds - llm_seconds),
+                        "llm_calls": sum(1 for event in events if event["event"] == "llm"),
+                        "node_runs": node_runs,
+                        "matches_recording": response == turn["response"],
+                    }
+                )
+    return turns, checkpointer, thread_ids, fake_llm
+
+
+async def measure_retained_memory(conversations: list[dict], planner_mode: str) -> int:
+    """Python heap still allocated after replaying the corpus once, per thread - a separate pass as tracing slows everything down"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    _, checkpointer, thread_ids, _ = await replay_corpus(conversations, 1, "zero", 0.0, planner_mode, seed=0)
+    instrumentation.ring_buffer.clear()
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    # The checkpointer holds the threads - keep it alive until the snapshot is taken
+    del checkpointer
+    return round(retained / len(thread_ids))
+
+
+async def run_benchmark(repeats: int, latency: str, llm_latency: float, planner_mode: str, seed: int) -> dict:
+    conversations = load_corpus()
+    turns, checkpointer, thread_ids, fake_llm = await replay_corpus(
+        conversations, repeats, latency, llm_latency, planner_mode, seed
+    )
+
+    wall_ms = [turn["wall_seconds"] * 1000 for turn in turns]
+    overhead_ms = [turn["overhead_seconds"] * 1000 for turn in turns]
+    node_runs = {}
+    for turn in turns:
+        for node, count in turn["node_runs"].items():
+            node_runs[node] = node_runs.get(node, 0) + count
+
+    results = {
+        "turns": len(turns),
+        "latency": latency,
+        "llm_latency": llm_latency,
+        "planner_mode": planner_mode,
+        "wall_ms_per_turn_p50": round(percentile(wall_ms, 50), 2),
+        "wall_ms_per_turn_p95": round(percentile(wall_ms, 95), 2),
+        "wall_ms_per_turn_p99": round(percentile(wall_ms, 99), 2),
+        "overhead_ms_per_turn_p50": round(percentile(overhead_ms, 50), 2),
+        "overhead_ms_per_turn_p95": round(percentile(overhead_ms, 95), 2),
+        "overhead_share": round(
+            sum(turn["overhead_seconds"] for turn in turns) / (sum(turn["wall_seconds"] for turn in turns) or 1), 3
+        ),
+        "llm_calls_per_turn": round(fake_llm.call_count / len(turns), 2),
+        "node_runs_per_turn": round(sum(node_runs.values()) / len(turns), 2),
+        "node_runs_per_turn_by_node": {
+            node: round(count / len(turns), 2) for node, count in sorted(node_runs.items())
+        },
+        "checkpoint_bytes_per_thread": round(
+            statistics.mean(thread_checkpoint_bytes(checkpointer, thread_id) for thread_id in thread_ids)
+        ),
+        "retained_bytes_per_thread": await measure_retained_memory(conversations, planner_mode),
+        "mismatched_turns": sum(1 for turn in turns if not turn["matches_recording"]),
+    }
+    return results
+
+
+def find_regressions(results: dict, baseline: dict) -> list[str]:
+    regressions = []
+    for metric, tolerance in REGRESSION_TOLERANCES.items():
+        if metric not in baseline:
+            continue
+        limit = baseline[metric] * (1 + tolerance)
+        if results[metric] > limit:
+            regressions.append(f"{metric}: {results[metric]} > {round(limit, 2)} (baseline {baseline[metric]})")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=10, help="Times the corpus is replayed")
+    parser.add_argument("--latency", choices=list(LATENCY_DISTRIBUTIONS), default="zero")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Median seconds per LLM call")
+    parser.add_argument("--planner-mode", default="two_hop")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=None, help="Fail on regressions against this results file")
+    parser.add_argument(
+        "--write-baseline", action="store_true", help=f"Save the results to {BASELINE_PATH}"
+    )
+    args = parser.parse_args()
+
+    results = asyncio.run(
+        run_benchmark(args.repeats, args.latency, args.llm_latency, args.planner_mode, args.seed)
+    )
+    print(json.dumps(results, indent=2))
+
+    if args.write_baseline:
+        with open(BASELINE_PATH, "w") as file:
+            json.dump(results, file, indent=2)
+            file.write("\n")
+        print(f"Baseline written to {BASELINE_PATH}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = find_regressions(results, json.load(file))
+        if results["mismatched_turns"]:
+            regressions.append(f"{results['mismatched_turns']} turns didn't end with the recorded response")
+        for regression in regressions:
+            print(f"Regression - {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline")
@@ -0,0 +1,85 @@
+import json
+import random
+import timeit
+
+from src.context_builder import estimate_tokens
+from src.local.corpus import load_corpus
+from src.tools.result_compaction import compact_ai_request_result, get_info_request_type
+from src.tools.tools import get_all_tools
+
+# Tokens saved by compacting client results on sample payloads
+# Run: poetry run python -m src.local.benchmark_result_compaction
+
+
+def generate_tasks(count: int) -> list[dict]:
+    random.seed(0)
+    return [
+        {
+            "id": f"6f1c2a7e-0000-4000-8000-{index:012d}",
+            "name": f"Task {index}",
+            "description": random.choice([None, "", f"Details for task {index}"]),
+            "status": random.choice(["open", "inProgress", "closed"]),
+            "priority": random.choice(["veryLow", "low", "normal", "high", "veryHigh"]),
+            "due_date": f"2025-03-{1 + index % 28:02d}T17:00:00.000Z",
+            "start_date": None,
+            "estimated_duration_minutes": None,
+            "parent_project_name": random.choice(["Website Redesign", "Backend"]),
+            "author_user_name": "Kyle",
+            "assigned_user_names": random.choice([[], ["Kyle"], ["Kyle", "Maria"]]),
+            "created_at": "2025-03-01T09:12:44.000Z",
+            "updated_at": "2025-03-14T16:03:10.000Z",
+        }
+        for index in range(count)
+    ]
+
+
+# (name, info request tool message content, client result)
+def sample_payloads() -> list[tuple[str, str, str]]:
+    tools_by_name = {tool.name: tool for tool in get_all_tools()}
+    payloads = []
+    for conversation in load_corpus():
+        for turn in conversation["turns"]:
+            for recorded_call in turn["tool_calls"]:
+                request = tools_by_name[recorded_call["name"]].invoke(recorded_call["args"])
+                if get_info_request_type(request):
+                    payloads.append(
+                        (
+                            f"{conversation['id']}/{recorded_call['name']}",
+                            request,
+                            recorded_call["client_result"],
+                        )
+                    )
+
+    find_tasks_request = tools_by_name["find_tasks"].invoke({})
+    for count in (50, 200):
+        payloads.append(
+            (f"generated/find_tasks x{count}", find_tasks_request, json.dumps(generate_tasks(count)))
+        )
+    return payloads
+
+
+def run_benchmark():
+    print(f"{'payload':<42}{'tokens':>8}{'compact':>9}{'saved':>8}{'us':>9}")
+    total_before = total_after = 0
+    for name, request, result in sample_payloads():
+        info_request_type = get_info_request_type(request)
+        compacted = compact_ai_request_result(result, info_request_type)
+        seconds = min(
+            timeit.repeat(
+                lambda: compact_ai_request_result(result, info_request_type),
+                number=20,
+                repeat=3,
+            )
+        ) / 20
+
+        before, after = estimate_tokens(result), estimate_tokens(compacted)
+        total_before += before
+        total_after += after
+        print(
+            f"{name:<42}{before:>8}{after:>9}{1 - after / before:>8.0%}{seconds * 1_000_000:>9.0f}"
+        )
+    print(f"{'total':<42}{total_before:>8}{total_after:>9}{1 - total_after / total_before:>8.0%}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,159 @@
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from pathlib import Path
+
+import asyncpg
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.types import Command
+
+from src.agent import graph_builder
+from src.auth import SupabaseUser
+from src.database.postgres_client import cleanup, execute_query, get_db_connection
+from src.local.fake_llm import FakeChatModel, constant_latency, install_fake_llms
+from src.local.load_test import percentile
+
+# Compares a find_tasks chat turn answered by the client (interrupt + simulated mobile round-trip)
+# with the same turn answered on the server from Postgres.
+# Needs a Postgres configured through POSTGRES_DSN / POSTGRES_* - --seed creates a minimal copy of
+# the tables the info requests read, only use it against a scratch database.
+# Server info requests need a verified user id - the runs carry the user the server's auth handler
+# (src/auth.py) would pass on for a valid access token.
+# Run: poetry run python -m src.local.benchmark_server_info_requests --seed --client-delay 0.6
+
+MIGRATIONS_DIR = Path(__file__).parent.parent / "database" / "migrations"
+
+BENCHMARK_USER_ID = "00000000-0000-0000-0000-000000000001"
+
+SEED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (id uuid PRIMARY KEY, first_name text, last_name text);
+CREATE TABLE IF NOT EXISTS projects (id uuid PRIMARY KEY, name text);
+CREATE TABLE IF NOT EXISTS user_project_assignments (user_id uuid, project_id uuid);
+CREATE TABLE IF NOT EXISTS tasks (
+  id uuid PRIMARY KEY, name text, description text, status text, priority text,
+  start_date timestamptz, due_date timestamptz, estimated_duration_minutes int,
+  parent_project_id uuid, author_user_id uuid,
+  created_at timestamptz DEFAULT now(), updated_at timestamptz DEFAULT now()
+);
+CREATE TABLE IF NOT EXISTS task_user_assignments (task_id uuid, user_id uuid);
+CREATE TABLE IF NOT EXISTS notes (
+  id uuid PRIMARY KEY, name text, description text, parent_project_id uuid, author_user_id uuid,
+  created_at timestamptz DEFAULT now(), updated_at timestamptz DEFAULT now()
+);
+CREATE TABLE IF NOT EXISTS shift_logs (
+  id uuid PRIMARY KEY, user_id uuid, clock_in_datetime timestamptz, clock_out_datetime timestamptz,
+  is_break boolean DEFAULT false
+);
+"""
+
+
+async def seed_database(tasks: int):
+    async with get_db_connection() as conn:
+        await conn.execute(SEED_SCHEMA)
+        await conn.execute(
+            "TRUNCATE users, projects, user_project_assignments, tasks, task_user_assignments, notes, shift_logs"
+        )
+        project_id = uuid.uuid4()
+        await conn.execute(
+            "INSERT INTO users VALUES ($1, 'Benchmark', 'User')", uuid.UUID(BENCHMARK_USER_ID)
+        )
+        await conn.execute("INSERT INTO projects VALUES ($1, 'Website')", project_id)
+        await conn.execute(
+            "INSERT INTO user_project_assignments VALUES ($1, $2)",
+            uuid.UUID(BENCHMARK_USER_ID),
+            project_id,
+        )
+        await conn.execute(
+            """
+            INSERT INTO tasks (id, name, description, status, priority, due_date, parent_project_id, author_user_id)
+            SELECT gen_random_uuid(), 'Task ' || g, 'Description of task ' || g,
+                   (ARRAY['open','inProgress','closed'])[g % 3 + 1], 'normal',
+                   now() + (g % 30) * interval '1 day', $1, $2
+            FROM generate_series(1, $3) g
+            """,
+            project_id,
+            uuid.UUID(BENCHMARK_USER_ID),
+            tasks,
+        )
+        await conn.execute("ANALYZE")
+
+    # CONCURRENTLY can't run inside a transaction - one statement at a time
+    for migration in sorted(MIGRATIONS_DIR.glob("*.sql")):
+        statements = [
+            statement.strip()
+            for statement in "\n".join(
+                line for line in migration.read_text().splitlines() if not line.startswith("--")
+            ).split(";")
+        ]
+        for statement in filter(None, statements):
+            try:
+                await execute_query(statement)
+            except asyncpg.PostgresError as e:
+                # ie. pg_trgm isn't installed on a plain local Postgres
+                print(f"Skipped migration statement: {e}")
+
+
+async def run_turn(graph, server: bool, client_delay: float) -> float:
+    config = {
+        "configurable": {
+            "thread_id": f"server-info-{uuid.uuid4().hex}",
+            "timezone_offset_minutes": 0,
+            "user_id": BENCHMARK_USER_ID,
+            "langgraph_auth_user": SupabaseUser(BENCHMARK_USER_ID),
+            "server_info_requests": server,
+        }
+    }
+    start = time.perf_counter()
+    await graph.ainvoke(
+        {"messages": [HumanMessage(content="what tasks are open?")]}, config
+    )
+    if (await graph.aget_state(config)).next:
+        # Interrupted for the client - simulated network round-trip and client side query
+        await asyncio.sleep(client_delay)
+        rows = await execute_query(
+            "SELECT id, name, status, due_date FROM tasks LIMIT 50"
+        )
+        await graph.ainvoke(Command(resume=json.dumps(rows, default=str)), config)
+    return time.perf_counter() - start
+
+
+async def run_benchmark(turns: int, client_delay: float, llm_latency: float, seed: bool, tasks: int):
+    if seed:
+        await seed_database(tasks)
+
+    install_fake_llms(FakeChatModel(latency=constant_latency(llm_latency)))
+    graph = graph_builder.compile(checkpointer=MemorySaver())
+
+    results = {}
+    for mode, server in (("client", False), ("server", True)):
+        latencies = [await run_turn(graph, server, client_delay) for _ in range(turns)]
+        results[mode] = {
+            "p50_seconds": round(percentile(latencies, 50), 4),
+            "p99_seconds": round(percentile(latencies, 99), 4),
+            "mean_seconds": round(statistics.mean(latencies), 4),
+        }
+    results["saved_per_turn_seconds"] = round(
+        results["client"]["mean_seconds"] - results["server"]["mean_seconds"], 4
+    )
+    print(json.dumps(results, indent=2))
+    await cleanup()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument(
+        "--client-delay", type=float, default=0.6, help="Seconds for the client round-trip"
+    )
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--seed", action="store_true")
+    parser.add_argument("--tasks", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(
+        run_benchmark(args.turns, args.client_delay, args.llm_latency, args.seed, args.tasks)
+    )
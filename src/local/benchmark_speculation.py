@@ -0,0 +1,86 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from src.agent import graph_builder
+from src.local.benchmark_replay import LATENCY_DISTRIBUTIONS, replay_turn
+from src.local.corpus import CorpusResponder, load_corpus
+from src.local.fake_llm import FakeChatModel, install_fake_llms
+from src.speculation import speculation_predictor, speculation_stats
+
+# Replays the recorded conversation corpus without and with speculative execution of the planner's
+# next node. Reports wall time and LLM calls per turn for both, the speculation hit rate and the
+# planner wait saved per turn. Misses cost the speculative LLM call, so llm_calls_per_turn rises.
+# Run: poetry run python -m src.local.benchmark_speculation --repeats 5
+
+
+async def replay(conversations: list[dict], repeats: int, latency: str, llm_latency: float, speculative: bool) -> dict:
+    random.seed(0)
+    fake_llm = install_fake_llms(
+        FakeChatModel(
+            responder=CorpusResponder(conversations),
+            latency=LATENCY_DISTRIBUTIONS[latency](llm_latency),
+        )
+    )
+    speculation_predictor.reset()
+    speculation_stats.reset()
+    graph = graph_builder.compile(checkpointer=MemorySaver())
+
+    turns = 0
+    mismatched_turns = 0
+    start_time = time.perf_counter()
+    for repeat in range(repeats):
+        for conversation in conversations:
+            config = {
+                "configurable": {
+                    "thread_id": f"speculation-{repeat}-{conversation['id']}",
+                    "timezone_offset_minutes": 0,
+                    # Measure the planner path
+                    "fast_path_enabled": False,
+                    "speculative_execution": speculative,
+                }
+            }
+            for turn in conversation["turns"]:
+                turns += 1
+                response = await replay_turn(graph, config, turn)
+                mismatched_turns += response != turn["response"]
+
+    results = {
+        "seconds_per_turn": round((time.perf_counter() - start_time) / turns, 3),
+        "llm_calls_per_turn": round(fake_llm.call_count / turns, 2),
+        "mismatched_turns": mismatched_turns,
+    }
+    if speculative:
+        stats = speculation_stats.summary()
+        results["seconds_saved_per_turn"] = round(stats["seconds_saved"] / turns, 3)
+        results["speculation"] = stats
+    return results
+
+
+async def run_benchmark(repeats: int, latency: str, llm_latency: float) -> dict:
+    conversations = load_corpus()
+    baseline = await replay(conversations, repeats, latency, llm_latency, speculative=False)
+    speculative = await replay(conversations, repeats, latency, llm_latency, speculative=True)
+    results = {
+        "turns": repeats * sum(len(conversation["turns"]) for conversation in conversations),
+        "latency": latency,
+        "llm_latency": llm_latency,
+        "baseline": baseline,
+        "speculative": speculative,
+        "wall_time_saved": round(1 - speculative["seconds_per_turn"] / baseline["seconds_per_turn"], 3),
+    }
+    print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=5, help="Times the corpus is replayed")
+    parser.add_argument("--latency", choices=list(LATENCY_DISTRIBUTIONS), default="constant")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Median seconds per LLM call")
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.repeats, args.latency, args.llm_latency))
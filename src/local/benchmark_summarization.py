@@ -0,0 +1,101 @@
+import argparse
+import asyncio
+import json
+import time
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from src.agent import graph_builder
+from src.local.benchmark_replay import replay_turn
+from src.local.corpus import CorpusResponder, load_corpus
+from src.local.fake_llm import FakeChatModel, constant_latency, install_fake_llms
+from src.local.load_test import percentile
+from src.nodes.node_summarize_history import DEFAULT_SUMMARY_HORIZON_MESSAGES
+
+# State size of one long-lived thread, without and with rolling summarization. The recorded
+# corpus turns are replayed one after another in a single thread for 500 turns, reporting the
+# messages in state, the serialized size of the latest checkpoint's values and the time to
+# serialize them, and the wall time per turn.
+# Run: poetry run python -m src.local.benchmark_summarization --turns 500
+
+REPORT_AT_TURNS = (50, 100, 250, 500)
+
+
+class SummarizingCorpusResponder(CorpusResponder):
+    """Corpus responder that also answers the summarizer's prompt"""
+
+    def __init__(self, conversations: list[dict]):
+        super().__init__(conversations)
+        self.summary_calls = 0
+
+    def __call__(self, messages: list[BaseMessage], tool_names: list[str]) -> AIMessage:
+        if not tool_names and messages[-1].content.startswith("EXISTING SUMMARY:"):
+            self.summary_calls += 1
+            return AIMessage(
+                content=f"The user manages tasks, notes and shifts with the assistant (summary {self.summary_calls})."
+            )
+        return super().__call__(messages, tool_names)
+
+
+async def replay_long_thread(turns: int, horizon: int, llm_latency: float) -> list[dict]:
+    conversations = load_corpus()
+    corpus_turns = [turn for conversation in conversations for turn in conversation["turns"]]
+    responder = SummarizingCorpusResponder(conversations)
+    install_fake_llms(FakeChatModel(responder=responder, latency=constant_latency(llm_latency)))
+    graph = graph_builder.compile(checkpointer=MemorySaver())
+    serde = JsonPlusSerializer()
+    config = {
+        "configurable": {
+            "thread_id": f"long-thread-{horizon}",
+            "timezone_offset_minutes": 0,
+            "summary_horizon_messages": horizon,
+        }
+    }
+
+    results = []
+    turn_ms = []
+    for turn_number in range(1, turns + 1):
+        start = time.perf_counter()
+        await replay_turn(graph, config, corpus_turns[(turn_number - 1) % len(corpus_turns)])
+        turn_ms.append((time.perf_counter() - start) * 1000)
+
+        if turn_number in REPORT_AT_TURNS or turn_number == turns:
+            values = (await graph.aget_state(config)).values
+            start = time.perf_counter()
+            serialized = [serde.dumps_typed(value) for value in values.values()]
+            serialize_ms = (time.perf_counter() - start) * 1000
+            results.append(
+                {
+                    "turns": turn_number,
+                    "messages": len(values["messages"]),
+                    "state_bytes": sum(len(blob) for _, blob in serialized),
+                    "serialize_ms": round(serialize_ms, 2),
+                    "turn_ms_p50": round(percentile(turn_ms, 50), 2),
+                    "summary_llm_calls": responder.summary_calls,
+                }
+            )
+            turn_ms = []
+    return results
+
+
+async def run_benchmark(turns: int, horizon: int, llm_latency: float) -> dict:
+    results = {
+        "horizon": horizon,
+        "without_summarization": await replay_long_thread(turns, 0, llm_latency),
+        "with_summarization": await replay_long_thread(turns, horizon, llm_latency),
+    }
+    print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=max(REPORT_AT_TURNS), help="Turns in the thread")
+    parser.add_argument(
+        "--horizon", type=int, default=DEFAULT_SUMMARY_HORIZON_MESSAGES, help="Messages kept verbatim"
+    )
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds per LLM call")
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.turns, args.horizon, args.llm_latency))
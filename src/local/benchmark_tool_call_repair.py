@@ -0,0 +1,135 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.types import Command
+
+from src import llm_config
+from src.agent import graph_builder
+from src.local.corpus import PLANNER_SCHEMAS, CorpusResponder, load_corpus
+from src.local.fake_llm import FakeChatModel, constant_latency, install_fake_llms
+from src.tools.tool_call_repair import tool_call_repair_stats
+
+# Replays the recorded conversation corpus with a model that gets some tool calls wrong the way
+# production models do - tool calls written as text, enum values in the wrong case, made up args,
+# or no tool call at all. Reports how many were repaired locally and how many still cost another
+# LLM call. Every repaired response is an LLM retry the tool caller used to make.
+# Run: poetry run python -m src.local.benchmark_tool_call_repair --malformed-rate 0.3
+
+
+def malform_text_tool_call(call: dict) -> AIMessage:
+    return AIMessage(content=f"<function={call['name']}>{json.dumps(call['args'])}</function>")
+
+
+def malform_enum_case(call: dict) -> AIMessage:
+    args = {
+        key: value.upper() if key in ("task_status", "task_priority") and isinstance(value, str) else value
+        for key, value in call["args"].items()
+    }
+    if call["name"] == "create_task":
+        args.setdefault("task_priority", "Very High")
+    return AIMessage(content="", tool_calls=[{**call, "args": args}])
+
+
+def malform_unknown_arg(call: dict) -> AIMessage:
+    return AIMessage(content="", tool_calls=[{**call, "args": {**call["args"], "reason": "user asked"}}])
+
+
+def malform_no_tool_call(call: dict) -> AIMessage:
+    return AIMessage(content="Sure, I'll take care of that.")
+
+
+MALFORMATIONS = (
+    malform_text_tool_call,
+    malform_enum_case,
+    malform_unknown_arg,
+    malform_no_tool_call,
+)
+
+
+class MalformedToolCallResponder(CorpusResponder):
+    """Corpus responder that malforms a fraction of the tool caller's tool calls"""
+
+    def __init__(self, conversations: list[dict], malformed_rate: float):
+        super().__init__(conversations)
+        self.malformed_rate = malformed_rate
+
+    def __call__(self, messages: list[BaseMessage], tool_names: list[str]) -> AIMessage:
+        response = super().__call__(messages, tool_names)
+        is_tool_call = tool_names and not any(name in PLANNER_SCHEMAS for name in tool_names)
+        # Retries aren't malformed, like a model that gets it right when told what was wrong
+        is_retry = isinstance(messages[-1], HumanMessage) and "RETRY ATTEMPT" in messages[-1].content
+        if is_tool_call and response.tool_calls and not is_retry and random.random() < self.malformed_rate:
+            call = response.tool_calls[0]
+            return random.choice(MALFORMATIONS)({"name": call["name"], "args": call["args"], "id": call["id"]})
+        return response
+
+
+async def run_benchmark(repeats: int, llm_latency: float, malformed_rate: float) -> dict:
+    random.seed(0)
+    conversations = load_corpus()
+    fake_llm = install_fake_llms(
+        FakeChatModel(
+            responder=MalformedToolCallResponder(conversations, malformed_rate),
+            latency=constant_latency(llm_latency),
+        )
+    )
+    llm_config.tier_stats.reset()
+    tool_call_repair_stats.reset()
+    graph = graph_builder.compile(checkpointer=MemorySaver())
+
+    turns = 0
+    start_time = time.perf_counter()
+    for repeat in range(repeats):
+        for conversation in conversations:
+            config = {
+                "configurable": {
+                    "thread_id": f"repair-{repeat}-{conversation['id']}",
+                    "timezone_offset_minutes": 0,
+                    "fast_path_enabled": False,
+                }
+            }
+            for turn in conversation["turns"]:
+                turns += 1
+                await graph.ainvoke({"messages": [HumanMessage(content=turn["user"])]}, config)
+
+                # Answer each ai request as the client would
+                for recorded_call in turn["tool_calls"]:
+                    state = await graph.aget_state(config)
+                    if not state.next:
+                        break
+                    await graph.ainvoke(Command(resume=recorded_call["client_result"]), config)
+
+    total_seconds = time.perf_counter() - start_time
+    repair_stats = tool_call_repair_stats.summary()
+    results = {
+        "turns": turns,
+        "malformed_rate": malformed_rate,
+        "seconds_per_turn": round(total_seconds / turns, 3),
+        "llm_calls_per_turn": round(fake_llm.call_count / turns, 2),
+        "tool_caller_retries": llm_config.tier_stats.summary()["retries"].get("tool_caller", 0),
+        # Each of these used to be another full LLM call
+        "llm_retries_avoided": repair_stats["repaired"],
+        "seconds_saved_per_turn": round(repair_stats["repaired"] * llm_latency / turns, 3),
+        **repair_stats,
+    }
+    print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=5, help="Times the corpus is replayed")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Seconds per LLM call")
+    parser.add_argument(
+        "--malformed-rate",
+        type=float,
+        default=0.3,
+        help="Fraction of tool calls the model gets wrong on the first attempt",
+    )
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.repeats, args.llm_latency, args.malformed_rate))
@@ -0,0 +1,78 @@
+import json
+import os
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+
+from src.local.fake_llm import tool_call
+
+# Recorded conversations used by the offline benchmarks. Each turn records the user's request,
+# the tool calls that completed it (with the client's result for each) and the final response.
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "recorded_conversations.json")
+
+PLANNER_SCHEMAS = ("PlannerDecision", "FusedPlannerDecision")
+
+
+def load_corpus(path: str = CORPUS_PATH) -> list[dict]:
+    with open(path) as file:
+        return json.load(file)["conversations"]
+
+
+class CorpusResponder:
+    """FakeChatModel responder that replays the recorded tool calls and responses of a corpus
+
+    The current turn is found from the latest user message, and the step within the turn from the
+    number of tool results that came back since then.
+    """
+
+    def __init__(self, conversations: list[dict]):
+        self.turns = {
+            turn["user"]: turn
+            for conversation in conversations
+            for turn in conversation["turns"]
+        }
+
+    def _current_turn(self, messages: list[BaseMessage]) -> tuple[dict, int]:
+        step = 0
+        for message in reversed(messages):
+            if isinstance(message, ToolMessage):
+                step += 1
+            elif isinstance(message, HumanMessage) and message.content in self.turns:
+                # Other human messages are instructions from the nodes (ie. retry guidance)
+                return self.turns[message.content], step
+        raise ValueError("No user message found in the prompt")
+
+    def __call__(self, messages: list[BaseMessage], tool_names: list[str]) -> AIMessage:
+        turn, step = self._current_turn(messages)
+        tool_calls = turn["tool_calls"]
+        next_tool_call = tool_calls[step] if step < len(tool_calls) else None
+
+        planner_schema = next(
+            (name for name in tool_names if name in PLANNER_SCHEMAS), None
+        )
+        if planner_schema:
+            plan = "\n".join(
+                f"{index + 1}. Call {call['name']}" + (" (done)" if index < step else "")
+                for index, call in enumerate(tool_calls)
+            )
+            decision = {
+                "plan": plan + f"\n{len(tool_calls) + 1}. Respond to the user",
+                "next_node": "tool_caller" if next_tool_call else "response_generator",
+                "next_node_instructions": (
+                    f"Call {next_tool_call['name']} with {json.dumps(next_tool_call['args'])}"
+                    if next_tool_call
+                    else "Tell the user what was done"
+                ),
+            }
+            if planner_schema == "FusedPlannerDecision" and next_tool_call:
+                decision["tool_call"] = {
+                    "name": next_tool_call["name"],
+                    "args": next_tool_call["args"],
+                }
+            return tool_call(planner_schema, decision)
+
+        if tool_names and next_tool_call:
+            return tool_call(next_tool_call["name"], next_tool_call["args"])
+
+        return AIMessage(content=turn["response"])
+
@@ -0,0 +1,224 @@
+import asyncio
+import json
+import random
+import time
+import uuid
+from typing import Any, AsyncIterator, Callable, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    HumanMessage,
+    ToolMessage,
+)
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+# Local stand-in for the Groq chat models - used by the load test and benchmarks so they can run
+# without network access. Responses are produced by a `responder` function and returned after an
+# injected latency, so graph overhead can be measured separately from LLM time.
+
+
+def tool_call(name: str, args: dict) -> AIMessage:
+    return AIMessage(
+        content="",
+        tool_calls=[{"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:12]}"}],
+    )
+
+
+# Default script: plan -> call find_tasks -> answer, which is the shape of most chat turns
+def default_responder(messages: list[BaseMessage], tool_names: list[str]) -> AIMessage:
+    last_message = messages[-1] if messages else None
+
+    if "PlannerDecision" in tool_names:
+        if isinstance(last_message, ToolMessage):
+            return tool_call(
+                "PlannerDecision",
+                {
+                    "plan": "1. Fetched tasks (done)\n2. Respond to the user",
+                    "next_node": "response_generator",
+                    "next_node_instructions": "Summarize the tasks that were found",
+                },
+            )
+        return tool_call(
+            "PlannerDecision",
+            {
+                "plan": "1. Fetch tasks\n2. Respond to the user",
+                "next_node": "tool_caller",
+                "next_node_instructions": "Use find_tasks to fetch the user's tasks",
+            },
+        )
+
+    if "find_tasks" in tool_names:
+        return tool_call("find_tasks", {"show_to_user": False})
+
+    if isinstance(last_message, HumanMessage):
+        return AIMessage(content=f"You said: {last_message.content}")
+    return AIMessage(content="Here is what I found.")
+
+
+def constant_latency(seconds: float) -> Callable[[], float]:
+    return lambda: seconds
+
+
+def lognormal_latency(median_seconds: float, sigma: float = 0.5) -> Callable[[], float]:
+    # Long tailed like real provider latency
+    return lambda: random.lognormvariate(0, sigma) * median_seconds
+
+
+def estimate_tokens(messages: list[BaseMessage]) -> int:
+    return sum(len(str(message.content)) for message in messages) // 4 + 1
+
+
+class FakeProviderError(Exception):
+    """Injected provider failure (ie. a rate limit or a 5xx)"""
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that answers with scripted responses after an injected latency"""
+
+    responder: Callable[[list[BaseMessage], list[str]], AIMessage] = default_responder
+    latency: Callable[[], float] = constant_latency(0.0)
+    # Delay between streamed tokens - latency is the time to first token when streaming
+    token_latency: float = 0.0
+    model_name: str = "fake-chat-model"
+    # Fraction of calls that fail with FakeProviderError after the latency
+    failure_rate: float = 0.0
+
+    # Stats
+    call_count: int = 0
+    total_latency_seconds: float = 0.0
+    total_input_tokens: int = 0
+    total_output_tokens: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def bind_tools(self, tools: list, tool_choice: Optional[Any] = None, **kwargs):
+        formatted_tools = [convert_to_openai_tool(tool) for tool in tools]
+        return self.bind(tools=formatted_tools, tool_choice=tool_choice, **kwargs)
+
+    def _respond(self, messages: list[BaseMessage], **kwargs) -> ChatResult:
+        tool_names = [tool["function"]["name"] for tool in kwargs.get("tools") or []]
+        message = self.responder(messages, tool_names)
+        # Tools are sent with every request, so they count towards the prompt
+        input_tokens = estimate_tokens(messages) + len(json.dumps(kwargs.get("tools") or [])) // 4
+        output_tokens = estimate_tokens([message]) + len(json.dumps(message.tool_calls)) // 4
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        self.total_input_tokens += input_tokens
+        self.total_output_tokens += output_tokens
+        message.response_metadata = {"model_name": self.model_name}
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _record_call(self, latency_seconds: float):
+        self.call_count += 1
+        self.total_latency_seconds += latency_seconds
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise FakeProviderError(f"{self.model_name}: injected failure")
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        latency_seconds = self.latency()
+        time.sleep(latency_seconds)
+        self._record_call(latency_seconds)
+        return self._respond(messages, **kwargs)
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        latency_seconds = self.latency()
+        await asyncio.sleep(latency_seconds)
+        self._record_call(latency_seconds)
+        return self._respond(messages, **kwargs)
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        latency_seconds = self.latency()
+        await asyncio.sleep(latency_seconds)
+        self._record_call(latency_seconds)
+        message = self._respond(messages, **kwargs).generations[0].message
+
+        # Tool calls arrive as a single chunk, text is streamed word by word
+        if message.tool_calls:
+            tool_call_chunks = [
+                {
+                    "name": call["name"],
+                    "args": json.dumps(call["args"]),
+                    "id": call["id"],
+                    "index": index,
+                }
+                for index, call in enumerate(message.tool_calls)
+            ]
+            chunks = [AIMessageChunk(content="", tool_call_chunks=tool_call_chunks)]
+        else:
+            words = str(message.content).split(" ")
+            chunks = [
+                AIMessageChunk(content=word if index == 0 else " " + word)
+                for index, word in enumerate(words)
+            ]
+        chunks[-1].usage_metadata = message.usage_metadata
+        chunks[-1].response_metadata = message.response_metadata
+
+        for index, chunk in enumerate(chunks):
+            if index > 0 and self.token_latency:
+                await asyncio.sleep(self.token_latency)
+            generation_chunk = ChatGenerationChunk(message=chunk)
+            if run_manager:
+                await run_manager.on_llm_new_token(
+                    str(chunk.content), chunk=generation_chunk
+                )
+            yield generation_chunk
+
+
+# Point every node at the given fake model (nodes look up models on src.llm_config at call time)
+# small_llm replaces the small tier model, which defaults to the same fake
+def install_fake_llms(
+    fake_llm: FakeChatModel, small_llm: Optional[FakeChatModel] = None
+) -> FakeChatModel:
+    from src import llm_config
+    from src.tools.tools import get_all_tools
+
+    small_llm = small_llm or fake_llm
+    llm_config.llm = fake_llm
+    llm_config.single_call_llm = small_llm
+    for name, model in (("llm", fake_llm), ("single_call_llm", small_llm)):
+        setattr(
+            llm_config,
+            f"{name}_with_tools",
+            model.bind_tools(
+                get_all_tools(), tool_choice=llm_config.TOOL_CHOICE, parallel_tool_calls=False
+            ),
+        )
+        setattr(
+            llm_config,
+            f"{name}_with_parallel_tools",
+            model.bind_tools(
+                get_all_tools(), tool_choice=llm_config.TOOL_CHOICE, parallel_tool_calls=True
+            ),
+        )
+    return fake_llm
@@ -0,0 +1,77 @@
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.types import Command
+
+from src.agent import graph_builder
+from src.instrumentation import instrumentation, prompt_prefix_stats
+from src.local.fake_llm import FakeChatModel, install_fake_llms, lognormal_latency
+
+# Drives N simultaneous conversations through the graph on one event loop against a fake LLM that
+# injects latency, and reports throughput and latency percentiles, plus the per node breakdown from
+# the instrumentation ring buffer (which node dominates a turn under load).
+# Run: poetry run python -m src.local.load_test --conversations 200 --llm-latency 0.5
+
+
+def percentile(values: list[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# One chat turn: user request -> tool call -> client executes the ai request -> response
+async def run_conversation(graph, index: int) -> float:
+    config = {
+        "configurable": {
+            "thread_id": f"load-test-{index}",
+            "timezone_offset_minutes": 0,
+        }
+    }
+    start = time.perf_counter()
+    await graph.ainvoke(
+        {"messages": [HumanMessage(content="what tasks are due today?")]}, config
+    )
+    # Graph is interrupted at execute_ai_request_on_client - answer as the client would
+    await graph.ainvoke(Command(resume=json.dumps([])), config)
+    return time.perf_counter() - start
+
+
+async def run_load_test(conversations: int, llm_latency: float) -> dict:
+    fake_llm = install_fake_llms(FakeChatModel(latency=lognormal_latency(llm_latency)))
+    graph = graph_builder.compile(checkpointer=MemorySaver())
+    instrumentation.ring_buffer.clear()
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(
+        *(run_conversation(graph, index) for index in range(conversations))
+    )
+    total_seconds = time.perf_counter() - start
+
+    results = {
+        "conversations": conversations,
+        "llm_calls": fake_llm.call_count,
+        "total_seconds": round(total_seconds, 3),
+        "throughput_per_second": round(conversations / total_seconds, 2),
+        "p50_seconds": round(percentile(latencies, 50), 3),
+        "p99_seconds": round(percentile(latencies, 99), 3),
+        "mean_seconds": round(statistics.mean(latencies), 3),
+        "nodes": instrumentation.ring_buffer.summary(),
+        "prompt_prefixes": prompt_prefix_stats.summary(),
+    }
+    print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument(
+        "--llm-latency", type=float, default=0.5, help="Median seconds per LLM call"
+    )
+    args = parser.parse_args()
+    asyncio.run(run_load_test(args.conversations, args.llm_latency))
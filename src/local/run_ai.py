@@ -1,9 +1,16 @@
+import asyncio
+import os
+import sys
+import time
+
 from src.agent_state import AgentState, AiBehaviorMode
 from src.agent import graph_builder  # Import the graph object
 from langchain_core.messages import ToolMessage, HumanMessage
 
 from langgraph.checkpoint.memory import MemorySaver
 
+from src.database.checkpointer import create_checkpointer
+
 
 # === LangGraphCloud Message Format ===
 # Must match the state format
@@ -32,13 +39,15 @@ from langchain_core.messages.base import BaseMessage
 # Build the Local Graph
 local_graph = graph_builder.compile(
     # interrupt_before=["execute_ai_request_on_client"],
-    checkpointer=MemorySaver(),
+    # CHECKPOINTER_BACKEND=sqlite keeps threads across runs
+    checkpointer=create_checkpointer(os.environ.get("CHECKPOINTER_BACKEND")) or MemorySaver(),
 )
 
 
 # Use for testing to allow insertion of messages into the graph
-def run_ai_with_messages(messages: list[BaseMessage]) -> list[BaseMessage]:
-    events = local_graph.stream(
+# Graph nodes are async, so the graph must be driven through the async API
+async def arun_ai_with_messages(messages: list[BaseMessage]) -> list[BaseMessage]:
+    events = local_graph.astream(
         # Issue - when sending message hi and ui context is provided, ai stupidly calls find task ....
         # AgentState(messages=messages, ui_context="current task name = Kill Bats"), config=config, stream_mode="values"
         AgentState(
@@ -55,7 +64,7 @@ def run_ai_with_messages(messages: list[BaseMessage]) -> list[BaseMessage]:
     # print(snapshot)
 
     messages_list = []
-    for event in events:
+    async for event in events:
         if "messages" in event:
             last_message = event["messages"][-1]
             messages_list.append(last_message)
@@ -63,6 +72,48 @@ def run_ai_with_messages(messages: list[BaseMessage]) -> list[BaseMessage]:
     return messages_list
 
 
+def run_ai_with_messages(messages: list[BaseMessage]) -> list[BaseMessage]:
+    return asyncio.run(arun_ai_with_messages(messages))
+
+
+# Stream the response generator's tokens as they arrive and report time-to-first-token
+# Run: poetry run python -m src.local.run_ai "what tasks are due today?"
+async def arun_ai_streaming(messages: list[BaseMessage]) -> str:
+    start_time = time.perf_counter()
+    first_token_time = None
+    response_text = ""
+
+    async for message_chunk, metadata in local_graph.astream(
+        AgentState(messages=messages),
+        config=config,
+        stream_mode="messages",
+    ):
+        # Only the response generator talks to the user - other nodes' messages are internal
+        if metadata.get("langgraph_node") != "response_generator":
+            continue
+        if not message_chunk.content:
+            continue
+
+        if first_token_time is None:
+            first_token_time = time.perf_counter()
+        response_text += message_chunk.content
+        print(message_chunk.content, end="", flush=True)
+
+    total_time = time.perf_counter() - start_time
+    print()
+    if first_token_time is None:
+        print(f"No response tokens streamed (graph interrupted?) - total time: {total_time:.2f}s")
+    else:
+        print(
+            f"Time to first token: {first_token_time - start_time:.2f}s - total time: {total_time:.2f}s"
+        )
+    return response_text
+
+
+def run_ai_streaming_with_user_input(user_input: str) -> str:
+    return asyncio.run(arun_ai_streaming([HumanMessage(content=user_input)]))
+
+
 def run_ai_with_user_input(user_input: str) -> list[BaseMessage]:
     return run_ai_with_messages([HumanMessage(content=user_input)])
 
@@ -89,3 +140,7 @@ def run_ai_with_custom_input(input: str) -> list[BaseMessage]:
             messages.append(HumanMessage(content=chunk))
 
     return run_ai_with_messages(messages)
+
+
+if __name__ == "__main__":
+    run_ai_streaming_with_user_input(" ".join(sys.argv[1:]) or "hi")
@@ -0,0 +1,100 @@
+import uuid
+from typing import Optional
+
+from langchain_core.messages import (
+    BaseMessage,
+    RemoveMessage,
+    convert_to_messages,
+    message_chunk_to_message,
+)
+from langgraph.graph.message import Messages
+
+# Message container and reducer for AgentState.messages. Behaves like langgraph's add_messages,
+# but keeps an id -> index map next to the list, so matching an update's ids (appends, the client
+# result replacing its pending ToolMessage) costs O(1) per message instead of a scan of the thread.
+#
+# Each update is still O(n) in the thread's length: the previous value is never mutated (LangGraph
+# hands it to the checkpointer's background write and to stream consumers), so every update makes
+# one shallow copy of the list. That copy is a C-level pointer copy - much cheaper than add_messages'
+# per-message Python scan, but it grows with the thread. The index is not copied, it is shared between a value and the values derived from it by appends and replaces - positions don't
+# move for those, so an entry past a value's end just means the message was added after it. Only the
+# newest value may add entries; appending to an older one (a fork of the thread) and removals
+# build a new index.
+#
+# IndexedMessages is a list, so checkpoints serialize it as one and the delta checkpointer diffs it
+# like before. Values restored from a checkpoint come back as plain lists and are indexed on the
+# first update.
+
+
+class _MessageIndex(dict):
+    """id -> position, shared by the values derived by appends and replaces"""
+
+    # Length of the newest value sharing the index
+    __slots__ = ("length",)
+
+
+class IndexedMessages(list):
+    """List of messages with an id -> index map"""
+
+    __slots__ = ("_index",)
+
+    def __init__(self, messages=(), index: Optional[_MessageIndex] = None):
+        super().__init__(messages)
+        if index is None:
+            index = _MessageIndex((message.id, position) for position, message in enumerate(self))
+            index.length = len(self)
+        self._index = index
+
+    def index_of(self, message_id: str) -> Optional[int]:
+        """Position of the message with this id, None if it's not in the list"""
+        position = self._index.get(message_id)
+        return position if position is not None and position < len(self) else None
+
+    def _append_message(self, message: BaseMessage):
+        if len(self) != self._index.length:
+            # A newer value owns the index
+            self._index = _MessageIndex((existing.id, position) for position, existing in enumerate(self))
+        self._index[message.id] = len(self)
+        self.append(message)
+        self._index.length = len(self)
+
+
+def _coerce(messages: Messages) -> list[BaseMessage]:
+    if not isinstance(messages, list):
+        messages = [messages]
+    coerced = [message_chunk_to_message(message) for message in convert_to_messages(messages)]
+    for message in coerced:
+        if message.id is None:
+            message.id = str(uuid.uuid4())
+    return coerced
+
+
+def add_messages_indexed(left: Messages, right: Messages) -> IndexedMessages:
+    """Merge right into left - messages with a known id replace the existing one, RemoveMessage
+    deletes it, everything else is appended"""
+    if not isinstance(left, IndexedMessages):
+        # Graph input or a value restored from a checkpoint
+        left = IndexedMessages(_coerce(left))
+    right = _coerce(right)
+
+    merged = IndexedMessages(left, left._index)
+    ids_to_remove = set()
+    for message in right:
+        position = merged.index_of(message.id)
+        if position is not None:
+            if isinstance(message, RemoveMessage):
+                ids_to_remove.add(message.id)
+            else:
+                ids_to_remove.discard(message.id)
+                merged[position] = message
+        else:
+            if isinstance(message, RemoveMessage):
+                raise ValueError(
+                    f"Attempting to delete a message with an ID that doesn't exist ('{message.id}')"
+                )
+            merged._append_message(message)
+
+    if ids_to_remove:
+        return IndexedMessages(message for message in merged if message.id not in ids_to_remove)
+    return merged
+
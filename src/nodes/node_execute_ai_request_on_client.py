@@ -0,0 +1,115 @@
+import json
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables.config import RunnableConfig
+from langgraph.types import interrupt
+
+from src.agent_state import AgentState
+from src.tools.result_compaction import (
+    compact_ai_request_result,
+    get_info_request_type,
+)
+
+MISSING_CLIENT_RESULT = "ERROR: The client returned no result for this request"
+
+# Set in response_metadata of tool messages already answered by execute_ai_request_on_server
+EXECUTED_ON_SERVER = "executed_on_server"
+
+
+def get_pending_tool_messages(messages: list) -> list[ToolMessage]:
+    """Tool messages produced since the last AI tool call - the requests waiting on the client"""
+    pending_tool_messages = []
+    for message in reversed(messages):
+        if isinstance(message, ToolMessage):
+            if not message.response_metadata.get(EXECUTED_ON_SERVER):
+                pending_tool_messages.append(message)
+        elif isinstance(message, AIMessage):
+            break
+    return list(reversed(pending_tool_messages))
+
+
+def _to_content(result) -> str:
+    return result if isinstance(result, str) else json.dumps(result)
+
+
+def match_client_results(ai_request_result, pending_tool_messages: list[ToolMessage]) -> dict:
+    """Map the client's interrupt payload to {tool_call_id: result content}
+
+    The payload answers every pending request at once in one of these forms:
+    - {tool_call_id: result, ...}
+    - [{"tool_call_id": ..., "result": ...}, ...]
+    - a single result, which answers the last pending request (single tool call turns)
+    """
+    pending_ids = [message.tool_call_id for message in pending_tool_messages]
+
+    if isinstance(ai_request_result, dict) and ai_request_result and all(
+        key in pending_ids for key in ai_request_result
+    ):
+        return {
+            tool_call_id: _to_content(result)
+            for tool_call_id, result in ai_request_result.items()
+        }
+
+    if (
+        isinstance(ai_request_result, list)
+        and ai_request_result
+        and all(
+            isinstance(item, dict) and item.get("tool_call_id") in pending_ids
+            for item in ai_request_result
+        )
+    ):
+        return {
+            item["tool_call_id"]: _to_content(item.get("result", item.get("content")))
+            for item in ai_request_result
+        }
+
+    return {pending_ids[-1]: _to_content(ai_request_result)}
+
+
+# === EXECUTE AI REQUEST ON CLIENT
+# Node interrupted - client expected to respond and update tool message(s) with result
+def node_execute_ai_request_on_client(state: AgentState, config: RunnableConfig):
+    # Get the client's response to the AI request(s)
+    ai_request_result = interrupt("Provide client ai request execution result:")
+
+    # Get the current messages
+    messages = state["messages"]
+
+    pending_tool_messages = get_pending_tool_messages(messages)
+    if not pending_tool_messages:
+        return {
+            "messages": [],
+            "prev_node_feedback": "Error: No tool messages found in state to update.",
+        }
+
+    results_by_tool_call_id = match_client_results(
+        ai_request_result, pending_tool_messages
+    )
+
+    # Compact results before they go into state - they're replayed into every later prompt
+    if config["configurable"].get("compact_client_results", True):
+        for tool_message in pending_tool_messages:
+            tool_call_id = tool_message.tool_call_id
+            if tool_call_id in results_by_tool_call_id:
+                results_by_tool_call_id[tool_call_id] = compact_ai_request_result(
+                    results_by_tool_call_id[tool_call_id],
+                    get_info_request_type(tool_message.content),
+                )
+
+    # Create updated versions of the tool messages with the same IDs
+    # This will cause add_messages to replace the originals
+    updated_messages = [
+        ToolMessage(
+            content=results_by_tool_call_id.get(
+                tool_message.tool_call_id, MISSING_CLIENT_RESULT
+            ),
+            tool_call_id=tool_message.tool_call_id,
+            name=tool_message.name,
+            id=tool_message.id,
+        )
+        for tool_message in pending_tool_messages
+    ]
+
+    # Return updated state
+    # The add_messages reducer will handle replacing the old messages with the new ones
+    return {"messages": updated_messages, "prev_node_feedback": ""}
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional
+
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables.config import RunnableConfig
+
+from src.agent_state import AgentState
+from src.auth import get_verified_user_id
+from src.database.info_requests import SERVER_INFO_REQUEST_TYPES, execute_info_request
+from src.nodes.node_execute_ai_request_on_client import (
+    EXECUTED_ON_SERVER,
+    get_pending_tool_messages,
+)
+from src.tools.result_compaction import compact_ai_request_result
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)  # ie. UUID
+
+
+def get_server_info_request(tool_message: ToolMessage) -> Optional[dict]:
+    """The AI request of a tool message if it can be answered on the server, otherwise None"""
+    try:
+        request = json.loads(tool_message.content)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(request, dict):
+        return None
+    if request.get("info_request_type") not in SERVER_INFO_REQUEST_TYPES:
+        return None
+    # Results the user should see are shown by the client, so those still go to the client
+    if (request.get("args") or {}).get("show_to_user", True):
+        return None
+    return request
+
+
+async def _execute_on_server(
+    tool_message: ToolMessage, request: dict, user_id: str, config: RunnableConfig
+) -> Optional[ToolMessage]:
+    configurable = config["configurable"]
+    try:
+        rows = await execute_info_request(
+            request["info_request_type"],
+            request.get("args"),
+            user_id,
+            configurable.get("timezone_offset_minutes", 0),
+        )
+    except Exception as e:
+        # Fall back to the client rather than failing the turn
+        logger.warning("Server info request failed, falling back to client: %s", e)
+        return None
+
+    result = json.dumps(rows, default=_json_default)
+    if configurable.get("compact_client_results", True):
+        result = compact_ai_request_result(result, request["info_request_type"])
+
+    # Same id so add_messages replaces the request with its result
+    return ToolMessage(
+        content=result,
+        tool_call_id=tool_message.tool_call_id,
+        name=tool_message.name,
+        id=tool_message.id,
+        response_metadata={EXECUTED_ON_SERVER: True},
+    )
+
+
+# === EXECUTE AI REQUEST ON SERVER
+# Answers read only info requests from Postgres - only requests the server can't answer
+# (ie. ui / action requests) interrupt for the client
+async def node_execute_ai_request_on_server(state: AgentState, config: RunnableConfig):
+    user_id = get_verified_user_id(config)
+    if not config["configurable"].get("server_info_requests", False) or not user_id:
+        return {"next_node": "execute_ai_request_on_client"}
+
+    pending_tool_messages = get_pending_tool_messages(state["messages"])
+    server_requests = [
+        (tool_message, request)
+        for tool_message in pending_tool_messages
+        if (request := get_server_info_request(tool_message)) is not None
+    ]
+
+    # Independent requests from one tool call turn run concurrently on separate pool connections
+    results = await asyncio.gather(
+        *(
+            _execute_on_server(tool_message, request, user_id, config)
+            for tool_message, request in server_requests
+        )
+    )
+    updated_messages = [result for result in results if result is not None]
+
+    answered_ids = {message.tool_call_id for message in updated_messages}
+    waiting_on_client = any(
+        message.tool_call_id not in answered_ids for message in pending_tool_messages
+    )
+    logger.debug("Answered %d/%d ai requests on server", len(updated_messages), len(pending_tool_messages))
+    return {
+        "messages": updated_messages,
+        "next_node": "execute_ai_request_on_client" if waiting_on_client else "planner",
+    }
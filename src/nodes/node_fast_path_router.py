@@ -0,0 +1,179 @@
+import re
+import time
+import uuid
+from typing import Optional
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables.config import RunnableConfig
+
+from src.agent_state import AgentState
+
+# Rule based router that runs before the planner. Trivial, high confidence requests
+# (ie. "show my tasks", "toggle my clock") are mapped straight to a prebuilt tool call, skipping
+# the planner and tool_caller LLM calls. Anything else falls through to the planner.
+
+# Planner + tool_caller calls skipped on a hit
+LLM_CALLS_SKIPPED_PER_HIT = 2
+
+# Used to estimate latency saved - roughly one 70B Groq call
+ESTIMATED_SECONDS_PER_LLM_CALL = 0.8
+
+_POLITE_PREFIX = r"(?:(?:please|can you|could you|hey)\s+)*"
+_POLITE_SUFFIX = r"(?:\s+(?:please|now|thanks))*"
+
+
+class FastPathIntent:
+    """An intent that maps a whole user message to one prebuilt tool call"""
+
+    def __init__(self, name: str, patterns: list[str], tool_name: str, tool_args: dict):
+        self.name = name
+        self.patterns = [
+            re.compile(f"^{_POLITE_PREFIX}{pattern}{_POLITE_SUFFIX}$")
+            for pattern in patterns
+        ]
+        self.tool_name = tool_name
+        self.tool_args = tool_args
+
+    def matches(self, text: str) -> bool:
+        return any(pattern.match(text) for pattern in self.patterns)
+
+
+# Patterns are anchored to the whole message so only unambiguous requests match
+FAST_PATH_INTENTS = [
+    FastPathIntent(
+        name="toggle_clock",
+        # toggle_clock_in_or_out ignores direction, so only phrasing without one - "clock me in"
+        # / "punch out" go to the planner, which checks the current shift first
+        patterns=[
+            r"toggle(?: my)? clock(?: in(?: or)? out)?",
+            r"(?:clock|punch)(?: me)? in or out",
+        ],
+        tool_name="toggle_clock_in_or_out",
+        tool_args={},
+    ),
+    FastPathIntent(
+        name="show_my_tasks",
+        patterns=[
+            r"(?:show|list|open|display)(?: me)?(?: all)? my tasks",
+            r"what are my tasks",
+        ],
+        tool_name="show_tasks",
+        tool_args={"task_type": "myTasks"},
+    ),
+    FastPathIntent(
+        name="show_recent_tasks",
+        patterns=[r"(?:show|list|open|display)(?: me)?(?: my)? recent tasks"],
+        tool_name="show_tasks",
+        tool_args={"task_type": "recentTasks"},
+    ),
+    FastPathIntent(
+        name="show_my_notes",
+        patterns=[r"(?:show|list|open|display)(?: me)?(?: all)? my notes"],
+        tool_name="show_notes",
+        tool_args={},
+    ),
+    FastPathIntent(
+        name="current_shift",
+        patterns=[
+            r"what(?:'s| is) my (?:current )?shift",
+            r"(?:show|get)(?: me)? my current shift",
+            r"am i clocked in",
+        ],
+        tool_name="get_current_shift_info",
+        tool_args={"show_to_user": True},
+    ),
+]
+
+
+def normalize_request(text: str) -> str:
+    text = text.lower().replace("’", "'")
+    text = re.sub(r"[^\w\s']", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def classify_fast_path_intent(text: str) -> Optional[FastPathIntent]:
+    normalized = normalize_request(text)
+    for intent in FAST_PATH_INTENTS:
+        if intent.matches(normalized):
+            return intent
+    return None
+
+
+class FastPathStats:
+    """Hit rate and latency saved per fast path intent"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.hits: dict[str, int] = {}
+        self.misses = 0
+        self.classify_seconds = 0.0
+
+    def record(self, intent: Optional[FastPathIntent], classify_seconds: float):
+        self.classify_seconds += classify_seconds
+        if intent is None:
+            self.misses += 1
+        else:
+            self.hits[intent.name] = self.hits.get(intent.name, 0) + 1
+
+    def summary(self) -> dict:
+        total_hits = sum(self.hits.values())
+        total = total_hits + self.misses
+        saved_per_hit = LLM_CALLS_SKIPPED_PER_HIT * ESTIMATED_SECONDS_PER_LLM_CALL
+        return {
+            "requests": total,
+            "hit_rate": total_hits / total if total else 0.0,
+            "avg_classify_ms": self.classify_seconds / total * 1000 if total else 0.0,
+            "intents": {
+                name: {
+                    "hits": hits,
+                    "llm_calls_skipped": hits * LLM_CALLS_SKIPPED_PER_HIT,
+                    "estimated_latency_saved_seconds": round(hits * saved_per_hit, 3),
+                }
+                for name, hits in self.hits.items()
+            },
+        }
+
+
+fast_path_stats = FastPathStats()
+
+
+async def node_fast_path_router(state: AgentState, config: RunnableConfig):
+    """Route trivial requests straight to a prebuilt tool call, otherwise to the planner"""
+    messages = state["messages"]
+    fast_path_enabled = config["configurable"].get("fast_path_enabled", True)
+
+    # Only the start of a fresh user turn is eligible
+    if (
+        not fast_path_enabled
+        or not messages
+        or not isinstance(messages[-1], HumanMessage)
+        or state.get("iteration_count")
+    ):
+        return {"next_node": "planner"}
+
+    start_time = time.perf_counter()
+    intent = classify_fast_path_intent(str(messages[-1].content))
+    fast_path_stats.record(intent, time.perf_counter() - start_time)
+
+    if intent is None:
+        return {"next_node": "planner"}
+
+    tool_call_message = AIMessage(
+        content="",
+        tool_calls=[
+            {
+                "name": intent.tool_name,
+                "args": dict(intent.tool_args),
+                "id": f"fast_path_{uuid.uuid4().hex[:12]}",
+            }
+        ],
+    )
+    return {
+        "messages": [tool_call_message],
+        "plan": f"1. Called {intent.tool_name} for the user's request (done)\n2. Use response_generator to tell the user the result",
+        "prev_node_feedback": "",
+        "iteration_count": 1,
+        "next_node": "tools",
+    }
@@ -1,10 +1,8 @@
 import json
-from langchain_anthropic import ChatAnthropic
-from langchain_openai import ChatOpenAI
-from langchain_groq import ChatGroq
+import logging
 
-# Import llm from llm_config
-from src.llm_config import llm
+# Import llm_config as a module so the configured llm is looked up at call time
+from src import llm_config
 
 from typing import Literal, Optional
 
@@ -13,17 +11,33 @@ from langgraph.graph.message import add_messages
 from pydantic import BaseModel, Field
 
 from langchain_core.messages import (
+    AIMessage,
     SystemMessage,
-    trim_messages,
 )
 
+import time
+import uuid
+
 from src.agent_state import AgentState
+from src.context_builder import build_context, log_prompt_tokens
+from src.instrumentation import record_prompt_prefix
+from src.config_schema import PlannerMode
+from src.plan_cache import get_turn, record_step, replay_step, start_turn, store_turn
+from src.speculation import start_speculation
 
-from src.tools.tools import get_all_tools
+from src.tools.tool_call_repair import get_tool_call_repairer
+from src.tools.tools import (
+    PARALLEL_INFO_TOOL_NAMES,
+    get_default_tool_set,
+    get_tool_set_key,
+)
 
 from datetime import datetime, timedelta, timezone
 
 from langgraph.types import Command
+from langgraph.constants import TAG_NOSTREAM
+
+logger = logging.getLogger(__name__)
 
 
 class PlannerDecision(BaseModel):
@@ -41,44 +55,28 @@ class PlannerDecision(BaseModel):
     )
 
 
-def node_planner(state: AgentState, config):
-    """Create a plan before executing any tools"""
-    messages = state["messages"]
-    current_plan = state.get("plan", "")
-    prev_node_feedback = state.get("prev_node_feedback", "")
-    iteration_count = state.get("iteration_count", 0)
+class FusedToolCall(BaseModel):
+    """Tool call to execute directly when next_node is 'tool_caller'"""
 
-    # Cap iterations to prevent infinite loops
-    if iteration_count > 10:
-        return {
-            "next_node": "response_generator",
-            "prev_node_feedback": "MAX ITERATIONS REACHED",
-        }
+    name: str = Field(description="Name of the tool to call, MUST BE one of the AVAILABLE TOOLS")
+    args: dict = Field(
+        description="Arguments for the tool call, using the argument names listed for the tool"
+    )
 
-    # Get context information
-    # timezone_offset_minutes = config["configurable"].get("timezone_offset_minutes", 0)
-    # tz = timezone(timedelta(minutes=timezone_offset_minutes))
-    # current_datetime = datetime.now(tz).strftime("%A, %d %B %Y %H:%M:%S")
-    ui_context = state.get("ui_context", "")
 
-    # Create available tools list - simplified to just names and descriptions
-    available_tools = []
-    for tool in get_all_tools():
-        available_tools.append({"name": tool.name, "description": tool.description})
+class FusedPlannerDecision(PlannerDecision):
+    """Decision output from the fused planning node - plan update and tool call in one"""
 
-    # Get recent message context
-    context_messages = trim_messages(
-        messages,
-        strategy="last",
-        token_counter=len,
-        max_tokens=10,
-        start_on="human",
-        end_on=("human", "tool", "ai"),
-        include_system=False,
+    tool_call: Optional[FusedToolCall] = Field(
+        default=None,
+        description="The tool call to execute when next_node is 'tool_caller', with all required arguments. Leave empty for 'response_generator'.",
     )
 
-    # Create planning system message
-    system_content = f"""    
+
+# Static part of the planner prompt - identical for every call
+# Prompt layout: static prefix (rules, examples, tool catalog) first and the per-call fields last, so
+# the prefix is byte identical across calls and threads and provider prompt caches can reuse it
+_PLANNER_PROMPT_PREFIX = """    
     YOUR PURPOSE: 
     You are an expert planner that orchestrates the completion of user requests by coordinating between a "tool_caller" node (which executes tools) and a "response_generator" node (which communicates with the user).
 
@@ -120,28 +118,272 @@ def node_planner(state: AgentState, config):
       1. Use tool_caller to fetch tasks with today's due date
       2. Use response_generator to provide a formatted list of today's tasks
     
-    CONTEXTUAL INFORMATION:
-    - Current UI context: {ui_context}
+"""
+
+_CONTEXTUAL_INFORMATION_HEADER = "    CONTEXTUAL INFORMATION:\n"
+
+_SEQUENTIAL_TOOL_CALLS_RULE = (
+    "      * Can only call ONE tool at a time - plan for sequential calls if needed\n"
+)
+# Parallel tool calls mode - independent info requests can be batched into one tool_caller turn
+_PARALLEL_TOOL_CALLS_RULE = f"""      * Can call several INDEPENDENT info tools ({", ".join(PARALLEL_INFO_TOOL_NAMES)}) in ONE batch - plan for sequential calls for everything else
+"""
+
+# Fused mode - the planner also writes the tool call, so it gets the tool_caller's formatting rules
+_FUSED_TOOL_CALL_RULES = """    TOOL CALLS:
+    - When next_node is "tool_caller", ALSO fill "tool_call" with the tool name and ALL required arguments - it is executed directly
+    - Use ONLY the argument names listed for each tool in AVAILABLE TOOLS
+    - Use the same language as in the user's request
+    - Format dates in ISO 8601 format (YYYY-MM-DD)
+    - If user refers to themselves, use keyword MYSELF in user assignments
+    - Set show_to_user=False for background operations or intermediate steps
+    - Leave "tool_call" empty when next_node is "response_generator"
+    
+"""
+
+
+class PlannerPromptLayer:
+    """Precompiled planner prompt pieces and structured output runnable for one tool set and model
+
+    Building the tool catalog and the structured output runnable is the expensive part of a planner
+    iteration, so it is done once here and only the per-turn fields are filled in at call time.
+    """
+
+    def __init__(self, tools: list, model, fused: bool = False, parallel: bool = False):
+        self.fused = fused
+        self.tools_by_name = {tool.name: tool for tool in tools}
+        self.tool_call_repairer = get_tool_call_repairer(tools)
+        prompt_prefix = _PLANNER_PROMPT_PREFIX
+        if parallel:
+            prompt_prefix = prompt_prefix.replace(
+                _SEQUENTIAL_TOOL_CALLS_RULE, _PARALLEL_TOOL_CALLS_RULE
+            )
+
+        if fused:
+            # The fused planner writes tool calls itself, so it needs the argument schemas too
+            available_tools = [
+                {"name": tool.name, "description": tool.description, "args": tool.args}
+                for tool in tools
+            ]
+            prompt_prefix += _FUSED_TOOL_CALL_RULES
+            decision_schema = FusedPlannerDecision
+        else:
+            # Create available tools list - simplified to just names and descriptions
+            available_tools = [
+                {"name": tool.name, "description": tool.description} for tool in tools
+            ]
+            decision_schema = PlannerDecision
+
+        self.tools_section = f"""    AVAILABLE TOOLS:
+    {json.dumps(available_tools, indent=2)}
+    
+"""
+        # Everything before the per-call fields
+        self.prompt_prefix = prompt_prefix + self.tools_section
+        # Planner output is internal - keep its tokens out of the client's messages stream
+        self.structured_llm = model.with_structured_output(decision_schema).with_config(
+            tags=[TAG_NOSTREAM]
+        )
+
+        # Keep a reference so the model id used in the cache key is never reused
+        self.model = model
+
+    def build_system_message(
+        self,
+        ui_context: str,
+        current_plan: str,
+        prev_node_feedback: str,
+        iteration_count: int,
+        current_datetime: str = None,
+        conversation_summary: str = None,
+    ) -> SystemMessage:
+        contextual_information = f"""    - Current UI context: {ui_context}
     - Your current plan: {current_plan}
     - Previous node feedback: {prev_node_feedback}
     - Current iteration: {iteration_count + 1}/10 (will terminate at 10)
-    
-    AVAILABLE TOOLS:
-    {json.dumps(available_tools, indent=2)}
-    """
+"""
+        if self.fused:
+            contextual_information += f"    - Current date/time: {current_datetime}\n"
+        if conversation_summary:
+            contextual_information += f"    - Earlier conversation (summary): {conversation_summary}\n"
+        return SystemMessage(
+            content=self.prompt_prefix + _CONTEXTUAL_INFORMATION_HEADER + contextual_information
+        )
+
+    def build_tool_call_message(self, tool_call: Optional[FusedToolCall]) -> Optional[AIMessage]:
+        """Turn the fused decision's tool call into a tool call message, None if it isn't valid"""
+        if tool_call is None or tool_call.name not in self.tools_by_name:
+            return None
+
+        # Same local repair as the tool caller (enum values, unknown args) before giving up
+        args, _, error = self.tool_call_repairer.repair_args(tool_call.name, tool_call.args)
+        if error:
+            logger.debug("Fused planner tool call failed validation: %s", error)
+            return None
 
-    # Add system message
-    system_message = SystemMessage(content=system_content)
+        return AIMessage(
+            content="",
+            tool_calls=[
+                {
+                    "name": tool_call.name,
+                    "args": args,
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                }
+            ],
+        )
+
+
+_prompt_layers: dict[tuple, PlannerPromptLayer] = {}
+
+
+def get_planner_prompt_layer(
+    tools: list = None, model=None, fused: bool = False, parallel: bool = False
+) -> PlannerPromptLayer:
+    """Get the precompiled prompt layer, building it only when the tool set, model or mode changes"""
+    if tools is None:
+        tools, tool_set_key = get_default_tool_set()
+    else:
+        tool_set_key = get_tool_set_key(tools)
+    model = llm_config.get_llm() if model is None else model
+
+    key = (tool_set_key, id(model), fused, parallel)
+    prompt_layer = _prompt_layers.get(key)
+    if prompt_layer is None:
+        prompt_layer = PlannerPromptLayer(tools, model, fused, parallel)
+        _prompt_layers[key] = prompt_layer
+    return prompt_layer
+
+
+async def node_planner(state: AgentState, config):
+    """Create a plan before executing any tools"""
+    messages = state["messages"]
+    current_plan = state.get("plan", "")
+    prev_node_feedback = state.get("prev_node_feedback", "")
+    iteration_count = state.get("iteration_count", 0)
+
+    # Cap iterations to prevent infinite loops
+    if iteration_count > 10:
+        return {
+            "next_node": "response_generator",
+            "prev_node_feedback": "MAX ITERATIONS REACHED",
+        }
+
+    # Get context information
+    # timezone_offset_minutes = config["configurable"].get("timezone_offset_minutes", 0)
+    # tz = timezone(timedelta(minutes=timezone_offset_minutes))
+    # current_datetime = datetime.now(tz).strftime("%A, %d %B %Y %H:%M:%S")
+    ui_context = state.get("ui_context", "")
+
+    # Fused mode - one call returns both the plan update and the tool call
+    fused = (
+        config["configurable"].get("planner_mode", PlannerMode.TWO_HOP.value)
+        == PlannerMode.FUSED.value
+    )
+    current_datetime = None
+    if fused:
+        timezone_offset_minutes = config["configurable"].get("timezone_offset_minutes", 0)
+        tz = timezone(timedelta(minutes=timezone_offset_minutes))
+        current_datetime = datetime.now(tz).strftime("%A, %d %B %Y %H:%M:%S")
+
+    # Plan template cache - a repeated request replays the stored steps instead of planning again
+    plan_template = None
+    if config["configurable"].get("plan_template_cache", False):
+        plan_template = start_turn(state, config) if iteration_count == 0 else get_turn(state)
+        if plan_template is not None and "replay" in plan_template:
+            replayed_update = replay_step(state, config, plan_template, fused)
+            if replayed_update is not None:
+                return replayed_update
+            # Replay ended - the planner takes over for the rest of the turn
+            plan_template = None
+
+    # Get recent message context
+    context_messages = build_context(messages, "planner")
+
+    # Create planning system message - only the per-turn fields are filled in here
+    # The fused decision holds a single tool call, so batching only applies to the two hop path
+    parallel = config["configurable"].get("parallel_tool_calls", False) and not fused
+    prompt_layer = get_planner_prompt_layer(
+        model=llm_config.get_node_llm("planner", config), fused=fused, parallel=parallel
+    )
+    system_message = prompt_layer.build_system_message(
+        ui_context=ui_context,
+        current_plan=current_plan,
+        prev_node_feedback=prev_node_feedback,
+        iteration_count=iteration_count,
+        current_datetime=current_datetime,
+        conversation_summary=state.get("conversation_summary"),
+    )
     planning_messages = [system_message] + context_messages
+    log_prompt_tokens("planner", planning_messages)
+    record_prompt_prefix("planner", prompt_layer.prompt_prefix)
+
+    # Speculative mode - the predicted next node runs during the planner call
+    # The fused planner writes the tool call itself, so there's no tool_caller call to overlap
+    speculation = None
+    if config["configurable"].get("speculative_execution", False) and not fused:
+        speculation = start_speculation(state, config)
 
     # Use structured output to get planning decision
-    planner_llm = llm.with_structured_output(PlannerDecision)
-    decision = planner_llm.invoke(planning_messages)
-
-    print(f"DEBUG - LLM returned next_node: '{decision.next_node}'")
-    return {
-        "plan": decision.plan,
-        "next_node": decision.next_node,
-        "prev_node_feedback": decision.next_node_instructions,
-        "iteration_count": iteration_count + 1,
-    }
+    start_time = time.perf_counter()
+    try:
+        decision = await prompt_layer.structured_llm.ainvoke(planning_messages)
+    except BaseException:
+        if speculation is not None:
+            await speculation.cancel()
+        raise
+
+    planner_seconds = time.perf_counter() - start_time
+
+    logger.debug("LLM returned next_node: '%s'", decision.next_node)
+
+    speculative_update = (
+        await speculation.resolve(decision.next_node) if speculation is not None else None
+    )
+    if speculative_update is not None and decision.next_node == "tool_caller":
+        # Skip the tool_caller node - its tool call is already written
+        update = {
+            "messages": speculative_update["messages"],
+            "plan": decision.plan,
+            "next_node": "tools",
+            "prev_node_feedback": "",
+            # Planner and tool_caller iterations
+            "iteration_count": iteration_count + 2,
+        }
+    elif speculative_update is not None:
+        # Skip the response_generator node - the response is already written
+        update = {**speculative_update, "next_node": "response_generated"}
+    else:
+        update = None
+        if fused and decision.next_node == "tool_caller":
+            tool_call_message = prompt_layer.build_tool_call_message(decision.tool_call)
+            if tool_call_message is not None:
+                # Skip the tool_caller node and execute the tool call directly
+                update = {
+                    "messages": [tool_call_message],
+                    "plan": decision.plan,
+                    "next_node": "tools",
+                    "prev_node_feedback": "",
+                    "iteration_count": iteration_count + 1,
+                }
+            # Invalid tool call - fall back to the tool_caller node with the instructions
+
+        if update is None:
+            update = {
+                "plan": decision.plan,
+                "next_node": decision.next_node,
+                "prev_node_feedback": decision.next_node_instructions,
+                "iteration_count": iteration_count + 1,
+            }
+
+    if plan_template is not None:
+        # LLM calls a replay of this step skips - the planner's, and the tool caller's when it wrote the tool call
+        llm_calls = 1 + (
+            decision.next_node == "tool_caller"
+            and (update["next_node"] == "tool_caller" or speculative_update is not None)
+        )
+        plan_template = record_step(plan_template, decision, planner_seconds, llm_calls, prev_node_feedback)
+        if update["next_node"] in ("response_generator", "response_generated"):
+            store_turn(state, config, plan_template)
+        update["plan_template"] = plan_template
+
+    return update
@@ -1,42 +1,21 @@
-from src.llm_config import llm
-from langchain_core.messages import (
-    SystemMessage,
-    trim_messages,
-)
+import logging
+
+from src import llm_config
+from langchain_core.messages import SystemMessage, message_chunk_to_message
 from pydantic import BaseModel, Field
 from src.agent_state import AgentState
+from src.context_builder import build_context, log_prompt_tokens
+from src.instrumentation import record_prompt_prefix
 from langchain_core.runnables.config import RunnableConfig
 from datetime import datetime, timedelta, timezone
 
+logger = logging.getLogger(__name__)
 
-class FinalResponse(BaseModel):
-    """Final response to the user"""
-
-    response: str = Field(description="The response to provide to the user")
-
-
-def node_response_generator(state: AgentState, config: RunnableConfig):
-    """Generate a response based on the plan"""
-    messages = state["messages"]
-    plan = state.get("plan", "")
-    prev_node_feedback = state.get("prev_node_feedback", "")
-
-    # Get context information
-    timezone_offset_minutes = config["configurable"].get("timezone_offset_minutes", 0)
-    tz = timezone(timedelta(minutes=timezone_offset_minutes))
-    current_datetime = datetime.now(tz).strftime("%A, %d %B %Y %H:%M:%S")
-    ui_context = state.get("ui_context", "")
 
-    # Create system message for response generation
-    system_content = f"""
+# Static part of the response generator prompt - identical for every call
+_RESPONSE_GENERATOR_PROMPT_PREFIX = """
     YOUR ROLE: You are the final communication layer that synthesizes information and presents it to the user in a clear, natural way.
     
-    IMPORTANT CONTEXT:
-    - Plan summary: {plan}
-    - Previous node information: {prev_node_feedback}
-    - Current UI context: {ui_context}
-    - Current time: {current_datetime}
-    
     YOUR TASK:
     1. Analyze the conversation and all available information
     2. Extract the key results and actions that have been performed
@@ -58,25 +37,76 @@ def node_response_generator(state: AgentState, config: RunnableConfig):
     - DO keep responses concise yet complete
     
     If you find tool results in the message history, interpret and explain them in natural language.
+    
     """
 
-    # Get recent message context - include more context to ensure we have enough information
-    context_messages = trim_messages(
-        messages,
-        strategy="last",
-        token_counter=len,
-        max_tokens=12,  # Increased context window
-        start_on="human",
-        include_system=False,
+
+class FinalResponse(BaseModel):
+    """Final response to the user"""
+
+    response: str = Field(description="The response to provide to the user")
+
+
+async def node_response_generator(state: AgentState, config: RunnableConfig):
+    """Generate a response based on the plan"""
+    messages = state["messages"]
+    plan = state.get("plan", "")
+    prev_node_feedback = state.get("prev_node_feedback", "")
+
+    # Get context information
+    timezone_offset_minutes = config["configurable"].get("timezone_offset_minutes", 0)
+    tz = timezone(timedelta(minutes=timezone_offset_minutes))
+    current_datetime = datetime.now(tz).strftime("%A, %d %B %Y %H:%M:%S")
+    ui_context = state.get("ui_context", "")
+
+    # Create system message for response generation
+    # Static prefix first so it is byte identical across calls, the per-turn context last
+    system_content = (
+        _RESPONSE_GENERATOR_PROMPT_PREFIX
+        + f"""IMPORTANT CONTEXT:
+    - Plan summary: {plan}
+    - Previous node information: {prev_node_feedback}
+    - Current UI context: {ui_context}
+    - Current time: {current_datetime}
+    """
     )
+    if state.get("conversation_summary"):
+        system_content += f"- Earlier conversation (summary): {state['conversation_summary']}\n    "
+
+    # Get recent message context - include more context to ensure we have enough information
+    context_messages = build_context(messages, "response_generator")
 
     # Add the system message
     system_message = SystemMessage(content=system_content)
     response_messages = [system_message] + context_messages
+    log_prompt_tokens("response_generator", response_messages)
+    record_prompt_prefix("response_generator", _RESPONSE_GENERATOR_PROMPT_PREFIX)
 
     try:
         # Generate response directly as an AIMessage without structured output
-        response = llm.invoke(response_messages)
+        # Passing the node config lets LangGraph's "messages" stream mode stream the tokens to the client
+        tier = llm_config.get_node_tier("response_generator", config)
+        response = None
+        try:
+            async for chunk in llm_config.get_node_llm(
+                "response_generator", config, tier=tier
+            ).astream(response_messages, config):
+                response = chunk if response is None else response + chunk
+            if response is None:
+                raise ValueError("Empty response")
+            response = message_chunk_to_message(response)
+        except Exception as e:
+            # Retry once on the large model if the small one failed before its first token - after
+            # that the client is already showing part of the failed response
+            escalation_tier = llm_config.get_escalation_tier("response_generator", tier, config)
+            if response is not None or not escalation_tier:
+                raise
+            logger.warning("Response generation failed on the %s model, escalating: %s", tier, e)
+            llm_config.tier_stats.record_escalation("response_generator")
+            llm_config.tier_stats.record_retry("response_generator")
+            response = await llm_config.get_node_llm(
+                "response_generator", config, tier=escalation_tier
+            ).ainvoke(response_messages, config)
 
         # Return response message
         return {
@@ -0,0 +1,111 @@
+import logging
+
+from src import llm_config
+
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    RemoveMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.runnables.config import RunnableConfig
+from langgraph.constants import TAG_NOSTREAM
+
+from src.agent_state import AgentState
+from src.context_builder import log_prompt_tokens
+
+logger = logging.getLogger(__name__)
+
+# Rolling summarization at the end of each turn - messages older than the horizon are folded into
+# conversation_summary and removed from state, so a long-lived thread's checkpoint, serialization
+# time and memory stay bounded. The nodes only look at the last 5-12 messages, the planner and
+# response generator also get the summary.
+# Messages are folded in batches (once there are SUMMARY_BATCH_MESSAGES over the horizon), so the
+# summary LLM call runs every few turns rather than every turn.
+
+DEFAULT_SUMMARY_HORIZON_MESSAGES = 40
+SUMMARY_BATCH_MESSAGES = 20
+# Characters of a single message that go into the summary prompt - large tool results are cut
+MAX_SUMMARY_MESSAGE_CHARS = 1500
+MAX_SUMMARY_CHARS = 4000
+
+_SUMMARY_PROMPT = """
+    YOUR ROLE: You maintain a running summary of a conversation between a user and a task, note and shift management assistant.
+
+    YOUR TASK:
+    Update the existing summary with the new messages. Keep:
+    - What the user asked for and what was done (tasks, notes, shifts created or changed, with their names and dates)
+    - Facts the user stated about themselves, their projects or their preferences
+    - Anything still open or promised
+    Drop greetings, raw tool output and ids. Write plain, dense sentences - at most 200 words.
+    """
+
+
+def get_summary_horizon(config: RunnableConfig) -> int:
+    """Messages kept verbatim - summary_horizon_messages in the config, 0 disables summarization"""
+    return config["configurable"].get("summary_horizon_messages", DEFAULT_SUMMARY_HORIZON_MESSAGES)
+
+
+def find_fold_index(messages: list[BaseMessage], horizon: int) -> int:
+    """Number of leading messages to fold - the kept messages start on a user message so tool
+    results stay with their tool calls, 0 when there's nothing to fold"""
+    if horizon <= 0 or len(messages) <= horizon + SUMMARY_BATCH_MESSAGES:
+        return 0
+    for index in range(len(messages) - horizon, len(messages)):
+        if isinstance(messages[index], HumanMessage):
+            return index
+    return 0
+
+
+def _format_message(message: BaseMessage) -> str:
+    if isinstance(message, HumanMessage):
+        role = "User"
+    elif isinstance(message, ToolMessage):
+        role = f"Result of {message.name or 'tool'}"
+    else:
+        role = "Assistant"
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    if isinstance(message, AIMessage) and message.tool_calls:
+        content += " " + "; ".join(
+            f"called {tool_call['name']}({tool_call['args']})" for tool_call in message.tool_calls
+        )
+    if len(content) > MAX_SUMMARY_MESSAGE_CHARS:
+        content = content[:MAX_SUMMARY_MESSAGE_CHARS] + " ..."
+    return f"{role}: {content.strip()}"
+
+
+async def node_summarize_history(state: AgentState, config: RunnableConfig):
+    """Fold messages older than the horizon into the conversation summary"""
+    messages = state["messages"]
+    fold_index = find_fold_index(messages, get_summary_horizon(config))
+    if fold_index == 0:
+        return {}
+
+    folded_messages = messages[:fold_index]
+    transcript = "\n".join(_format_message(message) for message in folded_messages)
+    summary_messages = [
+        SystemMessage(content=_SUMMARY_PROMPT),
+        HumanMessage(
+            content=f"EXISTING SUMMARY:\n{state.get('conversation_summary') or '(none)'}\n\nNEW MESSAGES:\n{transcript}"
+        ),
+    ]
+    log_prompt_tokens("summarizer", summary_messages)
+
+    try:
+        # Internal - keep the summary out of the client's messages stream
+        response = await llm_config.get_node_llm("summarizer", config).ainvoke(
+            summary_messages, config={"tags": [TAG_NOSTREAM]}
+        )
+    except Exception as e:
+        # Keep the messages - the next turn tries again
+        logger.warning("Summarization failed, keeping %d messages: %s", fold_index, e)
+        return {}
+
+    summary = response.content if isinstance(response.content, str) else str(response.content)
+    logger.debug("Folded %d messages into the conversation summary", fold_index)
+    return {
+        "messages": [RemoveMessage(id=message.id) for message in folded_messages],
+        "conversation_summary": summary.strip()[:MAX_SUMMARY_CHARS],
+    }
@@ -1,20 +1,74 @@
-from src.llm_config import llm, llm_with_tools
+import logging
+
+from src import llm_config
 
 from langchain_core.messages import (
     AIMessage,
+    HumanMessage,
     SystemMessage,
-    trim_messages,
 )
 
 from src.agent_state import AgentState
+from src.context_builder import build_context, log_prompt_tokens
+from src.instrumentation import record_prompt_prefix
+from src.tools.tool_call_repair import repair_tool_call_message
+from src.tools.tools import PARALLEL_INFO_TOOL_NAMES
 
 from datetime import datetime, timedelta, timezone
 
 from langchain_core.runnables.config import RunnableConfig
 from langgraph.types import Command
+from langgraph.constants import TAG_NOSTREAM
+
+logger = logging.getLogger(__name__)
 
 
-def node_tool_caller(state: AgentState, config: RunnableConfig):
+# Static part of the tool caller prompt - identical for every call with the same parallel mode
+_TOOL_CALLER_PROMPT_PREFIX = """
+        YOUR PURPOSE:
+        You are a tool executor that translates instructions into precise tool calls. 
+
+        REQUIREMENTS:
+        - SELECT the appropriate tool for the task
+        - PROVIDE all required parameters for the selected tool
+        - DO NOT return an empty response
+        {parallel_guidance}
+        FORMATTING GUIDELINES:
+        - Use the same language as in the user's request
+        - Format dates in ISO 8601 format (YYYY-MM-DD)
+        - If user refers to themselves, use keyword MYSELF in user assignments
+        - Set show_to_user=False for background operations or intermediate steps
+        
+        """
+# Parallel mode - independent info requests can be batched into one turn
+_PARALLEL_TOOL_CALLER_PROMPT_PREFIX = _TOOL_CALLER_PROMPT_PREFIX.format(
+    parallel_guidance=f"""
+        - You MAY call several of {", ".join(PARALLEL_INFO_TOOL_NAMES)} together when the task needs independent information - call every other tool ONE at a time
+        """
+)
+_TOOL_CALLER_PROMPT_PREFIX = _TOOL_CALLER_PROMPT_PREFIX.format(parallel_guidance="")
+
+
+def limit_tool_call_batch(response: AIMessage) -> AIMessage:
+    """Only independent info requests can be batched - anything else is cut back to the first tool call"""
+    tool_calls = response.tool_calls
+    if len(tool_calls) <= 1 or all(
+        tool_call["name"] in PARALLEL_INFO_TOOL_NAMES for tool_call in tool_calls
+    ):
+        return response
+
+    logger.debug("Batch of %d tool calls is not parallelizable, keeping the first", len(tool_calls))
+    additional_kwargs = {
+        key: value
+        for key, value in response.additional_kwargs.items()
+        if key != "tool_calls"
+    }
+    return response.model_copy(
+        update={"tool_calls": tool_calls[:1], "additional_kwargs": additional_kwargs}
+    )
+
+
+async def node_tool_caller(state: AgentState, config: RunnableConfig):
     """Call a tool call based on the plan"""
     messages = state["messages"]
     plan = state.get("plan", "")
@@ -26,7 +80,34 @@ def node_tool_caller(state: AgentState, config: RunnableConfig):
     current_datetime = datetime.now(tz).strftime("%A, %d %B %Y %H:%M:%S")
     ui_context = state.get("ui_context", "")
 
+    # Parallel mode - independent info requests can be batched into one turn
+    parallel_tool_calls = config["configurable"].get("parallel_tool_calls", False)
+    # Start on the node's tier (small by default) and escalate when an attempt fails validation
+    tier = llm_config.get_node_tier("tool_caller", config)
+
+    # Get minimal context (just the last few messages) - same for every attempt
+    recent_messages = build_context(messages, "tool_caller")
+
+    # Create system message for tool execution - built once, retries only append the error
+    # Static prefix first so it is byte identical across calls, the task and context last
+    prompt_prefix = (
+        _PARALLEL_TOOL_CALLER_PROMPT_PREFIX if parallel_tool_calls else _TOOL_CALLER_PROMPT_PREFIX
+    )
+    system_content = (
+        prompt_prefix
+        + f"""CURRENT TASK:
+        {prev_node_feedback}
+
+        CONTEXTUAL INFORMATION:
+        - Current date/time: {current_datetime}
+        - UI Context: {ui_context}
+        """
+    )
+    context_messages = [SystemMessage(content=system_content)] + recent_messages
+
     # Set maximum retry attempts
+    # Responses are repaired locally first (text tool calls, enum values, unknown args), so another
+    # LLM call is only made when the response can't be repaired
     max_retries = 3
     current_attempt = 0
     last_error = ""
@@ -34,106 +115,64 @@ def node_tool_caller(state: AgentState, config: RunnableConfig):
     # Local retry loop
     while current_attempt < max_retries:
         current_attempt += 1
-
-        # Add retry guidance if this isn't the first attempt
-        retry_guidance = ""
         if current_attempt > 1:
-            retry_guidance = f"""
-            RETRY ATTEMPT {current_attempt}/{max_retries}
-            
-            Previous attempt failed: {last_error}
-            
-            CRITICAL REQUIREMENTS:            
-            - You MUST use a tool call format (not plain text)
-            - Your response MUST include a properly formatted tool call
-            - DO NOT return an empty response or empty tool call            
-            """
-
-        # Create system message for tool execution
-        system_content = f"""
-        YOUR PURPOSE:
-        You are a tool executor that translates instructions into precise tool calls. 
-
-        CURRENT TASK:
-        {prev_node_feedback}
-
-        REQUIREMENTS:
-        - SELECT the appropriate tool for the task
-        - PROVIDE all required parameters for the selected tool
-        - DO NOT return an empty response
-
-        {retry_guidance}
-
-        FORMATTING GUIDELINES:
-        - Use the same language as in the user's request
-        - Format dates in ISO 8601 format (YYYY-MM-DD)
-        - If user refers to themselves, use keyword MYSELF in user assignments
-        - Set show_to_user=False for background operations or intermediate steps
-        
-        CONTEXTUAL INFORMATION:
-        - Current date/time: {current_datetime}
-        - UI Context: {ui_context}
-        """
-
-        # Get minimal context (just the last few messages)
-        context_messages = trim_messages(
-            messages,
-            strategy="last",
-            token_counter=len,
-            max_tokens=5,
-            start_on="human",
-            # This appears to be causing important last message to be lost (like tool execution results from a multi step ai request)
-            # end_on=("human", "ai"),
-            include_system=False,
+            llm_config.tier_stats.record_retry("tool_caller")
+        llm_with_tools = llm_config.get_node_llm(
+            "tool_caller",
+            config,
+            with_tools=True,
+            parallel_tool_calls=parallel_tool_calls,
+            tier=tier,
         )
 
-        # Add the system message
-        system_message = SystemMessage(content=system_content)
-        context_messages = [system_message] + context_messages
+        # Add retry guidance if this isn't the first attempt
+        attempt_messages = context_messages
+        if current_attempt > 1:
+            attempt_messages = context_messages + [
+                HumanMessage(
+                    content=f"""RETRY ATTEMPT {current_attempt}/{max_retries}
+Previous attempt failed: {last_error}
+You MUST respond with a properly formatted tool call (not plain text) with valid arguments."""
+                )
+            ]
+        log_prompt_tokens("tool_caller", attempt_messages)
+        record_prompt_prefix("tool_caller", prompt_prefix)
 
         try:
             # Generate tool call
-            response = llm_with_tools.invoke(context_messages)
-
-            # Check if tool call was actually made and is not empty
-            if (
-                isinstance(response, AIMessage)
-                and response.tool_calls
-                and len(response.tool_calls) > 0
-                and response.tool_calls[0].get("name")
-            ):
-
+            # Tool call tokens are internal - keep them out of the client's messages stream
+            response = await llm_with_tools.ainvoke(
+                attempt_messages, config={"tags": [TAG_NOSTREAM]}
+            )
+
+            # Validate the tool call, repairing it locally where possible
+            tool_call_message, last_error = repair_tool_call_message(response)
+            if tool_call_message is not None:
                 # Success - return the message
-                print(f"Tool call successful on attempt {current_attempt}")
+                logger.debug("Tool call successful on attempt %d", current_attempt)
                 return {
-                    "messages": [response],
+                    "messages": [limit_tool_call_batch(tool_call_message)],
                     "prev_node_feedback": "",
                     "iteration_count": state.get("iteration_count", 0) + 1,
                     "next_node": "tools",
                 }
-            else:
-                # Tool call was not made or is invalid
-                if isinstance(response, AIMessage):
-                    if not response.tool_calls:
-                        last_error = "No tool call was made"
-                    elif len(response.tool_calls) == 0:
-                        last_error = "Empty tool calls array"
-                    else:
-                        last_error = "Tool call missing required information"
-                else:
-                    last_error = "Unexpected response format"
-
-                print(f"Attempt {current_attempt} failed: {last_error}")
-                continue  # Try again
+
+            logger.warning("Tool call attempt %d failed: %s", current_attempt, last_error)
 
         except Exception as e:
-            # Exception during tool call
+            # Exception during tool call (ie. the provider rejected a malformed tool call)
             last_error = f"Exception occurred: {str(e)}"
-            print(f"Attempt {current_attempt} failed with exception: {str(e)}")
-            continue  # Try again
+            logger.warning("Tool call attempt %d failed with exception: %s", current_attempt, e)
+
+        # Try again, on the large model if this attempt used the small one
+        escalation_tier = llm_config.get_escalation_tier("tool_caller", tier, config)
+        if escalation_tier and current_attempt < max_retries:
+            logger.debug("Escalating tool_caller from the %s to the %s model", tier, escalation_tier)
+            llm_config.tier_stats.record_escalation("tool_caller")
+            tier = escalation_tier
 
     # If we've reached here, all retry attempts failed
-    print(f"All {max_retries} retry attempts failed, returning to planner")
+    logger.warning("All %d tool call attempts failed, returning to planner", max_retries)
     return {
         "prev_node_feedback": f"ERROR: After {max_retries} attempts, the system failed to generate a valid tool call. Last error: {last_error}. Please try a different approach.",
         "iteration_count": state.get("iteration_count", 0) + 1,
@@ -0,0 +1,414 @@
+import hashlib
+import json
+import logging
+import re
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.runnables.config import RunnableConfig
+
+from src.agent_state import AgentState
+from src.auth import get_verified_user_id
+from src.nodes.node_fast_path_router import normalize_request
+from src.tools.tools import get_tool_set_key
+
+logger = logging.getLogger(__name__)
+
+# Opt-in plan template cache in front of the planner (plan_template_cache in the config). The
+# planner's decisions and the tool calls of a turn that ends in a response are stored, keyed on the
+# normalized user request and ui_context. The next time the same request comes in, the stored steps
+# are replayed instead of calling the planner (and the tool caller) again.
+# - Absolute dates in the request, plans and tool args are stored relative to the user's today
+#   (timezone_offset_minutes), so "due 2025-03-15" asked on the 14th and "due 2025-04-02" asked on
+#   the 1st share a template, and a replayed tool call gets dates relative to the day it runs
+# - Templates are only replayed for the user that recorded them, identified by the user id the
+#   server verified (src/auth.py) - the client's user_id isn't trusted, so without a verified
+#   identity the cache is off
+# - A step that quotes a tool result (ie. a task id found by find_tasks) or a name from the
+#   conversation summary is not stored - replay ends there and the planner takes over for the rest
+#   of the turn
+# - Requests that refer back to the conversation (ie. "mark it as done") are never cached
+# - Entries are dropped when the tool set changes
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+
+# yyyy-mm-dd or yyyy/mm/dd
+_DATE_PATTERN = re.compile(r"\b(\d{4})([-/])(\d{1,2})\2(\d{1,2})\b")
+# Stored form of a date - days from today and the separator
+_DATE_PLACEHOLDER_PATTERN = re.compile(r"<day([+-]\d+)([-/])>")
+# List numbering in plans ("1. ", "2) ")
+_ENUMERATION_PATTERN = re.compile(r"\b\d+[.)](?=\s|$)")
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+# Words that point back to earlier messages - the plan depends on more than the request
+_REFERENCE_WORDS = frozenset(
+    ["it", "its", "that", "them", "they", "those", "these", "again", "same", "above", "previous"]
+)
+
+
+def get_user_today(config: RunnableConfig) -> date:
+    timezone_offset_minutes = config["configurable"].get("timezone_offset_minutes", 0)
+    return datetime.now(timezone(timedelta(minutes=timezone_offset_minutes or 0))).date()
+
+
+def canonicalize_dates(text: str, today: date) -> str:
+    """Replace absolute dates with their offset from today"""
+
+    def replace(match: re.Match) -> str:
+        try:
+            day = date(int(match.group(1)), int(match.group(3)), int(match.group(4)))
+        except ValueError:
+            return match.group(0)
+        return f"<day{(day - today).days:+d}{match.group(2)}>"
+
+    return _DATE_PATTERN.sub(replace, text)
+
+
+def resolve_dates(text: str, today: date) -> str:
+    """Turn stored date offsets back into dates relative to today"""
+
+    def replace(match: re.Match) -> str:
+        separator = match.group(2)
+        return (today + timedelta(days=int(match.group(1)))).strftime(f"%Y{separator}%m{separator}%d")
+
+    return _DATE_PLACEHOLDER_PATTERN.sub(replace, text)
+
+
+def _map_strings(value, fn):
+    if isinstance(value, str):
+        return fn(value)
+    if isinstance(value, list):
+        return [_map_strings(item, fn) for item in value]
+    if isinstance(value, dict):
+        return {key: _map_strings(item, fn) for key, item in value.items()}
+    return value
+
+
+def get_intent(request: str, today: date) -> Optional[str]:
+    """Normalized request with canonical dates, None if the request can't be cached"""
+    # Offsets as words - normalizing drops the sign
+    intent = normalize_request(
+        _DATE_PLACEHOLDER_PATTERN.sub(
+            lambda match: f" day_{'minus' if match.group(1).startswith('-') else 'plus'}_{match.group(1)[1:]} ",
+            canonicalize_dates(request, today),
+        )
+    )
+    if not intent or _REFERENCE_WORDS.intersection(intent.split()):
+        return None
+    return intent
+
+
+def get_cache_scope(config: RunnableConfig) -> Optional[str]:
+    """Who a template can be replayed for - the verified user, None when nothing verified the caller"""
+    user_id = get_verified_user_id(config)
+    return f"user:{user_id}" if user_id else None
+
+
+def make_plan_cache_key(intent: str, ui_context: Optional[str], scope: str) -> str:
+    payload = json.dumps([scope, intent, re.sub(r"\s+", " ", ui_context or "").strip()])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+_tool_set_versions: dict[tuple, str] = {}
+
+
+def get_tool_set_version(tools: list = None) -> str:
+    tool_set_key = get_tool_set_key(tools)
+    version = _tool_set_versions.get(tool_set_key)
+    if version is None:
+        version = hashlib.sha256(json.dumps(tool_set_key).encode()).hexdigest()[:16]
+        _tool_set_versions[tool_set_key] = version
+    return version
+
+
+class PlanCacheStats:
+    """Hit rate and planner calls skipped per cached intent"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.lookups = 0
+        self.hits = 0
+        self.stores = 0
+        self.invalidations = 0
+        # Stats of the most recently seen intents, as many as the cache holds
+        self.intents: OrderedDict[str, dict] = OrderedDict()
+
+    def _intent(self, intent: str) -> dict:
+        if intent not in self.intents:
+            self.intents[intent] = {
+                "hits": 0,
+                "misses": 0,
+                "steps_replayed": 0,
+                "llm_calls_skipped": 0,
+                "planner_seconds_saved": 0.0,
+            }
+            while len(self.intents) > DEFAULT_MAX_ENTRIES:
+                self.intents.popitem(last=False)
+        self.intents.move_to_end(intent)
+        return self.intents[intent]
+
+    def record_lookup(self, intent: str, hit: bool):
+        self.lookups += 1
+        self.hits += hit
+        self._intent(intent)["hits" if hit else "misses"] += 1
+
+    def record_replayed_step(self, intent: str, step: dict):
+        stats = self._intent(intent)
+        stats["steps_replayed"] += 1
+        stats["llm_calls_skipped"] += step["llm_calls"]
+        stats["planner_seconds_saved"] += step["seconds"]
+
+    def summary(self) -> dict:
+        return {
+            "lookups": self.lookups,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            "stores": self.stores,
+            "invalidations": self.invalidations,
+            "intents": {
+                intent: {**stats, "planner_seconds_saved": round(stats["planner_seconds_saved"], 3)}
+                for intent, stats in self.intents.items()
+            },
+        }
+
+
+plan_cache_stats = PlanCacheStats()
+
+
+class PlanTemplateCache:
+    """LRU cache of plan templates with a TTL, local to this process, emptied when the tool set changes"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.tool_set_version = None
+        # key -> (expires_at, template)
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    def _check_tool_set(self, tool_set_version: str):
+        if tool_set_version != self.tool_set_version:
+            if self._entries:
+                plan_cache_stats.invalidations += 1
+            self._entries.clear()
+            self.tool_set_version = tool_set_version
+
+    def get(self, key: str, tool_set_version: str) -> Optional[dict]:
+        self._check_tool_set(tool_set_version)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.time():
+            if entry is not None:
+                del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: str, template: dict, tool_set_version: str):
+        self._check_tool_set(tool_set_version)
+        self._entries[key] = (time.time() + self.ttl_seconds, template)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+plan_template_cache = PlanTemplateCache()
+
+
+# --- Turn state
+# state["plan_template"] follows the planner through a turn: the steps recorded so far, or the
+# template being replayed and the next step to replay
+
+
+def _find_turn_request(messages: list) -> Optional[HumanMessage]:
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            return message
+    return None
+
+
+def _turn_messages(messages: list, request: HumanMessage) -> list:
+    for index in range(len(messages) - 1, -1, -1):
+        if messages[index] is request:
+            return messages[index + 1 :]
+    return []
+
+
+def start_turn(state: AgentState, config: RunnableConfig) -> Optional[dict]:
+    """Turn state for the planner's first call of a turn - the template to replay on a hit,
+    otherwise an empty recording. None when the request can't be cached"""
+    request = state["messages"][-1] if state["messages"] else None
+    if not isinstance(request, HumanMessage) or not isinstance(request.content, str):
+        return None
+    scope = get_cache_scope(config)
+    if scope is None:
+        return None
+    intent = get_intent(request.content, get_user_today(config))
+    if intent is None:
+        return None
+
+    key = make_plan_cache_key(intent, state.get("ui_context"), scope)
+    template = plan_template_cache.get(key, get_tool_set_version())
+    plan_cache_stats.record_lookup(intent, template is not None)
+    turn = {"request_id": request.id, "key": key, "intent": intent, "step": 0}
+    if template is not None:
+        return {**turn, "replay": template["steps"]}
+    return {**turn, "steps": []}
+
+
+def get_turn(state: AgentState) -> Optional[dict]:
+    """The current turn's plan_template state, None if it belongs to an earlier turn"""
+    turn = state.get("plan_template")
+    request = _find_turn_request(state["messages"])
+    if turn is None or request is None or turn["request_id"] != request.id:
+        return None
+    return turn
+
+
+def replay_step(state: AgentState, config: RunnableConfig, turn: dict, fused: bool) -> Optional[dict]:
+    """Planner update for the next stored step, None when replay has ended"""
+    steps = turn["replay"]
+    if turn["step"] >= len(steps):
+        return None
+    # The previous replayed tool calls must have succeeded
+    request = _find_turn_request(state["messages"])
+    for message in _turn_messages(state["messages"], request):
+        if isinstance(message, ToolMessage) and message.status == "error":
+            return None
+
+    step = steps[turn["step"]]
+    today = get_user_today(config)
+    plan_cache_stats.record_replayed_step(turn["intent"], step)
+    logger.debug("Replaying cached plan step %d/%d: '%s'", turn["step"] + 1, len(steps), step["next_node"])
+    iteration_count = state.get("iteration_count", 0)
+    update = {
+        "plan": resolve_dates(step["plan"], today),
+        "plan_template": {**turn, "step": turn["step"] + 1},
+    }
+    if step["tool_calls"]:
+        tool_call_message = AIMessage(
+            content="",
+            tool_calls=[
+                {
+                    "name": tool_call["name"],
+                    "args": _map_strings(tool_call["args"], lambda value: resolve_dates(value, today)),
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                }
+                for tool_call in step["tool_calls"]
+            ],
+        )
+        # Skip the tool_caller node - the tool call is already written
+        return {
+            **update,
+            "messages": [tool_call_message],
+            "next_node": "tools",
+            "prev_node_feedback": "",
+            # Planner and tool_caller iterations
+            "iteration_count": iteration_count + (1 if fused else 2),
+        }
+    return {
+        **update,
+        "next_node": step["next_node"],
+        "prev_node_feedback": resolve_dates(step["instructions"], today),
+        "iteration_count": iteration_count + 1,
+    }
+
+
+def record_step(turn: dict, decision, seconds: float, llm_calls: int, prev_node_feedback: str) -> dict:
+    """Turn state with the planner's decision added"""
+    # A failed tool call or an iteration limit - the turn isn't a template for the next one
+    failed = turn.get("failed") or (prev_node_feedback or "").startswith(("ERROR", "MAX ITERATIONS"))
+    step = {
+        "plan": decision.plan,
+        "next_node": decision.next_node,
+        "instructions": decision.next_node_instructions,
+        "seconds": seconds,
+        "llm_calls": llm_calls,
+    }
+    return {**turn, "steps": turn["steps"] + [step], "step": turn["step"] + 1, "failed": failed}
+
+
+def _summary_data_tokens(summary: str) -> set[str]:
+    """Names and numbers in the conversation summary - capitalized words that don't start a sentence"""
+    tokens = set()
+    for match in _TOKEN_PATTERN.finditer(summary):
+        token = match.group()
+        preceding = summary[: match.start()].rstrip()
+        sentence_start = not preceding or preceding[-1] in ".!?:\n"
+        if (token[0].isupper() and not sentence_start) or any(char.isdigit() for char in token):
+            tokens.add(token.lower())
+    return tokens
+
+
+def _data_tokens(messages: list, summary: Optional[str], request: str, ui_context: Optional[str]) -> set[str]:
+    """Names, ids and numbers in the thread's tool results and summary that aren't in the request"""
+    tokens = _summary_data_tokens(summary or "")
+    for message in messages:
+        if isinstance(message, ToolMessage):
+            content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+            tokens.update(
+                token.lower()
+                for token in _TOKEN_PATTERN.findall(content)
+                if token[0].isupper() or any(char.isdigit() for char in token)
+            )
+    return tokens - set(_TOKEN_PATTERN.findall(f"{request} {ui_context or ''}".lower()))
+
+
+def _quotes_data(text: str, data_tokens: set[str], request_tokens: set[str]) -> bool:
+    tokens = set(_TOKEN_PATTERN.findall(_ENUMERATION_PATTERN.sub(" ", text).lower())) - request_tokens
+    return bool(tokens & data_tokens) or any(any(char.isdigit() for char in token) for token in tokens)
+
+
+def store_turn(state: AgentState, config: RunnableConfig, turn: dict):
+    """Store the recorded turn as a template, up to the first step that quotes a tool result or the summary"""
+    request = _find_turn_request(state["messages"])
+    if turn.get("failed") or request is None:
+        return
+    turn_messages = _turn_messages(state["messages"], request)
+    if any(isinstance(message, ToolMessage) and message.status == "error" for message in turn_messages):
+        return
+
+    # The tool calls made for each tool_caller decision, in order
+    tool_call_messages = [
+        message for message in turn_messages if isinstance(message, AIMessage) and message.tool_calls
+    ]
+    tool_steps = [step for step in turn["steps"] if step["next_node"] == "tool_caller"]
+    if len(tool_call_messages) != len(tool_steps):
+        return
+    tool_calls_by_step = iter(tool_call_messages)
+
+    today = get_user_today(config)
+    data_tokens = _data_tokens(
+        state["messages"], state.get("conversation_summary"), request.content, state.get("ui_context")
+    )
+    request_tokens = set(_TOKEN_PATTERN.findall(f"{request.content} {state.get('ui_context') or ''}".lower()))
+    steps = []
+    for step in turn["steps"]:
+        tool_calls = []
+        if step["next_node"] == "tool_caller":
+            tool_calls = [
+                {"name": tool_call["name"], "args": tool_call["args"]}
+                for tool_call in next(tool_calls_by_step).tool_calls
+            ]
+        stored_step = _map_strings(
+            {**step, "tool_calls": tool_calls}, lambda value: canonicalize_dates(value, today)
+        )
+        text = "\n".join(
+            [stored_step["plan"], stored_step["instructions"]]
+            + [json.dumps(tool_call["args"]) for tool_call in stored_step["tool_calls"]]
+        )
+        if _quotes_data(_DATE_PLACEHOLDER_PATTERN.sub(" ", text), data_tokens, request_tokens):
+            break
+        steps.append(stored_step)
+
+    if steps:
+        plan_template_cache.set(turn["key"], {"intent": turn["intent"], "steps": steps}, get_tool_set_version())
+        plan_cache_stats.stores += 1
+        logger.debug("Cached %d/%d plan steps for '%s'", len(steps), len(turn["steps"]), turn["intent"])
@@ -0,0 +1,242 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    message_to_dict,
+    messages_from_dict,
+)
+
+# Opt-in response cache for single_call mode, which the client uses for repetitive one shot
+# prompts. Responses are keyed on a normalized hash of the messages and the model name, so a
+# repeated request is answered from the cache instead of a Groq round-trip.
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+# Persistent cache files live in DATA_DIR (the project root by default), not the working directory
+DATA_DIR = os.environ.get("DATA_DIR", os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_SQLITE_PATH = os.environ.get(
+    "SINGLE_CALL_CACHE_PATH", os.path.join(DATA_DIR, "single_call_cache.sqlite")
+)
+
+
+def _normalize_content(content) -> str:
+    if not isinstance(content, str):
+        content = json.dumps(content, sort_keys=True)
+    return re.sub(r"\s+", " ", content).strip()
+
+
+def make_cache_key(messages: list[BaseMessage], model_name: str) -> str:
+    """Hash of the model name and the messages, ignoring ids and whitespace differences"""
+    normalized = [
+        [
+            message.type,
+            _normalize_content(message.content),
+            [
+                [tool_call["name"], tool_call["args"]]
+                for tool_call in getattr(message, "tool_calls", None) or []
+            ],
+        ]
+        for message in messages
+    ]
+    payload = json.dumps([model_name, normalized], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _serialize(message: AIMessage) -> str:
+    return json.dumps(message_to_dict(message))
+
+
+def _deserialize(value: str) -> AIMessage:
+    message = messages_from_dict([json.loads(value)])[0]
+    # New id so add_messages appends the cached response instead of replacing an earlier one
+    message.id = None
+    return message
+
+
+class ResponseCacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def summary(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class InMemoryResponseCache:
+    """LRU cache with a TTL, local to this process"""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = ResponseCacheStats()
+        # key -> (expires_at, serialized message)
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[AIMessage]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.time():
+            if entry is not None:
+                del self._entries[key]
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return _deserialize(entry[1])
+
+    def set(self, key: str, message: AIMessage):
+        self._entries[key] = (time.time() + self.ttl_seconds, _serialize(message))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    async def aget(self, key: str) -> Optional[AIMessage]:
+        return self.get(key)
+
+    async def aset(self, key: str, message: AIMessage):
+        self.set(key, message)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class SqliteResponseCache:
+    """LRU cache with a TTL persisted to SQLite, shared by every worker on the machine"""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_SQLITE_PATH,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = ResponseCacheStats()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        # Cache entries can be lost on power failure - no need to fsync every commit
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            )
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_used_at ON responses (last_used_at)"
+        )
+        self._connection.commit()
+
+    def get(self, key: str) -> Optional[AIMessage]:
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._connection.commit()
+                self.stats.misses += 1
+                return None
+            self._connection.execute(
+                "UPDATE responses SET last_used_at = ? WHERE key = ?", (now, key)
+            )
+            self._connection.commit()
+        self.stats.hits += 1
+        return _deserialize(row[0])
+
+    def set(self, key: str, message: AIMessage):
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at, last_used_at) VALUES (?, ?, ?, ?)",
+                (key, _serialize(message), now + self.ttl_seconds, now),
+            )
+            # Evict least recently used entries over the limit
+            evicted = self._connection.execute(
+                """
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            ).rowcount
+            self._connection.commit()
+        self.stats.evictions += max(evicted, 0)
+
+    # SQLite calls block - run them off the event loop
+    async def aget(self, key: str) -> Optional[AIMessage]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, message: AIMessage):
+        await asyncio.to_thread(self.set, key, message)
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+            self._connection.commit()
+
+
+# One cache per backend, created on first use
+_response_caches: dict = {}
+
+
+def get_response_cache(backend: Optional[str]):
+    """Response cache for a backend name ("memory" or "sqlite"), None if caching is disabled"""
+    if not backend:
+        return None
+    if backend not in _response_caches:
+        if backend == "memory":
+            _response_caches[backend] = InMemoryResponseCache()
+        elif backend == "sqlite":
+            _response_caches[backend] = SqliteResponseCache()
+        else:
+            raise ValueError(f"Invalid response cache backend: {backend}")
+    return _response_caches[backend]
+
+
+def get_model_name(model) -> str:
+    return getattr(model, "model_name", None) or getattr(model, "model", None) or type(model).__name__
+
+
+async def ainvoke_with_cache(model, messages: list[BaseMessage], cache) -> AIMessage:
+    """Invoke the model, answering repeated requests from the cache"""
+    if cache is None:
+        return await model.ainvoke(messages)
+
+    key = make_cache_key(messages, get_model_name(model))
+    cached_response = await cache.aget(key)
+    if cached_response is not None:
+        return cached_response
+
+    response = await model.ainvoke(messages)
+    await cache.aset(key, response)
+    return response
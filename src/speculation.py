@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.runnables.config import RunnableConfig
+from langgraph.constants import TAG_NOSTREAM
+
+from src.agent_state import AgentState
+from src.nodes.node_response_generator import node_response_generator
+from src.nodes.node_tool_caller import node_tool_caller
+from src.tools.tools import PARALLEL_INFO_TOOL_NAMES
+
+logger = logging.getLogger(__name__)
+
+# Opt-in speculative execution (speculative_execution in the config). The planner's decision is
+# predicted from the state, and the predicted node (tool_caller or response_generator) starts
+# concurrently with the planner's LLM call. When the planner agrees, the node's result is used and
+# the node isn't run again - otherwise it is cancelled.
+# - The speculative node runs before the planner's instructions exist - the tool caller is given the
+#   previous plan instead, the response generator the previous feedback
+# - A speculative tool call can't be checked against the instructions, so only read-only info tool
+#   calls are kept - any other tool call is discarded and the tool caller runs again
+# - Speculative LLM calls are nostream, so a kept response reaches the client as one message
+#   instead of token by token
+# - A miss costs the speculative LLM call, up to when it is cancelled
+
+SPECULATIVE_NODES = {
+    "tool_caller": node_tool_caller,
+    "response_generator": node_response_generator,
+}
+
+# Iteration counts above this share one prediction
+_MAX_ITERATION_FEATURE = 4
+# Planner decisions seen for a feature set before they replace the default prediction
+_MIN_OBSERVATIONS = 3
+
+
+def _last_tool_calls_shown_to_user(messages: list) -> bool:
+    """Whether the tool calls answered by the trailing ToolMessages were show-only actions"""
+    tool_call_ids = set()
+    for message in reversed(messages):
+        if isinstance(message, ToolMessage):
+            tool_call_ids.add(message.tool_call_id)
+        elif isinstance(message, AIMessage):
+            tool_calls = [call for call in message.tool_calls if call["id"] in tool_call_ids]
+            # Actions without show_to_user (ie. toggle_clock_in_or_out, show_tasks) are shown in the UI
+            return bool(tool_calls) and all(
+                call["args"].get("show_to_user", True) for call in tool_calls
+            )
+    return False
+
+
+def get_prediction_features(state: AgentState) -> tuple:
+    """Iteration count, last message type and whether the last tool calls were show-only"""
+    messages = state["messages"]
+    last_message = messages[-1] if messages else None
+    return (
+        min(state.get("iteration_count", 0) or 0, _MAX_ITERATION_FEATURE),
+        last_message.type if last_message is not None else None,
+        isinstance(last_message, ToolMessage) and _last_tool_calls_shown_to_user(messages),
+    )
+
+
+class SpeculationPredictor:
+    """Predicts the planner's next_node - the most frequent decision for the features once it has
+    seen enough of them, otherwise a fixed rule"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # Planner decisions per feature set
+        self.decisions: dict[tuple, dict[str, int]] = {}
+
+    def default_prediction(self, features: tuple) -> str:
+        iteration_count, last_message_type, shown_to_user = features
+        if last_message_type == "tool":
+            # Nothing left to fetch once the user has been shown the result
+            return "response_generator" if shown_to_user else "tool_caller"
+        return "tool_caller"
+
+    def predict(self, features: tuple) -> str:
+        decisions = self.decisions.get(features, {})
+        if sum(decisions.values()) >= _MIN_OBSERVATIONS:
+            return max(decisions, key=decisions.get)
+        return self.default_prediction(features)
+
+    def record(self, features: tuple, next_node: str):
+        decisions = self.decisions.setdefault(features, {})
+        decisions[next_node] = decisions.get(next_node, 0) + 1
+
+
+speculation_predictor = SpeculationPredictor()
+
+
+class SpeculationStats:
+    """Speculations per predicted node - hits, misses, failures and the planner wait they saved"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.speculations: dict[str, int] = {}
+        self.hits: dict[str, int] = {}
+        self.misses: dict[str, int] = {}
+        # Hits where the speculative node didn't produce a usable result - the node is run again
+        self.failures: dict[str, int] = {}
+        # Hits with tool calls other than read-only info requests - the node is run again
+        self.discarded: dict[str, int] = {}
+        self.seconds_saved = 0.0
+
+    def record(self, node: str, outcome: str, seconds_saved: float = 0.0):
+        self.speculations[node] = self.speculations.get(node, 0) + 1
+        counts = {"hit": self.hits, "miss": self.misses, "failure": self.failures, "discarded": self.discarded}[
+            outcome
+        ]
+        counts[node] = counts.get(node, 0) + 1
+        self.seconds_saved += seconds_saved
+
+    def summary(self) -> dict:
+        speculations = sum(self.speculations.values())
+        hits = sum(self.hits.values())
+        return {
+            "speculations": speculations,
+            "hits": hits,
+            "misses": sum(self.misses.values()),
+            "failures": sum(self.failures.values()),
+            "discarded": sum(self.discarded.values()),
+            "hit_rate": round(hits / (speculations or 1), 3),
+            "seconds_saved": round(self.seconds_saved, 3),
+            "by_node": {
+                node: {
+                    "speculations": count,
+                    "hits": self.hits.get(node, 0),
+                    "misses": self.misses.get(node, 0),
+                    "failures": self.failures.get(node, 0),
+                    "discarded": self.discarded.get(node, 0),
+                }
+                for node, count in self.speculations.items()
+            },
+        }
+
+
+speculation_stats = SpeculationStats()
+
+
+def _only_info_tool_calls(update: dict) -> bool:
+    """Whether every tool call of a tool_caller update is a read-only info request"""
+    tool_calls = [
+        tool_call
+        for message in update.get("messages") or []
+        for tool_call in getattr(message, "tool_calls", None) or []
+    ]
+    return bool(tool_calls) and all(tool_call["name"] in PARALLEL_INFO_TOOL_NAMES for tool_call in tool_calls)
+
+
+class Speculation:
+    """Predicted node running alongside the planner"""
+
+    def __init__(self, state: AgentState, config: RunnableConfig):
+        self.features = get_prediction_features(state)
+        self.node = speculation_predictor.predict(self.features)
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+
+        speculative_state = dict(state)
+        if self.node == "tool_caller":
+            # The planner hasn't written the instructions yet - work from the previous plan
+            plan = state.get("plan") or ""
+            speculative_state["prev_node_feedback"] = (
+                f"Do the next step of this plan:\n{plan}" if plan else "Do what the user asked in their last message"
+            )
+        # Nothing reaches the client unless the planner agrees - keep the tokens out of the stream
+        speculative_config = {**config, "tags": [*(config.get("tags") or []), TAG_NOSTREAM]}
+        self.task = asyncio.ensure_future(self._run(speculative_state, speculative_config))
+
+    async def _run(self, state: dict, config: RunnableConfig) -> dict:
+        try:
+            return await SPECULATIVE_NODES[self.node](state, config)
+        finally:
+            self.finished_at = time.perf_counter()
+
+    async def cancel(self):
+        if not self.task.done():
+            self.task.cancel()
+        try:
+            await self.task
+        except (asyncio.CancelledError, Exception):
+            pass
+
+    async def resolve(self, next_node: str) -> Optional[dict]:
+        """The speculative node's update when the planner chose the predicted node, None otherwise"""
+        planner_seconds = time.perf_counter() - self.started_at
+        speculation_predictor.record(self.features, next_node)
+
+        if next_node != self.node:
+            logger.debug("Speculation missed: predicted %s, planner chose %s", self.node, next_node)
+            speculation_stats.record(self.node, "miss")
+            await self.cancel()
+            return None
+
+        try:
+            update = await self.task
+        except Exception as e:
+            logger.warning("Speculative %s failed: %s", self.node, e)
+            update = None
+        usable = update is not None and (
+            # Failed tool calls go back to the planner - run the node again with the instructions
+            update.get("next_node") == "tools"
+            if self.node == "tool_caller"
+            else bool(update.get("messages"))
+        )
+        if not usable:
+            speculation_stats.record(self.node, "failure")
+            return None
+        if self.node == "tool_caller" and not _only_info_tool_calls(update):
+            logger.debug("Speculative tool call discarded - not a read-only info request")
+            speculation_stats.record(self.node, "discarded")
+            return None
+
+        # The node ran during the planner call - whichever finished first is time saved
+        node_seconds = self.finished_at - self.started_at
+        seconds_saved = min(planner_seconds, node_seconds)
+        logger.debug("Speculative %s kept, saved %.3fs", self.node, seconds_saved)
+        speculation_stats.record(self.node, "hit", seconds_saved)
+        return update
+
+
+def start_speculation(state: AgentState, config: RunnableConfig) -> Optional[Speculation]:
+    """Speculation for the planner's next node, None when there's nothing to speculate on"""
+    messages = state["messages"]
+    if not messages or not isinstance(messages[-1], (HumanMessage, ToolMessage)):
+        return None
+    return Speculation(state, config)
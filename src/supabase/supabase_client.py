@@ -1,7 +1,12 @@
+import asyncio
 import os
-from supabase import create_client, Client
+from typing import TYPE_CHECKING, Optional
+
 from dotenv import load_dotenv
 
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
 # Run: poetry run python -m src.local.test_supabase
 
 load_dotenv()
@@ -9,7 +14,18 @@ load_dotenv()
 url: str = os.environ.get("SUPABASE_URL")
 key: str = os.environ.get("SUPABASE_KEY")
 
-print("url", url)
-print("key", key)
+_supabase_client: Optional["AsyncClient"] = None
+_supabase_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+async def get_supabase_client() -> "AsyncClient":
+    """Async client for the running event loop - created once and reused, so its HTTP connections are kept alive"""
+    # Imported on first use - the SDK is slow to import and most turns never touch it
+    from supabase import acreate_client
 
-supabase_client: Client = create_client(url, key)
\ No newline at end of file
+    global _supabase_client, _supabase_client_loop
+    loop = asyncio.get_running_loop()
+    if _supabase_client is None or _supabase_client_loop is not loop:
+        _supabase_client = await acreate_client(url, key)
+        _supabase_client_loop = loop
+    return _supabase_client
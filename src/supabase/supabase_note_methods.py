@@ -1,31 +1,99 @@
-import os
-from typing import Optional, Dict, Any
-from supabase import Client
+import asyncio
+import weakref
+from typing import Optional
 
-from src.supabase.supabase_client import supabase_client
+from src.supabase.supabase_client import get_supabase_client
 
+# Ids per in.(...) query - keeps the PostgREST request url short
+MAX_NOTE_IDS_PER_QUERY = 100
 
-async def get_note_description_by_id(note_id: str) -> Optional[str]:
+
+async def get_note_descriptions_by_ids(note_ids: list[str]) -> dict[str, Optional[str]]:
     """
-    Retrieves the description of a note by its ID from Supabase.
+    Retrieves the descriptions of several notes with one query per MAX_NOTE_IDS_PER_QUERY ids.
 
     Args:
-        note_id: The ID of the note to retrieve
+        note_ids: The IDs of the notes to retrieve
 
     Returns:
-        The description of the note if found, None otherwise
+        Description by note ID - notes that weren't found map to None
     """
-    try:
+    supabase_client = await get_supabase_client()
+    unique_note_ids = list(dict.fromkeys(note_ids))
+    descriptions = {note_id: None for note_id in unique_note_ids}
+    for index in range(0, len(unique_note_ids), MAX_NOTE_IDS_PER_QUERY):
         response = (
             await supabase_client.table("notes")
-            .select("description")
-            .eq("id", note_id)
+            .select("id, description")
+            .in_("id", unique_note_ids[index : index + MAX_NOTE_IDS_PER_QUERY])
             .execute()
         )
+        for note in response.data or []:
+            descriptions[note["id"]] = note.get("description")
+    return descriptions
 
-        if response.data and len(response.data) > 0:
-            return response.data[0].get("description")
-        return None
+
+class NoteDescriptionLoader:
+    """Coalesces note lookups made in the same event loop tick into one batched query (DataLoader style)"""
+
+    def __init__(self):
+        # Lookups waiting for the next dispatch, per event loop - a batch left behind by a loop that
+        # closed before dispatching goes away with the loop instead of blocking later lookups
+        self._pending: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, list[asyncio.Future]]] = (
+            weakref.WeakKeyDictionary()
+        )
+        # Running dispatches - the event loop only keeps weak references to tasks
+        self._dispatch_tasks: set[asyncio.Task] = set()
+
+    async def load(self, note_id: str) -> Optional[str]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.get(loop)
+        if pending is None:
+            pending = self._pending[loop] = {}
+            # Dispatch once every lookup scheduled in this tick has been queued
+            loop.call_soon(self._start_dispatch, loop)
+        pending.setdefault(note_id, []).append(future)
+        return await future
+
+    def _start_dispatch(self, loop: asyncio.AbstractEventLoop):
+        task = loop.create_task(self._dispatch(loop))
+        self._dispatch_tasks.add(task)
+        task.add_done_callback(self._dispatch_tasks.discard)
+
+    async def _dispatch(self, loop: asyncio.AbstractEventLoop):
+        batch = self._pending.pop(loop, {})
+        try:
+            descriptions = await get_note_descriptions_by_ids(list(batch))
+        except Exception as e:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        for note_id, futures in batch.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(descriptions.get(note_id))
+
+
+note_description_loader = NoteDescriptionLoader()
+
+
+async def get_note_description_by_id(note_id: str) -> Optional[str]:
+    """
+    Retrieves the description of a note by its ID from Supabase.
+
+    Concurrent calls are batched into a single query.
+
+    Args:
+        note_id: The ID of the note to retrieve
+
+    Returns:
+        The description of the note if found, None otherwise
+    """
+    try:
+        return await note_description_loader.load(note_id)
     except Exception as e:
         print(f"Error retrieving note description: {e}")
         return None
@@ -0,0 +1,131 @@
+import re
+from difflib import SequenceMatcher
+
+from pydantic import BaseModel, Field
+
+# Computes the keep / remove / add operations the client shows for a note update.
+# The LLM only writes targeted edits (find -> replace), the operations over the whole note are
+# computed here with a word level diff, so LLM output no longer grows with the note length.
+
+# Words, runs of whitespace and single punctuation characters - joining the tokens gives back the text
+_WORD_TOKENS = re.compile(r"\w+|\s+|[^\w\s]")
+# Sentences and lines, with their trailing punctuation and whitespace
+_SEGMENTS = re.compile(r"[^.!?\n]*[.!?\n]+\s*|[^.!?\n]+")
+# Changed spans longer than this (ie. a huge paragraph without punctuation) are replaced as a
+# whole instead of diffed word by word - the word diff is quadratic in the worst case
+MAX_WORD_DIFF_TOKENS = 5_000
+
+
+class NoteTextEdit(BaseModel):
+    """A targeted edit to a note"""
+
+    find: str = Field(
+        description="Exact text copied from the current note, long enough to be unique. Empty to append to the end of the note"
+    )
+    replace: str = Field(description="Text to put in its place. Empty to remove it")
+
+
+class NoteTextEditList(BaseModel):
+    """List of targeted edits to a note"""
+
+    edits: list[NoteTextEdit] = Field(description="List of edits, applied in order")
+
+
+def apply_note_edits(note: str, edits: list[NoteTextEdit]) -> str:
+    """Apply the edits in order, raising ValueError if an edit's find text isn't in the note"""
+    for edit in edits:
+        if edit.find == "":
+            note = note + edit.replace
+            continue
+        index = note.find(edit.find)
+        if index == -1:
+            raise ValueError(f"Text to replace was not found in the note: {edit.find!r}")
+        note = note[:index] + edit.replace + note[index + len(edit.find) :]
+    return note
+
+
+def tokenize_words(text: str) -> list[str]:
+    return _WORD_TOKENS.findall(text)
+
+
+def split_segments(text: str) -> list[str]:
+    return _SEGMENTS.findall(text)
+
+
+def _append_operation(operations: list[dict], operation_type: str, text: str):
+    if not text:
+        return
+    if operations and operations[-1]["type"] == operation_type:
+        operations[-1]["text"] += text
+    else:
+        operations.append({"type": operation_type, "text": text})
+
+
+def _diff_words(previous_text: str, updated_text: str, operations: list[dict]):
+    previous_tokens = tokenize_words(previous_text)
+    updated_tokens = tokenize_words(updated_text)
+
+    # Only diff what's between the common prefix and suffix
+    prefix_length = 0
+    max_prefix_length = min(len(previous_tokens), len(updated_tokens))
+    while (
+        prefix_length < max_prefix_length
+        and previous_tokens[prefix_length] == updated_tokens[prefix_length]
+    ):
+        prefix_length += 1
+    suffix_length = 0
+    max_suffix_length = max_prefix_length - prefix_length
+    while (
+        suffix_length < max_suffix_length
+        and previous_tokens[-suffix_length - 1] == updated_tokens[-suffix_length - 1]
+    ):
+        suffix_length += 1
+
+    previous_middle = previous_tokens[prefix_length : len(previous_tokens) - suffix_length]
+    updated_middle = updated_tokens[prefix_length : len(updated_tokens) - suffix_length]
+
+    _append_operation(operations, "keep", "".join(previous_tokens[:prefix_length]))
+    if len(previous_middle) + len(updated_middle) > MAX_WORD_DIFF_TOKENS:
+        _append_operation(operations, "remove", "".join(previous_middle))
+        _append_operation(operations, "add", "".join(updated_middle))
+        _append_operation(
+            operations, "keep", "".join(previous_tokens[len(previous_tokens) - suffix_length :])
+        )
+        return
+    matcher = SequenceMatcher(None, previous_middle, updated_middle, autojunk=False)
+    for tag, previous_start, previous_end, updated_start, updated_end in matcher.get_opcodes():
+        if tag == "equal":
+            _append_operation(operations, "keep", "".join(previous_middle[previous_start:previous_end]))
+            continue
+        if tag in ("replace", "delete"):
+            _append_operation(operations, "remove", "".join(previous_middle[previous_start:previous_end]))
+        if tag in ("replace", "insert"):
+            _append_operation(operations, "add", "".join(updated_middle[updated_start:updated_end]))
+    _append_operation(
+        operations, "keep", "".join(previous_tokens[len(previous_tokens) - suffix_length :])
+    )
+
+
+def diff_note(previous_note: str, updated_note: str) -> list[dict]:
+    """Word level operations that turn previous_note into updated_note
+
+    Same format the client already renders: [{"type": "keep" | "remove" | "add", "text": ...}, ...]
+    """
+    # Sentences / lines are diffed first and only the changed ones are diffed word by word -
+    # a word level diff over a whole 100KB note is far too slow
+    previous_segments = split_segments(previous_note)
+    updated_segments = split_segments(updated_note)
+
+    operations = []
+    matcher = SequenceMatcher(None, previous_segments, updated_segments, autojunk=False)
+    for tag, previous_start, previous_end, updated_start, updated_end in matcher.get_opcodes():
+        previous_text = "".join(previous_segments[previous_start:previous_end])
+        updated_text = "".join(updated_segments[updated_start:updated_end])
+        if tag == "equal":
+            _append_operation(operations, "keep", previous_text)
+        elif tag == "replace":
+            _diff_words(previous_text, updated_text, operations)
+        else:
+            _append_operation(operations, "remove", previous_text)
+            _append_operation(operations, "add", updated_text)
+    return operations
@@ -1,9 +1,10 @@
 import json
+from langchain_core.runnables.config import RunnableConfig
 from langchain_core.tools import tool
 from typing import Annotated, Optional
-from pydantic import BaseModel, Field
 
 from src.supabase.supabase_note_methods import get_note_description_by_id
+from src.tools.note_diff import NoteTextEditList, apply_note_edits, diff_note
 from src.tools.ai_request_models import (
     AiActionRequestModel,
     AiActionRequestType,
@@ -43,22 +44,8 @@ def create_note(
     return json.dumps(response.to_dict())
 
 
-class NoteEditOperation(BaseModel):
-    """A single edit operation for a note"""
-
-    type: str = Field(description="Type of edit operation: 'keep', 'remove', or 'add'")
-    text: str = Field(description="The text content for this operation")
-
-
-# Add this new class after NoteEditOperation
-class NoteEditOperationList(BaseModel):
-    """List of edit operations for a note"""
-
-    operations: list[NoteEditOperation] = Field(description="List of edit operations")
-
-
-# TODO p2 - issue is AI might call this before knowing what the note content is
-# We might have to build checks into this that force ai to get note description before and a separate step to generate the note diffs
+# AI might call this before knowing what the note content is - the current description is then
+# fetched by note_id, so the AI doesn't have to carry it in the tool call
 @tool
 async def update_note_description(
     note_id: Annotated[str, "ID of the note to update"],
@@ -68,32 +55,43 @@ async def update_note_description(
         "Full detailed description including all relevant information on what needs to change. Do not just say 'update the note' or 'update the description' or 'update the content'. Say what specifically needs to be changed like add user completed the task 1 with priority high and also task 2 with priority low, etc.",
     ],
     previous_note_description: Annotated[
-        str,
-        "The current content of the note before changes",
-    ],
+        Optional[str],
+        "The current content of the note before changes - fetched by note_id if not provided",
+    ] = None,
     show_to_user: Annotated[
         Optional[bool],
         "Controls UI visibility",
     ] = True,
+    config: RunnableConfig = None,
 ) -> str:
     """Update the description of a note"""
 
-    # Import llm here to avoid circular imports
-    from src.llm_config import llm
+    # Import llm_config here to avoid circular imports
+    from src.llm_config import get_node_llm
 
-    # 1 ) get the note and load its description
-    # note_description = await get_note_description_by_id(note_id)
+    llm = get_node_llm("note_diff", config)
 
-    # 2 ) prompt an ai to generate the note diffs
+    # 1 ) get the note and load its description
+    if previous_note_description is None:
+        previous_note_description = await get_note_description_by_id(note_id)
+    if previous_note_description is None:
+        return json.dumps(
+            {
+                "status": "error",
+                "message": f"Could not load the current description of note {note_id}",
+            }
+        )
+
+    # 2 ) prompt an ai for targeted edits - the keep / remove / add operations are computed locally
     system_content = f"""
-    You are an expert at generating structured note modifications. 
-    
-    Given a previous note description and requested changes, generate a JSON array of edit operations.
-    Each operation should contain:
-    - "type": either "keep", "remove", or "add"
-    - "text": the text content for this operation
+    You are an expert at making targeted changes to notes.
+
+    Given a previous note description and requested changes, generate a list of edits.
+    Each edit should contain:
+    - "find": exact text copied from the previous note, just long enough to be unique. Use "" to add text to the end of the note
+    - "replace": the text to put in its place. Use "" to remove the text
 
-    The combined sequence of operations should form the complete updated note.
+    Only include the parts of the note that change - do not repeat the rest of the note.
 
     Example input:
     Previous note: "We were working on the project yesterday"
@@ -101,17 +99,12 @@ async def update_note_description(
 
     Example output:
     [
-        {{"type": "keep", "text": "We "}},
-        {{"type": "remove", "text": "were working"}},
-        {{"type": "add", "text": "are working"}},
-        {{"type": "keep", "text": " on the project yesterday"}},
-        {{"type": "add", "text": " and made good progress"}}
+        {{"find": "were working", "replace": "are working"}},
+        {{"find": "", "replace": " and made good progress"}}
     ]
 
     Previous note description: {previous_note_description}
-    Requested changes: {note_description_changes}    
-    
-    Respond only with the JSON array of operations.
+    Requested changes: {note_description_changes}
     """
     system_message = SystemMessage(content=system_content)
 
@@ -124,12 +117,15 @@ async def update_note_description(
         try:
             attempts += 1
             # Use structured output with the wrapper class
-            structured_llm = llm.with_structured_output(NoteEditOperationList)
+            structured_llm = llm.with_structured_output(NoteTextEditList)
             response = await structured_llm.ainvoke([system_message])
 
+            updated_note_description = apply_note_edits(
+                previous_note_description, response.edits
+            )
             # Convert to JSON for response
             edit_operations_json = json.dumps(
-                [op.model_dump() for op in response.operations]
+                diff_note(previous_note_description, updated_note_description)
             )
             success = True
         except ValueError as e:
@@ -142,7 +138,7 @@ async def update_note_description(
                 )
 
             # Update the system message with error feedback for retry
-            error_feedback = f"\nPrevious attempt failed with error: {str(e)}. Please ensure you're returning a valid JSON array of operations with correct 'type' and 'text' fields."
+            error_feedback = f"\nPrevious attempt failed with error: {str(e)}. Please ensure every edit has 'find' and 'replace' fields and 'find' is copied exactly from the previous note."
             system_message = SystemMessage(content=system_content + error_feedback)
 
     # 3 ) return the diffs for the client to show
@@ -0,0 +1,181 @@
+import json
+import re
+from typing import Optional
+
+from src.tools.ai_request_models import AiInfoRequestType
+
+# Compacts the results the client returns for AI requests before they are stored in state.
+# Results are replayed into every later planner / tool_caller / response_generator prompt, so
+# verbose JSON (repeated keys, null fields, unused columns) costs tokens and latency on every call.
+# Lists of records become a table: one header line with the column names, then one line per row.
+
+# Columns that matter per info request type - other columns are dropped, as long as the result has
+# all of the type's core columns. Without them the result shape is not the expected one, and every
+# column is kept.
+# Keys are matched ignoring case and underscores, so "dueDate" matches "due_date"
+INFO_RESULT_COLUMNS = {
+    AiInfoRequestType.FIND_TASKS.value: [
+        "id",
+        "name",
+        "description",
+        "status",
+        "priority",
+        "start_date",
+        "due_date",
+        "estimated_duration_minutes",
+        "parent_project_name",
+        "author_user_name",
+        "assigned_user_names",
+    ],
+    AiInfoRequestType.FIND_NOTES.value: [
+        "id",
+        "name",
+        "description",
+        "parent_project_name",
+        "author_user_name",
+        "created_at",
+        "updated_at",
+    ],
+    AiInfoRequestType.SHIFT_LOGS.value: [
+        "clock_in_datetime",
+        "clock_out_datetime",
+        "is_break",
+        "notes",
+    ],
+}
+
+INFO_RESULT_CORE_COLUMNS = {
+    AiInfoRequestType.FIND_TASKS.value: ["id", "name"],
+    AiInfoRequestType.FIND_NOTES.value: ["id", "name"],
+    AiInfoRequestType.SHIFT_LOGS.value: ["clock_in_datetime"],
+}
+
+# Lossless timestamp shortening - "2025-03-14T17:00:00.000Z" -> "2025-03-14T17:00Z"
+_TIMESTAMP_ZERO_SECONDS = re.compile(r"^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}):00(?:\.0+)?(Z|[+-]\d{2}:?\d{2})?$")
+_TIMESTAMP_ZERO_FRACTION = re.compile(r"^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})\.0+(Z|[+-]\d{2}:?\d{2})?$")
+
+
+def _normalize_key(key: str) -> str:
+    return key.replace("_", "").lower()
+
+
+def _is_empty(value) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def _format_cell(value) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, list):
+        return ", ".join(_format_cell(item) for item in value)
+    if isinstance(value, dict):
+        return json.dumps(_drop_empty(value), separators=(",", ":"))
+    text = str(value)
+    match = _TIMESTAMP_ZERO_SECONDS.match(text) or _TIMESTAMP_ZERO_FRACTION.match(text)
+    if match:
+        text = match.group(1) + (match.group(2) or "")
+    return text.replace("|", "/").replace("\n", " ")
+
+
+def _drop_empty(value):
+    if isinstance(value, dict):
+        return {key: _drop_empty(item) for key, item in value.items() if not _is_empty(item)}
+    if isinstance(value, list):
+        return [_drop_empty(item) for item in value]
+    return value
+
+
+def _select_columns(records: list[dict], info_request_type: Optional[str]) -> list[str]:
+    # Columns with at least one value, in first seen order
+    columns = []
+    for record in records:
+        for key, value in record.items():
+            if key not in columns and not _is_empty(value):
+                columns.append(key)
+
+    wanted_columns = INFO_RESULT_COLUMNS.get(info_request_type)
+    if not wanted_columns:
+        return columns
+    # Unknown result shape - better to keep everything than to drop columns that matter
+    present = {_normalize_key(column) for column in columns}
+    if any(_normalize_key(column) not in present for column in INFO_RESULT_CORE_COLUMNS[info_request_type]):
+        return columns
+    wanted_order = {_normalize_key(column): index for index, column in enumerate(wanted_columns)}
+    projected = [column for column in columns if _normalize_key(column) in wanted_order]
+    return sorted(projected, key=lambda column: wanted_order[_normalize_key(column)])
+
+
+def compact_records(records: list[dict], info_request_type: Optional[str] = None) -> str:
+    """Encode a list of records as a table, hoisting columns that have the same value in every row"""
+    if not records:
+        return "0 rows"
+
+    columns = _select_columns(records, info_request_type)
+    lines = [f"{len(records)} rows"]
+
+    if len(records) > 1:
+        constant_columns = [
+            column
+            for column in columns
+            if all(record.get(column) == records[0].get(column) for record in records)
+        ]
+        if constant_columns:
+            lines.append(
+                "all rows: "
+                + "; ".join(
+                    f"{column}={_format_cell(records[0].get(column))}"
+                    for column in constant_columns
+                )
+            )
+            columns = [column for column in columns if column not in constant_columns]
+
+    if columns:
+        lines.append("|".join(columns))
+        for record in records:
+            lines.append(
+                "|".join(
+                    "" if _is_empty(record.get(column)) else _format_cell(record.get(column))
+                    for column in columns
+                )
+            )
+    return "\n".join(lines)
+
+
+def _is_record_list(value) -> bool:
+    return isinstance(value, list) and bool(value) and all(isinstance(item, dict) for item in value)
+
+
+def get_info_request_type(request_content: str) -> Optional[str]:
+    """info_request_type of an AI request tool message, None for action / ui requests"""
+    try:
+        request = json.loads(request_content)
+    except (TypeError, ValueError):
+        return None
+    return request.get("info_request_type") if isinstance(request, dict) else None
+
+
+def compact_ai_request_result(result: str, info_request_type: Optional[str] = None) -> str:
+    """Compact a client result - anything that isn't JSON is returned unchanged"""
+    try:
+        parsed = json.loads(result)
+    except (TypeError, ValueError):
+        return result
+
+    if _is_record_list(parsed) or parsed == []:
+        return compact_records(parsed, info_request_type)
+
+    if isinstance(parsed, dict):
+        parsed = _drop_empty(parsed)
+        record_lists = [key for key, value in parsed.items() if _is_record_list(value)]
+        # ie. {"tasks": [...], "total": 12}
+        if len(record_lists) == 1:
+            key = record_lists[0]
+            records = parsed.pop(key)
+            header = json.dumps(parsed, separators=(",", ":")) + "\n" if parsed else ""
+            return f"{header}{key}: " + compact_records(records, info_request_type)
+        return json.dumps(parsed, separators=(",", ":"))
+
+    if isinstance(parsed, list):
+        return json.dumps(_drop_empty(parsed), separators=(",", ":"))
+
+    return result
@@ -89,14 +89,6 @@ def toggle_clock_in_or_out() -> str:
     return json.dumps(response.to_dict())
 
 
-def get_all_tools():
-    return [get_shift_assignments, get_shift_logs, toggle_clock_in_or_out]
-
-
-def get_ai_request_tools():
-    return [get_shift_assignments, get_shift_logs, toggle_clock_in_or_out]
-
-
 @tool()
 def get_current_shift_info(
     show_only: Annotated[
@@ -115,3 +107,21 @@ def get_current_shift_info(
         },
     )
     return json.dumps(response.to_dict())
+
+
+def get_all_tools():
+    return [
+        get_shift_assignments,
+        get_shift_logs,
+        toggle_clock_in_or_out,
+        get_current_shift_info,
+    ]
+
+
+def get_ai_request_tools():
+    return [
+        get_shift_assignments,
+        get_shift_logs,
+        toggle_clock_in_or_out,
+        get_current_shift_info,
+    ]
@@ -0,0 +1,276 @@
+import json
+import logging
+import re
+import uuid
+from typing import Optional
+
+from langchain_core.messages import AIMessage
+from pydantic import ValidationError
+
+from src.tools.tools import get_default_tool_set, get_tool_set_key
+
+logger = logging.getLogger(__name__)
+
+# Local repair of the tool caller's output, so most malformed responses don't cost another LLM call:
+# - tool calls the model wrote into the text content are parsed into real tool calls
+# - enum arguments ("Must be: ..." in the tool's arg descriptions, ie. task_priority) are coerced
+#   to the exact value (ie. "Very High" -> "veryHigh", "done" -> "closed")
+# - arguments the tool doesn't have are dropped
+# - the result is validated against the tool's args_schema
+# Only a response that still isn't valid goes back to the LLM.
+
+# Allowed values are listed in the arg description, ie. "Must be: open, inProgress, or closed - STRICT_ENUM"
+_ENUM_DESCRIPTION = re.compile(r"^Must be:\s*(.+?)(?:\s*-\s*STRICT_ENUM)?\s*$")
+_ENUM_SEPARATOR = re.compile(r",\s*(?:or\s+)?|\s+or\s+")
+
+# Llama style text tool calls, ie. <function=find_tasks>{"show_to_user": false}</function>
+_TEXT_FUNCTION_CALL = re.compile(r"<function[=/ ]?(\w+)>?")
+
+# Common values the model uses instead of the enum value, by normalized value
+ENUM_SYNONYMS = {
+    "done": "closed",
+    "completed": "closed",
+    "complete": "closed",
+    "finished": "closed",
+    "todo": "open",
+    "notstarted": "open",
+    "started": "inProgress",
+    "medium": "normal",
+}
+
+# Keys text tool calls use for the arguments
+_ARGS_KEYS = ("args", "arguments", "parameters")
+
+
+def _normalize(value: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", value.lower())
+
+
+class ToolCallRepairStats:
+    """How often the tool caller's responses were valid, repaired locally, or needed another LLM call"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.responses = 0
+        self.valid = 0
+        self.repaired = 0
+        self.unrepairable = 0
+        # Count per repair kind - parsed_from_text, enum_coerced, unknown_args_dropped
+        self.repairs: dict[str, int] = {}
+
+    def record(self, repairs: list[str], valid: bool):
+        self.responses += 1
+        if not valid:
+            self.unrepairable += 1
+        elif repairs:
+            self.repaired += 1
+        else:
+            self.valid += 1
+        for repair in repairs:
+            self.repairs[repair] = self.repairs.get(repair, 0) + 1
+
+    def summary(self) -> dict:
+        responses = self.responses or 1
+        return {
+            "responses": self.responses,
+            "valid": self.valid,
+            "repaired": self.repaired,
+            "unrepairable": self.unrepairable,
+            "repairs": self.repairs,
+            "repair_rate": round(self.repaired / responses, 3),
+            # Unrepairable responses are retried with another LLM call
+            "retry_rate": round(self.unrepairable / responses, 3),
+        }
+
+
+tool_call_repair_stats = ToolCallRepairStats()
+
+
+class ToolCallRepairer:
+    """Repairs and validates tool calls against one tool set - built once per tool set"""
+
+    def __init__(self, tools: list):
+        self.tools_by_name = {tool.name: tool for tool in tools}
+        # Allowed values per enum arg, by tool name and arg name
+        self.enum_values: dict[str, dict[str, list[str]]] = {}
+        for tool in tools:
+            for arg_name, field in tool.args_schema.model_fields.items():
+                match = _ENUM_DESCRIPTION.match(field.description or "")
+                if match:
+                    self.enum_values.setdefault(tool.name, {})[arg_name] = [
+                        value.strip()
+                        for value in _ENUM_SEPARATOR.split(match.group(1))
+                        if value.strip()
+                    ]
+
+    def parse_text_tool_calls(self, content: str) -> list[dict]:
+        """Tool calls written into the message text, as JSON objects or <function=name>{...} tags"""
+        decoder = json.JSONDecoder()
+        tool_calls = []
+
+        for match in _TEXT_FUNCTION_CALL.finditer(content):
+            name = match.group(1)
+            start = content.find("{", match.end())
+            if name not in self.tools_by_name or start == -1:
+                continue
+            try:
+                args, _ = decoder.raw_decode(content, start)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(args, dict):
+                tool_calls.append({"name": name, "args": args})
+        if tool_calls:
+            return tool_calls
+
+        # {"name": "find_tasks", "arguments": {...}} - possibly in a code block or a list
+        position = content.find("{")
+        while position != -1:
+            try:
+                value, end = decoder.raw_decode(content, position)
+            except json.JSONDecodeError:
+                position = content.find("{", position + 1)
+                continue
+            args_key = next((key for key in _ARGS_KEYS if key in value), None)
+            args = value[args_key] if args_key else None
+            if isinstance(args, str):
+                try:
+                    args = json.loads(args)
+                except json.JSONDecodeError:
+                    args = None
+            if value.get("name") in self.tools_by_name and isinstance(args, dict):
+                tool_calls.append({"name": value["name"], "args": args})
+                position = content.find("{", end)
+            else:
+                # Not a tool call itself, but it may contain one (ie. {"tool_calls": [...]})
+                position = content.find("{", position + 1)
+        return tool_calls
+
+    def coerce_enum(self, value, allowed_values: list[str]):
+        """Exact enum value for a near miss (case, spacing, synonyms), the value itself if there's none"""
+        if not isinstance(value, str) or value in allowed_values:
+            return value
+        normalized = _normalize(value)
+        normalized = _normalize(ENUM_SYNONYMS.get(normalized, normalized))
+        return next(
+            (allowed for allowed in allowed_values if _normalize(allowed) == normalized),
+            value,
+        )
+
+    def repair_args(self, name: str, args: dict) -> tuple[dict, list[str], Optional[str]]:
+        """Repaired args, the repairs that were made, and the validation error (None when valid)"""
+        tool = self.tools_by_name.get(name)
+        if tool is None:
+            return args, [], f"Unknown tool {name!r}"
+
+        repairs = []
+        fields = tool.args_schema.model_fields
+        known_args = {key: value for key, value in args.items() if key in fields}
+        if len(known_args) < len(args):
+            repairs.append("unknown_args_dropped")
+        args = known_args
+
+        for arg_name, allowed_values in self.enum_values.get(name, {}).items():
+            if arg_name in args:
+                coerced = self.coerce_enum(args[arg_name], allowed_values)
+                if coerced != args[arg_name]:
+                    args = {**args, arg_name: coerced}
+                    repairs.append("enum_coerced")
+
+        try:
+            tool.args_schema.model_validate(args)
+        except ValidationError as e:
+            errors = "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+                for error in e.errors()
+            )
+            return args, repairs, f"Invalid arguments for {name}: {errors}"
+
+        for arg_name, allowed_values in self.enum_values.get(name, {}).items():
+            value = args.get(arg_name)
+            if value is not None and value not in allowed_values:
+                return (
+                    args,
+                    repairs,
+                    f"Invalid {arg_name} for {name}: {value!r} - must be one of {', '.join(allowed_values)}",
+                )
+        return args, repairs, None
+
+    def repair(self, response: AIMessage) -> tuple[Optional[AIMessage], list[str], str]:
+        """Repaired tool call message (None if it can't be repaired), the repairs made and the error"""
+        repairs = []
+        tool_calls = [
+            {"name": call.get("name"), "args": call.get("args") or {}, "id": call.get("id")}
+            for call in response.tool_calls
+            if call.get("name")
+        ]
+        if not tool_calls and response.invalid_tool_calls:
+            # Tool call with args that aren't JSON - nothing to repair
+            invalid_call = response.invalid_tool_calls[0]
+            return None, repairs, f"Tool call {invalid_call.get('name')} has malformed arguments: {invalid_call.get('error')}"
+
+        if not tool_calls and isinstance(response.content, str) and response.content:
+            tool_calls = self.parse_text_tool_calls(response.content)
+            if tool_calls:
+                repairs.append("parsed_from_text")
+        if not tool_calls:
+            return None, repairs, "No tool call was made"
+
+        repaired_calls = []
+        for call in tool_calls:
+            args, arg_repairs, error = self.repair_args(call["name"], call["args"])
+            repairs += arg_repairs
+            if error:
+                return None, repairs, error
+            repaired_calls.append(
+                {
+                    "name": call["name"],
+                    "args": args,
+                    "id": call.get("id") or f"call_{uuid.uuid4().hex[:12]}",
+                }
+            )
+
+        if not repairs:
+            return response, repairs, ""
+        # Rebuilt from the repaired tool calls - the raw provider tool calls would no longer match
+        return (
+            AIMessage(
+                content="",
+                tool_calls=repaired_calls,
+                id=response.id,
+                response_metadata=response.response_metadata,
+                usage_metadata=response.usage_metadata,
+            ),
+            repairs,
+            "",
+        )
+
+
+_repairers: dict[tuple, ToolCallRepairer] = {}
+
+
+def get_tool_call_repairer(tools: list = None) -> ToolCallRepairer:
+    """Repairer for the tool set, built only when the tool set changes"""
+    if tools is None:
+        tools, key = get_default_tool_set()
+    else:
+        key = get_tool_set_key(tools)
+    repairer = _repairers.get(key)
+    if repairer is None:
+        repairer = ToolCallRepairer(tools)
+        _repairers[key] = repairer
+    return repairer
+
+
+def repair_tool_call_message(response: AIMessage) -> tuple[Optional[AIMessage], str]:
+    """Valid tool call message for the tool caller's response, or None and why it couldn't be repaired"""
+    if not isinstance(response, AIMessage):
+        tool_call_repair_stats.record([], valid=False)
+        return None, "Unexpected response format"
+
+    repaired, repairs, error = get_tool_call_repairer().repair(response)
+    tool_call_repair_stats.record(repairs, valid=repaired is not None)
+    if repairs and repaired is not None:
+        logger.debug("Repaired tool call locally: %s", ", ".join(repairs))
+    return repaired, error
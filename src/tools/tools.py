@@ -5,9 +5,10 @@ from langgraph.prebuilt import ToolNode
 from src.agent_state import AgentState
 
 from src.config_schema import ConfigSchema
-from src.tools import note_tools, shift_tools, task_tools
+from functools import lru_cache
+from typing import Optional
 
-from langchain_community.tools.tavily_search import TavilySearchResults
+from src.tools import note_tools, shift_tools, task_tools
 
 from src.tools.tool_context_manager import set_tool_context
 
@@ -17,7 +18,12 @@ from src.tools.tool_context_manager import set_tool_context
 # ==================
 
 # === TAVILY TOOL ===
-tavily = TavilySearchResults(max_results=2)
+# Built on first use - not in the tool list, so importing the tools shouldn't load the search SDK
+@lru_cache(maxsize=None)
+def get_tavily_tool():
+    from langchain_community.tools.tavily_search import TavilySearchResults
+
+    return TavilySearchResults(max_results=2)
 
 
 # === SHIFTS TOOL ===
@@ -29,10 +35,42 @@ def get_all_tools():
         *shift_tools.get_all_tools(),
         *task_tools.get_tools(),
         *note_tools.get_tools(),
-        # tavily,
+        # get_tavily_tool(),
     ]
 
 
+# Read only info tools that can be batched into one tool call turn when parallel tool calls are enabled
+# Results don't depend on each other, so the client can answer them all in one interrupt
+PARALLEL_INFO_TOOL_NAMES = ("find_tasks", "find_notes", "get_shift_logs")
+
+
+# Hashable identity of a tool set - changes whenever a tool is added, removed or re-described
+# Used to key anything precompiled from the tool list (ie. planner prompt tool catalog)
+def get_tool_set_key(tools: list = None) -> tuple:
+    if tools is None:
+        return get_default_tool_set()[1]
+    return tuple((tool.name, tool.description) for tool in tools)
+
+
+# get_all_tools() and its key, built on first use instead of on every planner / tool caller call
+_default_tool_set: Optional[tuple[list, tuple]] = None
+
+
+def get_default_tool_set() -> tuple[list, tuple]:
+    """The default tool list and its get_tool_set_key"""
+    global _default_tool_set
+    if _default_tool_set is None:
+        tools = get_all_tools()
+        _default_tool_set = (tools, get_tool_set_key(tools))
+    return _default_tool_set
+
+
+def reset_default_tool_set():
+    """Rebuild the default tool set on next use - call after changing the tools get_all_tools returns"""
+    global _default_tool_set
+    _default_tool_set = None
+
+
 # Tools that route to execute_ai_request_on_client
 # Only for tools that need followup UI execution (Mar 10 25 - we are disabling showOnly ..) the ai to respond again
 def get_ai_request_tools():
@@ -0,0 +1,44 @@
+from contextlib import asynccontextmanager
+
+
+class StandInConnection:
+    """Records the queries it is given and answers them with canned rows"""
+
+    def __init__(self, pool: "StandInPool"):
+        self.pool = pool
+
+    async def fetch(self, query: str, *args) -> list[dict]:
+        self.pool.queries.append((query, args))
+        return self.pool.rows
+
+    @asynccontextmanager
+    async def transaction(self):
+        self.pool.transactions += 1
+        yield
+
+    async def cursor(self, query: str, *args, prefetch: int = None):
+        self.pool.queries.append((query, args))
+        for row in self.pool.rows:
+            yield row
+
+
+class StandInPool:
+    """In-process stand-in for an asyncpg pool, for set_pool"""
+
+    def __init__(self, rows: list[dict] = None):
+        self.rows = rows or []
+        self.queries: list[tuple[str, tuple]] = []
+        self.transactions = 0
+        self.acquired = 0
+        self.closed = False
+
+    @asynccontextmanager
+    async def acquire(self):
+        self.acquired += 1
+        yield StandInConnection(self)
+
+    async def close(self):
+        self.closed = True
+
+    def terminate(self):
+        self.closed = True
@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+import jwt
+import pytest
+from langgraph_sdk import Auth
+from langgraph_sdk.auth.types import StudioUser
+
+from src.auth import SupabaseUser, authenticate, get_verified_user_id
+
+USER_ID = "00000000-0000-0000-0000-000000000001"
+SECRET = "test-jwt-secret-of-at-least-32-bytes"
+
+
+@pytest.fixture(autouse=True)
+def jwt_secret(monkeypatch):
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", SECRET)
+
+
+def make_token(secret: str = SECRET, **claims) -> str:
+    claims = {"sub": USER_ID, "aud": "authenticated", "exp": int(time.time()) + 60, **claims}
+    return jwt.encode(claims, secret, algorithm="HS256")
+
+
+def test_valid_access_token_authenticates_the_supabase_user():
+    user = asyncio.run(authenticate(f"Bearer {make_token()}"))
+    assert user.is_authenticated
+    assert get_verified_user_id({"configurable": {"langgraph_auth_user": user}}) == USER_ID
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        make_token(secret="another-secret-of-at-least-32-bytes"),
+        make_token(exp=int(time.time()) - 60),
+        make_token(aud="anon"),
+    ],
+)
+def test_invalid_access_token_is_rejected(token):
+    with pytest.raises(Auth.exceptions.HTTPException):
+        asyncio.run(authenticate(f"Bearer {token}"))
+
+
+def test_request_without_a_token_runs_unverified():
+    user = asyncio.run(authenticate(None))
+    assert get_verified_user_id({"configurable": {"langgraph_auth_user": user}}) is None
+
+
+@pytest.mark.parametrize(
+    "auth_user",
+    [
+        None,
+        {"identity": USER_ID, "is_authenticated": True},
+        StudioUser("developer", is_authenticated=True),
+        SupabaseUser(USER_ID, is_authenticated=False),
+    ],
+)
+def test_only_users_the_server_verified_have_a_user_id(auth_user):
+    config = {"configurable": {"user_id": USER_ID, "langgraph_auth_user": auth_user}}
+    assert get_verified_user_id(config) is None
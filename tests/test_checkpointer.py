@@ -0,0 +1,109 @@
+import asyncio
+import os
+from typing import Annotated
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+from typing_extensions import TypedDict
+
+from src.database.checkpointer import DeltaCheckpointSaver, SqliteCheckpointStore
+
+THREADS = 3
+TURNS = 30
+
+
+class State(TypedDict):
+    messages: Annotated[list, add_messages]
+    turns: int
+
+
+def respond(state: State) -> dict:
+    # Appends a result and an answer, and replaces the first message every fifth turn so the
+    # channel also gets non-append updates
+    turn = state.get("turns", 0) + 1
+    update = [
+        ToolMessage(content=f"result {turn}", tool_call_id=f"call-{turn}", id=f"tool-{turn}"),
+        AIMessage(content=f"answer {turn}", id=f"ai-{turn}"),
+    ]
+    if turn % 5 == 0:
+        first = state["messages"][0]
+        update.append(HumanMessage(content=f"{first.content} (edited {turn})", id=first.id))
+    return {"messages": update, "turns": turn}
+
+
+def build_graph(checkpointer):
+    builder = StateGraph(State)
+    builder.add_node("respond", respond)
+    builder.add_edge(START, "respond")
+    builder.add_edge("respond", END)
+    return builder.compile(checkpointer=checkpointer)
+
+
+async def run_threads(checkpointer) -> dict[str, list]:
+    graph = build_graph(checkpointer)
+
+    async def run_thread(index: int):
+        config = {"configurable": {"thread_id": f"thread-{index}"}}
+        for turn in range(TURNS):
+            await graph.ainvoke(
+                {"messages": [HumanMessage(content=f"request {turn}", id=f"human-{index}-{turn}")]}, config
+            )
+        return [(message.id, message.content) for message in (await graph.aget_state(config)).values["messages"]]
+
+    results = await asyncio.gather(*(run_thread(index) for index in range(THREADS)))
+    return {f"thread-{index}": messages for index, messages in enumerate(results)}
+
+
+@pytest.fixture
+def expected() -> dict[str, list]:
+    return asyncio.run(run_threads(MemorySaver()))
+
+
+@pytest.mark.parametrize("group_commit", [True, False])
+@pytest.mark.parametrize("keep_checkpoints", [None, 2, 5])
+def test_deltas_and_pruning_match_memory_saver(tmp_path, expected, keep_checkpoints, group_commit):
+    store = SqliteCheckpointStore(os.path.join(tmp_path, "checkpoints.sqlite"))
+    saver = DeltaCheckpointSaver(store, keep_checkpoints=keep_checkpoints, group_commit=group_commit)
+
+    async def run():
+        results = await run_threads(saver)
+        # Let the last prunes finish, then read every thread back from the database alone
+        await asyncio.gather(*saver._prune_tasks)
+        fresh_saver = DeltaCheckpointSaver(store, keep_checkpoints=keep_checkpoints)
+        graph = build_graph(fresh_saver)
+        reloaded = {}
+        for thread_id in results:
+            state = await graph.aget_state({"configurable": {"thread_id": thread_id}})
+            reloaded[thread_id] = [(message.id, message.content) for message in state.values["messages"]]
+        return results, reloaded
+
+    results, reloaded = asyncio.run(run())
+    assert results == expected
+    assert reloaded == expected
+    assert saver.stats["delta_blobs"] > 0
+    if keep_checkpoints is not None:
+        assert saver.stats["pruned_checkpoints"] > 0
+
+
+def test_stale_remembered_value_is_not_used_as_a_delta_base(tmp_path, expected):
+    # Two workers sharing one database - the thread moves from one to the other and back
+    path = os.path.join(tmp_path, "checkpoints.sqlite")
+    first = DeltaCheckpointSaver(SqliteCheckpointStore(path), keep_checkpoints=2)
+    second = DeltaCheckpointSaver(SqliteCheckpointStore(path), keep_checkpoints=2)
+    config = {"configurable": {"thread_id": "thread-0"}}
+
+    async def run():
+        for turn in range(TURNS):
+            graph = build_graph(first if (turn // 7) % 2 == 0 else second)
+            await graph.ainvoke(
+                {"messages": [HumanMessage(content=f"request {turn}", id=f"human-0-{turn}")]}, config
+            )
+        await asyncio.gather(*first._prune_tasks, *second._prune_tasks)
+        fresh = DeltaCheckpointSaver(SqliteCheckpointStore(path))
+        state = await build_graph(fresh).aget_state(config)
+        return [(message.id, message.content) for message in state.values["messages"]]
+
+    assert asyncio.run(run()) == expected["thread-0"]
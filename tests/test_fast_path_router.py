@@ -0,0 +1,14 @@
+import pytest
+
+from src.nodes.node_fast_path_router import classify_fast_path_intent
+
+
+@pytest.mark.parametrize("text", ["Toggle my clock", "toggle clock in/out", "clock in or out please"])
+def test_clock_requests_without_a_direction_toggle(text):
+    assert classify_fast_path_intent(text).tool_name == "toggle_clock_in_or_out"
+
+
+@pytest.mark.parametrize("text", ["clock me in", "Clock me out please", "punch in", "punch out", "check me out"])
+def test_clock_requests_with_a_direction_go_to_the_planner(text):
+    # toggle_clock_in_or_out would clock a user who is already in out
+    assert classify_fast_path_intent(text) is None
@@ -0,0 +1,132 @@
+import asyncio
+import json
+
+import pytest
+from langchain_core.messages import AIMessage, ToolMessage
+
+from src.auth import SupabaseUser
+from src.database import postgres_client
+from src.database.info_requests import execute_info_request
+from src.database.postgres_client import set_pool
+import src.nodes.node_execute_ai_request_on_server as server_node
+from tests.stand_in_pool import StandInPool
+
+USER_ID = "00000000-0000-0000-0000-000000000001"
+
+
+@pytest.fixture(autouse=True)
+def reset_pool(monkeypatch):
+    monkeypatch.setattr(postgres_client, "_pool", None)
+    monkeypatch.setattr(postgres_client, "_pool_loop", None)
+
+
+def run_info_request(info_request_type: str, args: dict, rows: list[dict] = None):
+    pool = StandInPool(rows=rows)
+
+    async def run():
+        set_pool(pool)
+        return await execute_info_request(info_request_type, args, USER_ID)
+
+    return asyncio.run(run()), pool.queries
+
+
+def test_find_tasks_is_scoped_to_the_user():
+    rows, queries = run_info_request(
+        "find_tasks", {"task_status": "open", "task_name": "report"}, rows=[{"id": 1}]
+    )
+    assert rows == [{"id": 1}]
+    [(query, args)] = queries
+    assert "FROM tasks t" in query
+    assert "t.author_user_id = $1" in query
+    assert "own.user_id = $1" in query
+    assert "upa.user_id = $1" in query
+    assert args[0] == USER_ID
+    assert "%report%" in args
+    assert "open" in args
+    assert "%(" not in query
+
+
+def test_find_notes_is_scoped_to_the_user():
+    _, [(query, args)] = run_info_request("find_notes", {"note_name": "meeting"})
+    assert "FROM notes n" in query
+    assert "n.author_user_id = $1" in query
+    assert args[0] == USER_ID
+    assert "%meeting%" in args
+
+
+def test_get_shift_logs_only_reads_the_users_logs():
+    _, [(query, args)] = run_info_request(
+        "shift_logs", {"days_to_get": ["2025/03/10 - 2025/03/14"]}
+    )
+    assert "FROM shift_logs sl" in query
+    assert "sl.user_id = $1" in query
+    assert args[0] == USER_ID
+    assert len(args) == 3
+
+
+def test_get_shift_logs_without_days_skips_the_query():
+    rows, queries = run_info_request("shift_logs", {})
+    assert rows == []
+    assert queries == []
+
+
+def test_unsupported_info_request_type_raises():
+    with pytest.raises(ValueError):
+        run_info_request("current_shift", {})
+
+
+def pending_find_tasks_state() -> dict:
+    request = {"info_request_type": "find_tasks", "args": {"show_to_user": False}}
+    return {
+        "messages": [
+            AIMessage(
+                content="",
+                tool_calls=[{"name": "find_tasks", "args": {}, "id": "call-1"}],
+                id="ai-1",
+            ),
+            ToolMessage(content=json.dumps(request), tool_call_id="call-1", id="tool-1"),
+        ]
+    }
+
+
+def run_server_node(config: dict):
+    pool = StandInPool(rows=[{"id": 1, "name": "Task"}])
+
+    async def run():
+        set_pool(pool)
+        return await server_node.node_execute_ai_request_on_server(pending_find_tasks_state(), config)
+
+    return asyncio.run(run()), pool.queries
+
+
+def test_client_supplied_user_id_never_reaches_the_database():
+    config = {"configurable": {"server_info_requests": True, "user_id": USER_ID}}
+    update, queries = run_server_node(config)
+    assert update == {"next_node": "execute_ai_request_on_client"}
+    assert queries == []
+
+
+def test_client_supplied_auth_user_is_not_trusted():
+    config = {
+        "configurable": {
+            "server_info_requests": True,
+            "langgraph_auth_user": {"identity": USER_ID, "is_authenticated": True},
+        }
+    }
+    update, queries = run_server_node(config)
+    assert update == {"next_node": "execute_ai_request_on_client"}
+    assert queries == []
+
+
+def test_verified_user_id_is_answered_on_the_server():
+    config = {
+        "configurable": {
+            "server_info_requests": True,
+            "user_id": "someone-else",
+            "langgraph_auth_user": SupabaseUser(USER_ID),
+        }
+    }
+    update, [(_, args)] = run_server_node(config)
+    assert update["next_node"] == "planner"
+    assert [message.id for message in update["messages"]] == ["tool-1"]
+    assert args[0] == USER_ID
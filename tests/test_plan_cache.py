@@ -0,0 +1,18 @@
+from langchain_core.messages import HumanMessage
+
+from src.auth import SupabaseUser
+from src.plan_cache import get_cache_scope, start_turn
+
+USER_ID = "00000000-0000-0000-0000-000000000001"
+
+
+def test_templates_are_scoped_to_the_verified_user():
+    config = {"configurable": {"user_id": "someone-else", "langgraph_auth_user": SupabaseUser(USER_ID)}}
+    assert get_cache_scope(config) == f"user:{USER_ID}"
+
+
+def test_cache_is_off_without_a_verified_user():
+    config = {"configurable": {"user_id": USER_ID, "thread_id": "thread-1"}}
+    state = {"messages": [HumanMessage(content="show my open tasks", id="human-1")]}
+    assert get_cache_scope(config) is None
+    assert start_turn(state, config) is None
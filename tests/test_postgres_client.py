@@ -0,0 +1,83 @@
+import asyncio
+
+import asyncpg
+import pytest
+
+from src.database import postgres_client
+from src.database.postgres_client import (
+    compile_query,
+    execute_query,
+    get_pool,
+    set_pool,
+    stream_query,
+)
+from tests.stand_in_pool import StandInPool
+
+
+@pytest.fixture(autouse=True)
+def reset_pool(monkeypatch):
+    monkeypatch.setattr(postgres_client, "_pool", None)
+    monkeypatch.setattr(postgres_client, "_pool_loop", None)
+
+
+@pytest.fixture
+def create_pool(monkeypatch):
+    """Replaces asyncpg.create_pool, returning the stand-in pools it created"""
+    pools = []
+
+    async def create(**kwargs):
+        # Yield to other tasks, as connecting does
+        await asyncio.sleep(0.01)
+        pools.append(StandInPool())
+        return pools[-1]
+
+    monkeypatch.setattr(asyncpg, "create_pool", create)
+    return pools
+
+
+def test_compile_query_numbers_named_parameters_in_order():
+    query, names = compile_query(
+        "SELECT * FROM tasks WHERE author_user_id = %(user_id)s AND due_date < %(due)s OR assignee = %(user_id)s"
+    )
+    assert query == "SELECT * FROM tasks WHERE author_user_id = $1 AND due_date < $2 OR assignee = $1"
+    assert names == ("user_id", "due")
+
+
+def test_execute_query_runs_on_the_set_pool():
+    pool = StandInPool(rows=[{"id": 1, "name": "Task"}])
+
+    async def run():
+        set_pool(pool)
+        return await execute_query("SELECT * FROM tasks WHERE id = %(id)s", {"id": 1})
+
+    assert asyncio.run(run()) == [{"id": 1, "name": "Task"}]
+    assert pool.queries == [("SELECT * FROM tasks WHERE id = $1", (1,))]
+
+
+def test_stream_query_reads_through_a_cursor_in_a_transaction():
+    pool = StandInPool(rows=[{"id": 1}, {"id": 2}])
+
+    async def run():
+        set_pool(pool)
+        return [row async for row in stream_query("SELECT id FROM tasks")]
+
+    assert asyncio.run(run()) == [{"id": 1}, {"id": 2}]
+    assert pool.transactions == 1
+
+
+def test_concurrent_first_queries_share_one_pool(create_pool):
+    async def run():
+        return await asyncio.gather(*(get_pool() for _ in range(5)))
+
+    pools = asyncio.run(run())
+    assert len(create_pool) == 1
+    assert all(pool is create_pool[0] for pool in pools)
+
+
+def test_new_event_loop_replaces_and_closes_the_previous_pool(create_pool):
+    first = asyncio.run(get_pool())
+    second = asyncio.run(get_pool())
+
+    assert second is not first
+    assert first.closed
+    assert not second.closed
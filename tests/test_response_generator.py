@@ -0,0 +1,72 @@
+import asyncio
+from typing import Any, Optional
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from src import llm_config
+from src.nodes.node_response_generator import node_response_generator
+
+
+class StreamingModel(BaseChatModel):
+    """Streams its words, raising after fail_after of them when set"""
+
+    words: list[str]
+    fail_after: Optional[int] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "streaming-test-model"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.fail_after is not None:
+            raise RuntimeError("provider error")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(self.words)))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        for index, word in enumerate(self.words):
+            if index == self.fail_after:
+                raise RuntimeError("provider error")
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word))
+        if self.fail_after is not None and self.fail_after >= len(self.words):
+            raise RuntimeError("provider error")
+
+
+@pytest.fixture
+def models(monkeypatch):
+    models = {}
+    monkeypatch.setattr(llm_config, "get_node_llm", lambda node, config, tier=None: models[tier])
+    monkeypatch.setattr(llm_config, "tier_stats", llm_config.TierStats())
+    return models
+
+
+def run_node() -> dict:
+    state = {"messages": [HumanMessage(content="what's due today?", id="human-1")], "plan": ""}
+    config = {"configurable": {"llm_tiers": {"response_generator": "small"}}}
+    return asyncio.run(node_response_generator(state, config))
+
+
+def test_streamed_words_are_one_response(models):
+    models["small"] = StreamingModel(words=["Nothing", " is", " due"])
+    [response] = run_node()["messages"]
+    assert isinstance(response, AIMessage)
+    assert response.content == "Nothing is due"
+
+
+def test_failure_before_the_first_token_escalates(models):
+    models["small"] = StreamingModel(words=["Nothing"], fail_after=0)
+    models["large"] = StreamingModel(words=["All", " done"])
+    [response] = run_node()["messages"]
+    assert response.content == "All done"
+    assert llm_config.tier_stats.escalations == {"response_generator": 1}
+
+
+def test_failure_after_the_first_token_is_not_streamed_again(models):
+    models["small"] = StreamingModel(words=["Nothing", " is"], fail_after=1)
+    models["large"] = StreamingModel(words=["All", " done"])
+    update = run_node()
+    assert "messages" not in update
+    assert update["tool_result"].startswith("ERROR")
+    assert llm_config.tier_stats.escalations == {}
@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+from src.supabase import supabase_note_methods
+from src.supabase.supabase_note_methods import NoteDescriptionLoader
+
+
+@pytest.fixture
+def queries(monkeypatch):
+    """Replaces the batched query, returning the id batches it was given"""
+    queries = []
+
+    async def get_note_descriptions_by_ids(note_ids):
+        queries.append(note_ids)
+        return {note_id: f"description of {note_id}" for note_id in note_ids}
+
+    monkeypatch.setattr(supabase_note_methods, "get_note_descriptions_by_ids", get_note_descriptions_by_ids)
+    return queries
+
+
+def test_lookups_in_one_tick_share_a_query(queries):
+    loader = NoteDescriptionLoader()
+
+    async def run():
+        return await asyncio.gather(loader.load("note-1"), loader.load("note-2"), loader.load("note-1"))
+
+    assert asyncio.run(run()) == ["description of note-1", "description of note-2", "description of note-1"]
+    assert queries == [["note-1", "note-2"]]
+
+
+def test_batch_left_by_a_closed_loop_does_not_block_other_loops(queries):
+    loader = NoteDescriptionLoader()
+
+    # The loop stops after the lookup is queued but before its dispatch runs
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(loader.load("note-1"))
+    loop.call_soon(loop.stop)
+    loop.run_forever()
+    task.cancel()
+    loop.close()
+
+    async def run():
+        return await asyncio.wait_for(loader.load("note-2"), timeout=1)
+
+    assert asyncio.run(run()) == "description of note-2"
+    assert queries == [["note-2"]]
@@ -0,0 +1,34 @@
+import pytest
+
+from src.tools import tools
+from src.tools.tools import get_default_tool_set, get_tool_set_key, reset_default_tool_set
+
+
+@pytest.fixture
+def built_tool_sets(monkeypatch):
+    """Counts the tool lists get_all_tools builds, from an empty default tool set"""
+    built = []
+    get_all_tools = tools.get_all_tools
+
+    def counting_get_all_tools():
+        built.append(get_all_tools())
+        return built[-1]
+
+    monkeypatch.setattr(tools, "get_all_tools", counting_get_all_tools)
+    reset_default_tool_set()
+    yield built
+    reset_default_tool_set()
+
+
+def test_default_tool_set_is_built_once(built_tool_sets):
+    first_tools, first_key = get_default_tool_set()
+    assert get_default_tool_set() == (first_tools, first_key)
+    assert get_tool_set_key() == first_key == get_tool_set_key(first_tools)
+    assert len(built_tool_sets) == 1
+
+
+def test_reset_rebuilds_the_default_tool_set(built_tool_sets):
+    get_default_tool_set()
+    reset_default_tool_set()
+    get_default_tool_set()
+    assert len(built_tool_sets) == 2